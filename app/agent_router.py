@@ -0,0 +1,88 @@
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain_core.tools import BaseTool
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class AgentRouter:
+    """
+    Dispatches a user request to a sub-agent tool without an extra LLM hop whenever possible.
+
+    Key steps:
+    - If only one sub-agent is registered, the request goes straight to it.
+    - Otherwise a cheap keyword classifier scores every sub-agent; if the best one is
+      confident enough and clearly ahead of the runner-up, the request goes straight to it.
+    - Only when the classifier is unsure, the LLM delegator is used. It is built on first use
+      and reused for later requests.
+
+    Example:
+        router = AgentRouter(build_delegator)
+        router.register(invoke_amazon_web_agent_tool, ["amazon", "cart", "order"])
+        router.invoke("Show me my shopping cart info on Amazon")
+    """
+
+    def __init__(
+        self,
+        delegator_factory: Callable[[List[BaseTool]], object],
+        confidence_threshold: float = 0.5,
+        margin: float = 0.25,
+    ):
+        self.delegator_factory = delegator_factory
+        self.confidence_threshold = confidence_threshold
+        self.margin = margin
+        self._tools: List[BaseTool] = []
+        self._keywords: Dict[str, set] = {}
+        self._delegator = None
+        self.stats = {"direct": 0, "classified": 0, "delegated": 0}
+
+    def register(self, tool: BaseTool, keywords: Sequence[str]) -> None:
+        """Register a sub-agent tool with the keywords that identify its requests."""
+        self._tools.append(tool)
+        self._keywords[tool.name] = {keyword.lower() for keyword in keywords}
+        # The delegator has to be rebuilt with the new tool
+        self._delegator = None
+
+    def classify(self, user_input: str) -> Dict[str, float]:
+        """
+        Score every sub-agent by the share of its keywords hit, saturating after two hits.
+        """
+        words = set(_WORD_PATTERN.findall(user_input.lower()))
+        return {
+            name: min(1.0, len(words & keywords) / 2) for name, keywords in self._keywords.items()
+        }
+
+    def route(self, user_input: str) -> Optional[BaseTool]:
+        """Return the sub-agent to dispatch to directly, or None if the delegator should decide."""
+        if len(self._tools) == 1:
+            self.stats["direct"] += 1
+            return self._tools[0]
+
+        scores = sorted(self.classify(user_input).items(), key=lambda item: -item[1])
+        if not scores:
+            return None
+        best_name, best_score = scores[0]
+        runner_up_score = scores[1][1] if len(scores) > 1 else 0.0
+        if best_score >= self.confidence_threshold and best_score - runner_up_score >= self.margin:
+            self.stats["classified"] += 1
+            return next(tool for tool in self._tools if tool.name == best_name)
+        return None
+
+    def invoke(self, user_input: str):
+        tool = self.route(user_input)
+        if tool is not None:
+            logger.info(f"Dispatching directly to {tool.name}")
+            # Sub-agent tools take the user requirement as their single argument
+            argument = next(iter(tool.args))
+            return tool.invoke({argument: user_input})
+
+        logger.info("Delegating through the LLM delegator")
+        self.stats["delegated"] += 1
+        if self._delegator is None:
+            self._delegator = self.delegator_factory(list(self._tools))
+        return self._delegator.invoke({"input": user_input})
@@ -1,6 +1,7 @@
 import asyncio
 import os
-from typing import Annotated, Literal
+from contextlib import nullcontext
+from typing import Annotated, Callable, List, Literal, Optional
 from typing import TypedDict
 
 import nest_asyncio
@@ -10,7 +11,6 @@ from langchain_community.tools.playwright.utils import (
 )
 from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
 from langgraph.checkpoint import MemorySaver
 from langgraph.graph import END, StateGraph, MessagesState
 from langgraph.graph.message import AnyMessage, add_messages
@@ -19,9 +19,39 @@ from playwright_stealth import stealth_sync
 from typing_extensions import TypedDict
 import streamlit as st
 
+from app.amazon_web_agent.background_sign_in import BackgroundSignIn
+from app.amazon_web_agent.blob_store import BlobStore
+from app.amazon_web_agent.extraction.response_capture import (
+    enable_response_capture,
+    is_response_capture_enabled,
+)
+from app.amazon_web_agent.http_fetcher import close_context_fetchers
+from app.amazon_web_agent.model_router import ModelRouter
+from app.amazon_web_agent.page_prefetcher import PagePrefetcher, is_prefetch_enabled
+from app.amazon_web_agent.selector_registry import SelectorRegistry
+from app.amazon_web_agent.tool_call_guard import ToolCallGuard
+from app.amazon_web_agent.token_budget import (
+    BudgetAction,
+    TokenBudget,
+    get_cost_budget,
+    get_token_budget,
+)
+from app.amazon_web_agent.tool_selector import ToolSelector, get_current_url
 from app.amazon_web_agent.tools.amazon_web_agent_toolkit import PlayWrightBrowserToolkit
-from utils.chat_model_env_util import ChatModelUtil
+from app.amazon_web_agent.tools.read_blob_tool import ReadBlobTool
+from app.amazon_web_agent.tools.search_products_tool import get_amazon_base_url
+from utils.browser_cache_util import BrowserDiskCache, get_browser_cache_dir, monitor_page_loads
+from utils.browser_pool_util import track_run
+from utils.cancellation_util import (
+    CancellationToken,
+    RunCancelledError,
+    get_run_timeout,
+    get_run_token,
+    use_run_token,
+)
+from utils.event_channel_util import EventChannel
 from utils.logger_util import LoggerUtil
+from utils.profiler_util import RunProfiler, is_profiling_enabled
 
 amazon_email = os.getenv("AMAZON_EMAIL")
 amazon_password = os.getenv("AMAZON_PASSWORD")
@@ -30,33 +60,71 @@ logger = LoggerUtil.get_logger()
 
 nest_asyncio.apply()
 
+# Playwright's default timeout of a call in milliseconds
+PLAYWRIGHT_DEFAULT_TIMEOUT = 30000
 
-async def async_solve_captcha(page):
+
+def create_notifier(on_event: Optional[Callable[[str], None]] = None) -> Callable[[str], None]:
+    """
+    Create a function that reports progress of a run: logged, and passed to `on_event` if given.
+    `on_event` must not block, e.g. `EventChannel.publish`.
+    """
+
+    def notify(text: str) -> None:
+        logger.info(text)
+        if on_event is not None:
+            on_event(text)
+
+    return notify
+
+
+def render_events_in_streamlit(events: List[str]) -> None:
+    for text in events:
+        st.write(text)
+
+
+async def async_solve_captcha(
+    page,
+    notify: Optional[Callable[[str], None]] = None,
+    token: Optional[CancellationToken] = None,
+):
     """
     Solve the captcha by extracting the captcha image URL,
     using AmazonCaptcha library to solve it, and submitting the solution.
     """
+    notify = notify or create_notifier()
+    token = token or get_run_token() or CancellationToken()
+    registry = SelectorRegistry.get_registry()
+
     # Get the captcha image URL
-    captcha_url = await page.get_attribute('img[src*="captcha"]', "src")
-    logger.info(f"Captcha URL: {captcha_url}")
-    st.write(f"Captcha URL: {captcha_url}")
+    captcha_image = await registry.aresolve(page, "captcha", "image")
+    captcha_url = await page.get_attribute(captcha_image, "src")
+    notify(f"Captcha URL: {captcha_url}")
 
-    # Solve the captcha using AmazonCaptcha library
-    captcha = AmazonCaptcha.fromlink(captcha_url)
-    solution = captcha.solve()
-    logger.info(f"Captcha Solution: {solution}")
-    st.write(f"Captcha Solution: {solution}")
+    # Solve the captcha using AmazonCaptcha library, off the event loop so the run can stop meanwhile
+    captcha = await token.run(asyncio.to_thread(AmazonCaptcha.fromlink, captcha_url))
+    solution = await token.run(asyncio.to_thread(captcha.solve))
+    notify(f"Captcha Solution: {solution}")
 
     # Fill the captcha solution and submit the form
-    await page.fill('input[name="field-keywords"]', solution)
-    await page.click('span.a-button-inner > button[type="submit"]')
+    await page.fill(await registry.aresolve(page, "captcha", "input"), solution)
+    await page.click(await registry.aresolve(page, "captcha", "submit"))
 
 
-async def process_stream(app, inputs):
+async def process_stream(
+    app,
+    inputs,
+    notify: Optional[Callable[[str], None]] = None,
+    token: Optional[CancellationToken] = None,
+):
+    notify = notify or create_notifier()
     last_response = None
     async for event in app.astream(
         inputs, config={"configurable": {"thread_id": 1}}, stream_mode="values"
     ):
+        # No further steps once the run is cancelled
+        if token is not None:
+            token.check()
         message = event.get("messages")
         if message:
             if isinstance(message, list):
@@ -65,27 +133,80 @@ async def process_stream(app, inputs):
                 title = message.type.title() + " Message"
                 response = f"{title}: {message.content}"
 
-                logger.info(response)
-                st.write(response)
+                notify(response)
 
                 last_response = response
     return last_response
 
 
-def amazon_web_agent_run(user_requirement: str):
+def amazon_web_agent_run(user_requirement: str, profile: Optional[bool] = None):
     """
     Perform actions on Amazon Web Page
 
     Args:
         user_requirement (str): A prompt specifying the user requirement on how to perform the action on Amazon Web Page
+        profile (bool): Write a profile of the run to data/profiles, defaults to `AGENT_PROFILE`
     """
-    # Build it with LangGraph
+    # Browser, on the persistent disk cache if configured
+    cache_dir = get_browser_cache_dir()
+    disk_cache = BrowserDiskCache(cache_dir) if cache_dir else None
+    cache_slot = disk_cache.acquire_slot() if disk_cache else None
+    browser = create_async_playwright_browser(
+        headless=False, args=disk_cache.launch_args(cache_slot) if disk_cache else None
+    )
+
+    loop = asyncio.get_event_loop()
+    if profile is None:
+        profile = is_profiling_enabled()
+    profiler = RunProfiler("amazon_web_agent_run", loop=loop) if profile else nullcontext()
+    try:
+        with profiler:
+            return loop.run_until_complete(amazon_web_agent_arun(user_requirement, browser))
+    except RunCancelledError as e:
+        return f"The Amazon web agent stopped before completing the request: {e}"
+    finally:
+        loop.run_until_complete(browser.close())
+        if disk_cache:
+            disk_cache.release_slot(cache_slot)
+
+
+async def amazon_web_agent_arun(
+    user_requirement: str,
+    browser,
+    on_event: Optional[Callable[[str], None]] = None,
+    token: Optional[CancellationToken] = None,
+):
+    """
+    Perform actions on Amazon Web Page with the given browser
+
+    Args:
+        user_requirement (str): A prompt specifying the user requirement on how to perform the action on Amazon Web Page
+        browser: The async Playwright browser to run on, used by this run only
+        on_event: Called with every progress message; messages are written to the Streamlit page if not given
+        token: Cancels the run and bounds it by its deadline, defaults to the current run's token or
+            a token with the `AGENT_RUN_TIMEOUT` deadline. A cancelled run raises RunCancelledError.
+    """
+    token = token or get_run_token() or CancellationToken(get_run_timeout())
+
+    # Without a handler, progress goes through a channel to the Streamlit page,
+    # so the run never waits for the page to render
+    channel = None
+    render_task = None
+    if on_event is None:
+        channel = EventChannel()
+        render_task = asyncio.create_task(channel.consume(render_events_in_streamlit))
+
+        # Nobody is watching the run anymore once the page stops rendering, e.g. the user left
+        def on_render_done(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                token.cancel("the Streamlit page stopped rendering")
 
-    # Browser
-    browser = create_async_playwright_browser(headless=False)
+        render_task.add_done_callback(on_render_done)
+        on_event = channel.publish
+    notify = create_notifier(on_event)
+
+    # Build it with LangGraph
 
-    # LLM
-    amazon_web_agent_llm = ChatModelUtil.create_llm()
     # Prompt
     amazon_web_agent_prompt = ChatPromptTemplate.from_messages(
         [
@@ -93,8 +214,10 @@ def amazon_web_agent_run(user_requirement: str):
                 "system",
                 """
                 You are a specialized assistant responsible for performing actions on Amazon web pages.
-                When a user requests content extraction from a specific web page, always use 'navigate_browser' to navigate to the page first.
+                When a user requests content extraction from the shopping cart or the order history, use 'extract_content' directly; it loads the page itself.
                 Ensure that the task is only considered complete after you have used 'extract_content' to extract the necessary content from the web page.
+                When a user wants to find or compare products, use 'search_products' instead of navigating through search results and product pages.
+                To find and interact with elements on a page, use 'snapshot_page' and then 'act_on_element' with the element numbers, rather than CSS selectors.
                 Avoid inventing or using any invalid tools or functions.
                 Note: The filename has already been logged, so do not mention the filename in your response.
                 """,
@@ -102,62 +225,114 @@ def amazon_web_agent_run(user_requirement: str):
             ("placeholder", "{messages}"),
         ]
     )
-    # Tools
+    # Large tool outputs are kept out of the checkpointed state
+    blob_store = BlobStore()
+
+    # Tools, with the one reading back the large outputs of earlier steps
     amazon_web_agent_tools = PlayWrightBrowserToolkit.from_browser(
         async_browser=browser
-    ).get_tools()
-    # Runnable
-    amazon_web_agent_runnable = (
-        {"messages": RunnablePassthrough()}
-        | amazon_web_agent_prompt
-        | amazon_web_agent_llm.bind_tools(amazon_web_agent_tools)
-    )
+    ).get_tools() + [ReadBlobTool(blob_store=blob_store)]
+    # Token and cost accounting of the run, enforcing the configured budgets
+    token_budget = TokenBudget(get_token_budget(), get_cost_budget())
+    # LLM, routed to a model tier per step
+    model_router = ModelRouter(amazon_web_agent_prompt, amazon_web_agent_tools, token_budget)
+    # Binds only the tools relevant to the current page to each model call
+    tool_selector = ToolSelector(amazon_web_agent_tools)
 
     # State
     class State(TypedDict):
         messages: Annotated[list[AnyMessage], add_messages]
 
-    # Sign in node
-    async def sign_in_node(state):
+    # Sign in
+    async def sign_in():
         # Launch the browser
         context = await browser.new_context()
+        # Playwright calls time out instead of waiting past the run deadline
+        context.set_default_timeout(token.timeout_ms(PLAYWRIGHT_DEFAULT_TIMEOUT))
+        monitor_page_loads(context)
+        # Read cart, order and product data from the JSON responses when available
+        if is_response_capture_enabled():
+            enable_response_capture(context)
         page = await context.new_page()
 
         # Apply stealth to avoid detection
         # await stealth_sync(page)
 
         # Open Amazon web page
-        await page.goto("https://www.amazon.com")
+        await page.goto(get_amazon_base_url())
+
+        registry = SelectorRegistry.get_registry()
 
         # Check if captcha is present
-        if await page.is_visible('img[src*="captcha"]'):
-            logger.info("Solving the captcha...")
-            st.write("Solving the captcha...")
-            await async_solve_captcha(page)
+        if await page.is_visible(", ".join(registry.candidates("captcha", "image"))):
+            notify("Solving the captcha...")
+            await async_solve_captcha(page, notify, token)
 
         # Open the login page
-        await page.click("a#nav-link-accountList")
+        await page.click(await registry.aresolve(page, "sign_in", "account_link"))
 
         # Continue with the login process
-        logger.info("Sign in into Amazon")
-        st.write("Sign in into Amazon")
-        await page.fill("input[name='email']", amazon_email)
-        await page.click("input[id='continue']")
-        await page.fill("input[name='password']", amazon_password)
-        await page.click("input[id='signInSubmit']")
+        notify("Sign in into Amazon")
+        await page.fill(await registry.aresolve(page, "sign_in", "email"), amazon_email)
+        await page.click(await registry.aresolve(page, "sign_in", "continue"))
+        await page.fill(
+            await registry.aresolve(page, "sign_in", "password"), amazon_password
+        )
+        await page.click(await registry.aresolve(page, "sign_in", "submit"))
+
+        # Persist the learned selector winners for the next run
+        registry.save()
 
+    # The first model call runs while signing in, the tools wait for the signed-in context
+    background_sign_in = BackgroundSignIn(sign_in)
+
+    # Sign in node
+    async def sign_in_node(state):
+        background_sign_in.start()
         return {
-            "messages": "The user has successfully signed in. Now proceed with the user request."
+            "messages": "Signing in to Amazon, the tools wait until it is done. Proceed with the user request."
         }
 
+    # Loads the likely next pages while the model is deciding
+    prefetcher = PagePrefetcher(browser, user_requirement) if is_prefetch_enabled() else None
+
     # Agent node
-    def agent_node(state):
+    async def agent_node(state):
         messages = state["messages"]
-        response = amazon_web_agent_runnable.invoke(messages)
+        budget_action = token_budget.action()
+        if budget_action == BudgetAction.STOP:
+            return {"messages": messages + [token_budget.stop_message()]}
+        # The model sees the full outputs of the tools it just called
+        model_messages = blob_store.rehydrate(messages)
+        if budget_action != BudgetAction.NONE:
+            model_messages = token_budget.trim(model_messages)
+        downgrade = budget_action == BudgetAction.DOWNGRADE
+        tool_names = tool_selector.select(messages, get_current_url(browser))
+        # The model request is aborted when the run is cancelled. Prefetching needs the
+        # signed-in context, so the first call, made while signing in, does not prefetch
+        if prefetcher is None or not background_sign_in.done:
+            response = await token.run(model_router.ainvoke("agent_node", model_messages, tool_names, downgrade))
+            return {"messages": messages + [response]}
+
+        await prefetcher.start(messages)
+        try:
+            response = await token.run(model_router.ainvoke("agent_node", model_messages, tool_names, downgrade))
+        except Exception:
+            await prefetcher.close()
+            raise
+        await prefetcher.resolve(response)
         return {"messages": messages + [response]}
 
-    # Tool node
-    tool_node = ToolNode(amazon_web_agent_tools)
+    # Tool node, reusing unchanged results and cutting off repeated calls
+    tool_call_guard = ToolCallGuard(
+        ToolNode(amazon_web_agent_tools), get_page_state=lambda: get_current_url(browser)
+    )
+
+    async def tool_node(state):
+        await token.run(background_sign_in.wait())
+        result = await token.run(tool_call_guard.ainvoke(state))
+        token_budget.record_tool_outputs(state["messages"][-1], result["messages"])
+        return {"messages": blob_store.offload(result["messages"])}
 
     workflow = StateGraph(MessagesState)
 
@@ -181,7 +356,15 @@ def amazon_web_agent_run(user_requirement: str):
         should_continue,
     )
 
-    workflow.add_edge("tool_node", "agent_node")
+    def after_tools(state) -> Literal["agent_node", END]:
+        if tool_call_guard.stopped:
+            return END
+        return "agent_node"
+
+    workflow.add_conditional_edges(
+        "tool_node",
+        after_tools,
+    )
 
     # Initialize memory to persist state between graph runs
     checkpointer = MemorySaver()
@@ -189,6 +372,25 @@ def amazon_web_agent_run(user_requirement: str):
     app = workflow.compile(checkpointer=checkpointer)
 
     inputs = {"messages": [HumanMessage(content=user_requirement)]}
-    loop = asyncio.get_event_loop()
-    last_response = loop.run_until_complete(process_stream(app, inputs))
+    try:
+        # The contexts and pages opened by the run are closed when it ends, also when it is cancelled
+        with use_run_token(token):
+            async with track_run(browser):
+                try:
+                    last_response = await token.run(process_stream(app, inputs, notify, token))
+                finally:
+                    # The model may have answered without using the browser
+                    await background_sign_in.close()
+                    await close_context_fetchers(browser.contexts)
+    finally:
+        blob_store.close()
+        if channel is not None:
+            await channel.close()
+            await asyncio.gather(render_task, return_exceptions=True)
+    logger.info(f"Model usage per tier: {model_router.stats()}, tool subsets: {tool_selector.stats}")
+    logger.info(f"Tool calls: {tool_call_guard.stats}, blobs: {blob_store.stats}")
+    logger.info(f"Sign-in: {background_sign_in.stats()}")
+    logger.info(f"Token usage: {token_budget.stats()}")
+    if prefetcher is not None:
+        logger.info(f"Prefetch: {prefetcher.stats()}")
     return last_response
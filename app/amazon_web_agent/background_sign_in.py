@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+
+class BackgroundSignIn:
+    """
+    Runs the sign-in in the background, so the first model call does not wait for it.
+
+    The model's first decision does not depend on the sign-in, so the graph starts the
+    sign-in and goes straight to the agent node. The tool node calls `wait` before running
+    any tool, so the tools only ever act on the signed-in context. A sign-in error is raised
+    by `wait`; a sign-in still running when the run ends without tool calls is cancelled by
+    `close`.
+
+    Example:
+        sign_in = BackgroundSignIn(sign_in_on_amazon)
+        sign_in.start()
+        response = await model_router.ainvoke("agent_node", messages)
+        await sign_in.wait()
+        result = await tool_node.ainvoke(state)
+        ...
+        await sign_in.close()
+    """
+
+    def __init__(self, sign_in: Callable[[], Awaitable[None]]):
+        self.sign_in = sign_in
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._waited_seconds = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    @property
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def start(self) -> None:
+        """Start the sign-in, once per run."""
+        if self._task is None:
+            self._started_at = time.perf_counter()
+            self._task = asyncio.ensure_future(self.sign_in())
+            self._task.add_done_callback(self._on_done)
+
+    async def wait(self) -> None:
+        """Wait for the sign-in to finish, raising its error if it failed."""
+        if self._task is None:
+            raise RuntimeError("The sign-in was not started")
+        if not self._task.done():
+            start = time.perf_counter()
+            try:
+                await self._task
+            finally:
+                self._waited_seconds += time.perf_counter() - start
+        self._task.result()
+
+    async def close(self) -> None:
+        """Cancel the sign-in if it is still running."""
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        The sign-in time, and how much of it ran alongside the model instead of before it.
+        A cancelled sign-in saved nothing, the run ended without needing it.
+        """
+        if self._started_at is None or self._finished_at is None:
+            return {"sign_in_seconds": 0.0, "saved_seconds": 0.0}
+        if self._task.cancelled():
+            return {"sign_in_seconds": round(self._finished_at - self._started_at, 2), "saved_seconds": 0.0}
+        sign_in_seconds = self._finished_at - self._started_at
+        return {
+            "sign_in_seconds": round(sign_in_seconds, 2),
+            "saved_seconds": round(max(0.0, sign_in_seconds - self._waited_seconds), 2),
+        }
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._finished_at = time.perf_counter()
+        # Retrieve the error of a sign-in nobody waits for, e.g. the run ended without tools
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to sign in: {task.exception()}")
@@ -0,0 +1,124 @@
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Tool outputs longer than this are moved out of the graph state
+MAX_INLINE_LENGTH = 4000
+
+# Characters of a moved output kept in the graph state
+PREVIEW_LENGTH = 500
+
+BLOB_KEY = "blob"
+
+
+class BlobStore:
+    """
+    A content-addressed store for large tool outputs, keeping them out of the graph state.
+
+    The checkpointer copies the graph state at every step, so a large tool output kept inline
+    is copied again and again. Instead, `offload` writes it to a file named by its SHA-256
+    digest and leaves a short preview with the reference in the state. `rehydrate` restores
+    the outputs the model needs for its next step, reading them through a memory map. Older
+    outputs stay as previews; the model reads them in full with the `read_blob` tool, whose
+    own output is then restored for its next step.
+
+    Each run uses its own store, removed by `close` when the run ends.
+
+    Example:
+        store = BlobStore()
+        messages = store.offload(tool_messages)
+        response = await model.ainvoke(store.rehydrate(state["messages"]))
+        store.close()
+    """
+
+    def __init__(self, root: Optional[str] = None, max_inline_length: int = MAX_INLINE_LENGTH):
+        self.root = root or tempfile.mkdtemp(prefix="agent-blobs-")
+        os.makedirs(self.root, exist_ok=True)
+        self.max_inline_length = max_inline_length
+        self.stats = {"offloaded": 0, "offloaded_chars": 0, "rehydrated": 0}
+
+    def put(self, text: str) -> str:
+        """Store the text and return its digest; identical texts are stored once."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> str:
+        path = self._path(digest)
+        if os.path.getsize(path) == 0:
+            return ""
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[:].decode("utf-8")
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """Return the digest of the blob with the given reference or digest prefix, if it is unique."""
+        ref = ref.strip().lower()
+        directory = os.path.join(self.root, ref[:2])
+        if len(ref) < 4 or not os.path.isdir(directory):
+            return None
+        matches = [
+            name for name in os.listdir(directory) if name.startswith(ref[2:]) and not name.endswith(".tmp")
+        ]
+        return ref[:2] + matches[0] if len(matches) == 1 else None
+
+    def offload(self, messages: Sequence[AnyMessage]) -> List[AnyMessage]:
+        """Replace the content of large tool messages with a preview and a blob reference."""
+        result = []
+        for message in messages:
+            content = message.content
+            if (
+                isinstance(message, ToolMessage)
+                and isinstance(content, str)
+                and len(content) > self.max_inline_length
+            ):
+                digest = self.put(content)
+                self.stats["offloaded"] += 1
+                self.stats["offloaded_chars"] += len(content)
+                message = message.copy(
+                    update={
+                        "content": f"{content[:PREVIEW_LENGTH]}\n... [{len(content)} characters, stored as blob {digest[:12]}]",
+                        "additional_kwargs": {**message.additional_kwargs, BLOB_KEY: digest},
+                    }
+                )
+            result.append(message)
+        return result
+
+    def rehydrate(self, messages: Sequence[AnyMessage]) -> List[AnyMessage]:
+        """
+        Restore the full content of the tool messages since the last model response, which
+        the model needs for its next step. Older outputs stay as previews.
+        """
+        last_ai_index = max(
+            (index for index, message in enumerate(messages) if isinstance(message, AIMessage)),
+            default=-1,
+        )
+        result = list(messages)
+        for index in range(last_ai_index + 1, len(result)):
+            message = result[index]
+            digest = message.additional_kwargs.get(BLOB_KEY) if isinstance(message, ToolMessage) else None
+            if digest:
+                result[index] = message.copy(update={"content": self.get(digest)})
+                self.stats["rehydrated"] += 1
+        return result
+
+    def close(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
@@ -0,0 +1,160 @@
+"""
+Re-parse directories of saved HTML pages with the extraction schemas, using all CPU cores.
+
+Usage:
+    python -m app.amazon_web_agent.extraction.batch_extract data/pages --schema cart --output data/cart_pages.jsonl
+
+Without `--schema`, every schema is applied to every page and only the schemas that
+produced records are written. Results are written as JSON lines, one line per page.
+
+With `--profile` (or `AGENT_PROFILE=true`), a flame graph of the batch is written next to
+the output file. Only the current process is profiled, so the pages are then extracted
+in-process unless `--workers` is given.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+from app.amazon_web_agent.extraction.extraction_engine import (
+    extract_next_page,
+    extract_records,
+    load_schema,
+    load_schemas,
+    parse_html,
+)
+from utils.logger_util import LoggerUtil
+from utils.profiler_util import RunProfiler, get_profile_dir, is_profiling_enabled
+
+logger = LoggerUtil.get_logger()
+
+
+def find_html_files(input_dir: str, pattern: str = "*.html") -> List[str]:
+    """Return all files below the input directory matching the pattern, sorted by path."""
+    return sorted(str(path) for path in Path(input_dir).rglob(pattern) if path.is_file())
+
+
+def _init_worker(schema_names: Sequence[str]) -> None:
+    """Load the schemas once per worker process instead of once per file."""
+    for schema_name in schema_names:
+        load_schema(schema_name)
+
+
+def extract_file(file_path: str, schema_names: Sequence[str]) -> dict:
+    """Apply the schemas to a single saved HTML page."""
+    try:
+        with open(file_path, "rb") as f:
+            # Parse once and share the tree between all schemas
+            soup = parse_html(f.read())
+
+        results = {}
+        for schema_name in schema_names:
+            schema = load_schema(schema_name)
+            records = extract_records(soup, schema)
+            if records or len(schema_names) == 1:
+                results[schema_name] = {
+                    "records": records,
+                    "next_page": extract_next_page(soup, schema),
+                }
+        return {"file": file_path, "results": results}
+    except Exception as e:
+        return {"file": file_path, "error": str(e)}
+
+
+def _extract_file_task(task: tuple) -> dict:
+    return extract_file(*task)
+
+
+def run_batch(
+    files: Sequence[str],
+    schema_names: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+) -> Iterator[dict]:
+    """
+    Extract all files with a process pool and yield the results in input order.
+
+    Files are handed to the workers in chunks to amortize the inter-process overhead.
+    """
+    schema_names = list(schema_names or load_schemas())
+    workers = workers or os.cpu_count() or 1
+    tasks = ((file_path, schema_names) for file_path in files)
+
+    if workers == 1:
+        yield from map(_extract_file_task, tasks)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(schema_names,)
+    ) as executor:
+        yield from executor.map(_extract_file_task, tasks, chunksize=chunksize)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Apply the extraction schemas to directories of saved HTML pages."
+    )
+    parser.add_argument("input_dir", help="Directory with saved HTML pages")
+    parser.add_argument(
+        "--schema",
+        action="append",
+        choices=sorted(load_schemas()),
+        help="Schema to apply, may be repeated. Defaults to all schemas.",
+    )
+    parser.add_argument("--pattern", default="*.html", help="File name pattern")
+    parser.add_argument(
+        "--output", default="-", help="JSON lines output file, '-' for stdout"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes, defaults to all cores"
+    )
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=is_profiling_enabled(),
+        help="Write a flame graph of the batch next to the output file",
+    )
+    args = parser.parse_args(argv)
+
+    files = find_html_files(args.input_dir, args.pattern)
+    logger.info(f"Extracting {len(files)} files from {args.input_dir}")
+
+    workers = args.workers
+    profiler = nullcontext()
+    if args.profile:
+        workers = workers or 1
+        output_dir = os.path.dirname(args.output) if args.output != "-" else get_profile_dir()
+        profiler = RunProfiler("batch_extract", output_dir=output_dir or ".")
+
+    start = time.perf_counter()
+    errors = 0
+    output = open(args.output, "w", encoding="utf-8") if args.output != "-" else None
+    try:
+        with profiler:
+            for result in run_batch(files, args.schema, workers, args.chunksize):
+                if "error" in result:
+                    errors += 1
+                    logger.error(f"Failed to extract {result['file']}: {result['error']}")
+                line = json.dumps(result, ensure_ascii=False)
+                if output:
+                    output.write(line + "\n")
+                else:
+                    print(line)
+    finally:
+        if output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Extracted {len(files)} files in {elapsed:.2f}s "
+        f"({len(files) / elapsed if elapsed else 0:.1f} files/s, {errors} errors)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+Typed, columnar history of the extracted cart, order and product data.
+
+Every synced extraction is normalized (prices to integer minor units and a currency code,
+dates, quantities) and appended as a Parquet file to a dataset partitioned by kind and day:
+
+    data/commerce/<kind>/date=<YYYY-MM-DD>/part-<time>-<id>.parquet
+
+The dataset can be read with `read_dataset` (or any Arrow-compatible engine, with hive
+partitioning) and queried with vectorized operations.
+
+Usage:
+    python -m app.amazon_web_agent.extraction.commerce_dataset compact
+
+`compact` imports the JSON files of earlier extractions (`data/*.json`) that are not in the
+dataset yet, and merges the part files of every partition into one. The merged file names the
+parts it replaces in its metadata, so parts left behind by an interrupted compaction are
+skipped by `read_dataset` and removed by the next compaction.
+"""
+import argparse
+import json
+import os
+import re
+import uuid
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.amazon_web_agent.extraction.extraction_engine import (
+    ExtractionSchema,
+    FieldType,
+    Normalization,
+    coerce_value,
+    load_schema,
+)
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+DATASET_DIR_NAME = "commerce"
+
+# Currency symbols, longest first so that "US$" wins over "$"
+CURRENCY_SYMBOLS = [
+    ("US$", "USD"),
+    ("CA$", "CAD"),
+    ("C$", "CAD"),
+    ("A$", "AUD"),
+    ("R$", "BRL"),
+    ("$", "USD"),
+    ("€", "EUR"),
+    ("£", "GBP"),
+    ("¥", "JPY"),
+    ("₹", "INR"),
+]
+
+# Digits after the decimal separator, for currencies that do not have 2
+MINOR_UNIT_DIGITS = {"JPY": 0, "KRW": 0}
+
+DATE_FORMATS = ["%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y", "%Y-%m-%d", "%m/%d/%Y"]
+
+_CURRENCY_CODE_PATTERN = re.compile(r"\b([A-Z]{3})\b")
+_AMOUNT_PATTERN = re.compile(r"-?\d[\d.,\s]*")
+_DATE_PATTERN = re.compile(
+    r"[A-Z][a-z]+\.? \d{1,2}, \d{4}|\d{1,2} [A-Z][a-z]+\.? \d{4}|\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{4}"
+)
+
+# The JSON files written by the extract_content tool: <kind>_changes_<time>.json, and
+# cart_items_<time>.json from before the sync engine
+_HISTORY_FILE_PATTERN = re.compile(r"^(?P<prefix>[a-z_]+?)_(?P<timestamp>\d{14})(?:_\d+)?\.json$")
+HISTORY_PREFIXES = {
+    "cart_changes": "cart",
+    "orders_changes": "orders",
+    "products_changes": "product",
+    "cart_items": "cart",
+}
+
+# Parquet metadata of a merged file, with the names of the part files it replaces
+COMPACTED_FROM_KEY = b"compacted_from"
+
+
+def parse_money(value: Any, default_currency: Optional[str] = None) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Parse a price like "$1,299.99" or "1.299,99 €" into integer minor units and a currency
+    code, e.g. (129999, "USD"). Returns (None, None) if there is no amount.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        return None, None
+
+    currency = default_currency
+    for symbol, code in CURRENCY_SYMBOLS:
+        if symbol in value:
+            currency = code
+            break
+    else:
+        match = _CURRENCY_CODE_PATTERN.search(value)
+        if match:
+            currency = match.group(1)
+
+    match = _AMOUNT_PATTERN.search(value)
+    if not match:
+        return None, None
+    number = re.sub(r"\s", "", match.group(0)).rstrip(".,")
+    # The last separator is the decimal separator if both are used, a single one only if
+    # it is not followed by exactly three digits (a thousands separator)
+    separators = [char for char in number if char in ".,"]
+    if len(set(separators)) == 2:
+        decimal_separator = separators[-1]
+    elif len(separators) == 1 and len(number) - number.index(separators[0]) - 1 != 3:
+        decimal_separator = separators[0]
+    else:
+        decimal_separator = None
+    integer, _, fraction = number.partition(decimal_separator) if decimal_separator else (number, "", "")
+    try:
+        amount = Decimal(re.sub(r"[.,]", "", integer) + "." + (fraction or "0"))
+    except InvalidOperation:
+        return None, None
+    digits = MINOR_UNIT_DIGITS.get(currency, 2)
+    return int((amount * 10**digits).to_integral_value()), currency
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """Parse a date like "January 5, 2026" or "2026-01-05", also within a longer text."""
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        return None
+    match = _DATE_PATTERN.search(value)
+    if not match:
+        return None
+    text = match.group(0).replace(".", "").replace("Sept ", "Sep ")
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def get_columns(schema: ExtractionSchema) -> Dict[str, str]:
+    """The typed columns of the schema's records, by name, with their Arrow type names."""
+    columns = {"change": "string", "extracted_at": "timestamp", "source_file": "string"}
+    for name, spec in schema.fields.items():
+        if spec.normalize == Normalization.MONEY:
+            columns[f"{name}_minor"] = "int64"
+            columns[f"{name}_currency"] = "string"
+        elif spec.normalize == Normalization.DATE:
+            columns[name] = "date"
+        elif spec.many:
+            columns[name] = "list<string>"
+        elif spec.type == FieldType.INT:
+            columns[name] = "int64"
+        elif spec.type == FieldType.FLOAT:
+            columns[name] = "float64"
+        else:
+            columns[name] = "string"
+    return columns
+
+
+def normalize_record(record: dict, schema: ExtractionSchema) -> dict:
+    """Type the fields of an extracted record as described by the schema."""
+    row = {}
+    for name, spec in schema.fields.items():
+        value = record.get(name)
+        if value == "N/A":
+            value = None
+        if spec.normalize == Normalization.MONEY:
+            row[f"{name}_minor"], row[f"{name}_currency"] = parse_money(value)
+        elif spec.normalize == Normalization.DATE:
+            row[name] = parse_date(value)
+        elif spec.many:
+            row[name] = [str(item) for item in value] if isinstance(value, list) else None
+        elif spec.type in (FieldType.INT, FieldType.FLOAT):
+            row[name] = coerce_value(str(value), spec.type) if value is not None else None
+        else:
+            row[name] = str(value) if value is not None else None
+    return row
+
+
+def change_rows(changes: dict, schema: ExtractionSchema, extracted_at: datetime, source_file: str) -> List[dict]:
+    """The typed rows of the records in a saved `SyncChanges`, or in a plain list of records."""
+    if isinstance(changes, list):
+        records = [("snapshot", record) for record in changes]
+    else:
+        records = [("added", record) for record in changes.get("added", [])]
+        records += [("removed", record) for record in changes.get("removed", [])]
+        records += [("changed", change.get("after", {})) for change in changes.get("changed", [])]
+    return [
+        dict(
+            normalize_record(record, schema),
+            change=change,
+            extracted_at=extracted_at,
+            source_file=source_file,
+        )
+        for change, record in records
+    ]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The columnar export needs pyarrow, install it with `pip install pyarrow`.") from e
+    return pyarrow
+
+
+def _arrow_schema(schema: ExtractionSchema):
+    pa = _import_pyarrow()
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("s"),
+        "list<string>": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[type_name]) for name, type_name in get_columns(schema).items()])
+
+
+def get_dataset_dir(data_dir: str) -> str:
+    return os.path.join(data_dir, DATASET_DIR_NAME)
+
+
+def _write_part(table, partition_dir: str) -> str:
+    """Write the table as a new part file of the partition, never visible half-written."""
+    pa = _import_pyarrow()
+    os.makedirs(partition_dir, exist_ok=True)
+    name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+    path = os.path.join(partition_dir, name)
+    pa.parquet.write_table(table, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def append_rows(rows: List[dict], schema: ExtractionSchema, data_dir: str) -> List[str]:
+    """Append the rows to the dataset as one new part file per day, return their paths."""
+    pa = _import_pyarrow()
+    arrow_schema = _arrow_schema(schema)
+    by_day: Dict[date, List[dict]] = {}
+    for row in rows:
+        by_day.setdefault(row["extracted_at"].date(), []).append(row)
+
+    paths = []
+    for day, day_rows in sorted(by_day.items()):
+        partition_dir = os.path.join(get_dataset_dir(data_dir), schema.name, f"date={day.isoformat()}")
+        table = pa.Table.from_pylist(day_rows, schema=arrow_schema)
+        paths.append(_write_part(table, partition_dir))
+    return paths
+
+
+def append_changes(changes: dict, schema: ExtractionSchema, data_dir: str, source_file: str) -> List[str]:
+    """Append the records of a sync to the dataset."""
+    rows = change_rows(changes, schema, datetime.now().replace(microsecond=0), os.path.basename(source_file))
+    return append_rows(rows, schema, data_dir) if rows else []
+
+
+def read_dataset(kind: str, data_dir: str):
+    """Read all rows of a kind as an Arrow table, with the day as the `date` column."""
+    pa = _import_pyarrow()
+    import pyarrow.dataset as ds
+
+    path = os.path.join(get_dataset_dir(data_dir), kind)
+    files = [part for partition_dir in _partitions(data_dir, kind) for part in _part_files(partition_dir)]
+    dataset = ds.dataset(files, format="parquet", partitioning="hive", partition_base_dir=path)
+    # Parts written before a schema change are read with the columns of the newest part
+    schema = _merged_schema([pa.parquet.read_schema(part) for part in files])
+    partition_fields = [field for field in dataset.schema if field.name not in schema.names]
+    return dataset.replace_schema(pa.schema(list(schema) + partition_fields)).to_table()
+
+
+def _all_part_files(partition_dir: str) -> List[str]:
+    return sorted(
+        os.path.join(partition_dir, name) for name in os.listdir(partition_dir) if name.endswith(".parquet")
+    )
+
+
+def _superseded_part_files(partition_dir: str) -> List[str]:
+    """The part files already merged into another file, left behind by an interrupted compaction."""
+    pa = _import_pyarrow()
+    superseded = set()
+    for path in _all_part_files(partition_dir):
+        metadata = pa.parquet.read_schema(path).metadata or {}
+        if COMPACTED_FROM_KEY in metadata:
+            superseded.update(json.loads(metadata[COMPACTED_FROM_KEY]))
+    return [path for path in _all_part_files(partition_dir) if os.path.basename(path) in superseded]
+
+
+def _part_files(partition_dir: str) -> List[str]:
+    """The part files holding the rows of the partition, each row in exactly one of them."""
+    superseded = set(_superseded_part_files(partition_dir))
+    return [path for path in _all_part_files(partition_dir) if path not in superseded]
+
+
+def _read_part(path: str):
+    pa = _import_pyarrow()
+    return pa.parquet.read_table(path).replace_schema_metadata(None)
+
+
+def _merged_schema(schemas: list):
+    """
+    The schema of parts written with different versions of a schema, oldest first: the
+    columns of the newest part with its types, followed by the columns only older parts have.
+    """
+    pa = _import_pyarrow()
+    fields = {}
+    for schema in reversed(schemas):
+        for field in schema:
+            fields.setdefault(field.name, field)
+    return pa.schema(list(fields.values()))
+
+
+def _conform(table, schema):
+    """Cast the table to the schema, with nulls for the columns it does not have."""
+    pa = _import_pyarrow()
+    columns = [
+        table.column(field.name).cast(field.type)
+        if field.name in table.column_names
+        else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _partitions(data_dir: str, kind: str) -> Iterator[str]:
+    kind_dir = os.path.join(get_dataset_dir(data_dir), kind)
+    if not os.path.isdir(kind_dir):
+        return
+    for name in sorted(os.listdir(kind_dir)):
+        if name.startswith("date="):
+            yield os.path.join(kind_dir, name)
+
+
+def imported_source_files(data_dir: str, kind: str) -> Set[str]:
+    """The JSON files whose records are already in the dataset."""
+    pa = _import_pyarrow()
+    files = set()
+    for partition_dir in _partitions(data_dir, kind):
+        for path in _part_files(partition_dir):
+            column = pa.parquet.read_table(path, columns=["source_file"]).column("source_file")
+            files.update(value for value in column.to_pylist() if value)
+    return files
+
+
+def find_history_files(data_dir: str) -> List[Tuple[str, str, datetime]]:
+    """The JSON files of earlier extractions, as (path, kind, extraction time), oldest first."""
+    history = []
+    for name in os.listdir(data_dir):
+        match = _HISTORY_FILE_PATTERN.match(name)
+        if not match or match.group("prefix") not in HISTORY_PREFIXES:
+            continue
+        extracted_at = datetime.strptime(match.group("timestamp"), "%Y%m%d%H%M%S")
+        history.append((os.path.join(data_dir, name), HISTORY_PREFIXES[match.group("prefix")], extracted_at))
+    return sorted(history, key=lambda item: (item[2], item[0]))
+
+
+def import_history(data_dir: str) -> Dict[str, int]:
+    """Append the records of the JSON files that are not in the dataset yet, return the rows per kind."""
+    imported: Dict[str, Set[str]] = {}
+    rows_by_kind: Dict[str, List[dict]] = {}
+    for path, kind, extracted_at in find_history_files(data_dir):
+        if kind not in imported:
+            imported[kind] = imported_source_files(data_dir, kind)
+        source_file = os.path.basename(path)
+        if source_file in imported[kind]:
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                changes = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Skipping {path}: {e}")
+            continue
+        rows_by_kind.setdefault(kind, []).extend(
+            change_rows(changes, load_schema(kind), extracted_at, source_file)
+        )
+
+    for kind, rows in rows_by_kind.items():
+        append_rows(rows, load_schema(kind), data_dir)
+    return {kind: len(rows) for kind, rows in rows_by_kind.items()}
+
+
+def compact_partitions(data_dir: str) -> int:
+    """Merge the part files of every partition into one, return the number of files removed."""
+    pa = _import_pyarrow()
+    removed = 0
+    dataset_dir = get_dataset_dir(data_dir)
+    kinds = sorted(os.listdir(dataset_dir)) if os.path.isdir(dataset_dir) else []
+    for kind in kinds:
+        for partition_dir in _partitions(data_dir, kind):
+            # Finish an interrupted compaction first
+            for part in _superseded_part_files(partition_dir):
+                os.remove(part)
+                removed += 1
+
+            parts = _part_files(partition_dir)
+            if len(parts) < 2:
+                continue
+            tables = [_read_part(path) for path in parts]
+            schema = _merged_schema([table.schema for table in tables])
+            try:
+                table = pa.concat_tables([_conform(table, schema) for table in tables])
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                logger.error(f"Skipping the compaction of {partition_dir}, its parts do not merge: {e}")
+                continue
+            # The merged file is written before the parts are removed, naming them so that a
+            # crash in between does not leave their rows in the dataset twice
+            metadata = {COMPACTED_FROM_KEY: json.dumps([os.path.basename(path) for path in parts]).encode()}
+            table = table.sort_by([("extracted_at", "ascending")]).replace_schema_metadata(metadata)
+            _write_part(table, partition_dir)
+            for part in parts:
+                os.remove(part)
+                removed += 1
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.amazon_web_agent.tools.extract_content_tool import get_data_dir
+
+    parser = argparse.ArgumentParser(description="Maintain the columnar dataset of extracted commerce data.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact_parser = subparsers.add_parser(
+        "compact", help="Import the JSON history and merge the part files of every partition"
+    )
+    compact_parser.add_argument("--data-dir", default=None, help="Defaults to the project's data directory")
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or get_data_dir()
+    imported = import_history(data_dir)
+    removed = compact_partitions(data_dir)
+    logger.info(f"Imported {imported or 'no'} rows from the JSON history, merged away {removed} part files")
+
+
+if __name__ == "__main__":
+    main()
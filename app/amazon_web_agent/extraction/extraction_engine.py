@@ -0,0 +1,303 @@
+import os
+import re
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup
+from langchain_core.pydantic_v1 import BaseModel
+
+from app.amazon_web_agent.selector_registry import SelectorRegistry
+
+# Directory containing the declarative extraction schemas
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), "schemas")
+
+# lxml is considerably faster than the pure Python html.parser on large pages
+HTML_PARSER = "lxml"
+
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:[.,]\d+)*")
+
+
+class FieldType(str, Enum):
+    STR = "str"
+    INT = "int"
+    FLOAT = "float"
+
+
+class Normalization(str, Enum):
+    # A price like "$1,299.99", exported as integer minor units and a currency code
+    MONEY = "money"
+    # A date like "January 5, 2026", exported as a date
+    DATE = "date"
+
+
+class SyncMode(str, Enum):
+    # The extracted records are the complete state, e.g. the shopping cart
+    SNAPSHOT = "snapshot"
+    # The extracted records are the newest part of a paginated history, e.g. the orders
+    INCREMENTAL = "incremental"
+
+
+class FieldSpec(BaseModel):
+    """How to extract one field from a container element."""
+
+    # Field name in the selector registry for the schema's page type
+    selector: Optional[str] = None
+    # Inline fallback chain, for fields that are not worth registering
+    css: Optional[List[str]] = None
+    # Attribute to read instead of the element text
+    attribute: Optional[str] = None
+    # Read the element text when it has no such attribute, e.g. a quantity shown as text
+    text_fallback: bool = False
+    type: FieldType = FieldType.STR
+    # Return a list with the values of all matching elements
+    many: bool = False
+    # Skip the whole record if the field is missing
+    required: bool = False
+    default: Any = None
+    # How the value is typed in the columnar export, see commerce_dataset
+    normalize: Optional[Normalization] = None
+
+
+class JsonSource(BaseModel):
+    """
+    A JSON response that carries the schema's records, e.g. an XHR endpoint the page loads
+    its data from. Paths are dotted, with `*` mapping over a list (e.g. `items.*.title`).
+    """
+
+    # Regular expression searched in the response URL
+    url_pattern: str
+    # Path to the list of records, or to a single record; empty for the payload itself
+    records: str = ""
+    # Path per field within a record; fields without a path are read by their name
+    fields: Dict[str, str] = {}
+    # Path to the link to the next page of a paginated listing
+    next_page: Optional[str] = None
+
+
+class ExtractionSchema(BaseModel):
+    """
+    A declarative description of the records on one Amazon page type.
+
+    Without a `container`, the whole document is extracted as a single record. Fields without
+    `selector` and `css` are read from the container element itself.
+    """
+
+    name: str
+    description: str
+    # The AmazonExtractInfo value served by this schema, if it backs extract_content
+    info: Optional[str] = None
+    page_type: str
+    # Path of the page on the Amazon site, for extractions that load the page themselves
+    url: Optional[str] = None
+    container: Optional[str] = None
+    key: str
+    sync: SyncMode = SyncMode.SNAPSHOT
+    fields: Dict[str, FieldSpec]
+    # Link to the next page of a paginated listing
+    pagination: Optional[FieldSpec] = None
+    # Field name in the selector registry of the marker a page shows when it has no records,
+    # e.g. an empty cart, telling it apart from a page whose records are rendered by scripts
+    empty_state: Optional[str] = None
+    # JSON responses carrying the same records, preferred over the HTML when captured
+    json_sources: List[JsonSource] = []
+
+
+@lru_cache(maxsize=None)
+def load_schemas() -> Dict[str, ExtractionSchema]:
+    """Load all schemas from the schema directory, keyed by name."""
+    schemas = {}
+    for file_name in sorted(os.listdir(SCHEMA_DIR)):
+        if file_name.endswith(".json"):
+            schema = ExtractionSchema.parse_file(os.path.join(SCHEMA_DIR, file_name))
+            schemas[schema.name] = schema
+    return schemas
+
+
+def load_schema(name: str) -> ExtractionSchema:
+    try:
+        return load_schemas()[name]
+    except KeyError:
+        raise ValueError(f"Unknown extraction schema: {name}")
+
+
+def get_schema_for_info(info: str) -> Optional[ExtractionSchema]:
+    """Return the schema serving the given AmazonExtractInfo value, if any."""
+    for schema in load_schemas().values():
+        if schema.info == info:
+            return schema
+    return None
+
+
+def parse_html(html: Union[str, bytes]) -> BeautifulSoup:
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def coerce_value(value: Optional[str], field_type: FieldType, default: Any = None) -> Any:
+    """Convert the raw string into the field type, falling back to the default."""
+    if not value:
+        return default
+    if field_type == FieldType.STR:
+        return value
+    match = _NUMBER_PATTERN.search(value)
+    if not match:
+        return default
+    number = match.group(0).replace(",", "")
+    try:
+        return int(float(number)) if field_type == FieldType.INT else float(number)
+    except ValueError:
+        return default
+
+
+def _raw_value(element, spec: FieldSpec) -> Optional[str]:
+    if spec.attribute:
+        value = element.get(spec.attribute)
+        if isinstance(value, str):
+            return value.strip()
+        return element.get_text(strip=True) if spec.text_fallback else None
+    return element.get_text(strip=True)
+
+
+def _select(root, page_type: str, spec: FieldSpec, registry: SelectorRegistry) -> list:
+    if spec.selector:
+        if spec.many:
+            return registry.select(root, page_type, spec.selector)
+        element = registry.select_one(root, page_type, spec.selector)
+        return [element] if element is not None else []
+    if spec.css:
+        for selector in spec.css:
+            elements = root.select(selector) if spec.many else root.select(selector, limit=1)
+            if elements:
+                return elements
+        return []
+    return [root]
+
+
+def extract_field(
+    root, page_type: str, spec: FieldSpec, registry: Optional[SelectorRegistry] = None
+) -> Any:
+    """Extract one field from the root element according to its spec."""
+    registry = registry or SelectorRegistry.get_registry()
+    elements = _select(root, page_type, spec, registry)
+    values = [
+        coerce_value(_raw_value(element, spec), spec.type, spec.default)
+        for element in elements
+    ]
+    if spec.many:
+        return values
+    return values[0] if values else spec.default
+
+
+def extract_records(
+    document: Union[str, bytes, BeautifulSoup],
+    schema: ExtractionSchema,
+    registry: Optional[SelectorRegistry] = None,
+) -> List[dict]:
+    """Extract all records described by the schema from an HTML document."""
+    registry = registry or SelectorRegistry.get_registry()
+    soup = document if isinstance(document, BeautifulSoup) else parse_html(document)
+
+    if schema.container:
+        containers = registry.select(soup, schema.page_type, schema.container)
+    else:
+        containers = [soup]
+
+    records = []
+    for container in containers:
+        record = {}
+        for name, spec in schema.fields.items():
+            value = extract_field(container, schema.page_type, spec, registry)
+            if spec.required and value in (None, "", []):
+                record = None
+                break
+            record[name] = value
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def extract_next_page(
+    document: Union[str, bytes, BeautifulSoup],
+    schema: ExtractionSchema,
+    registry: Optional[SelectorRegistry] = None,
+) -> Optional[str]:
+    """Return the (possibly relative) link to the next page, if the schema is paginated."""
+    if schema.pagination is None:
+        return None
+    soup = document if isinstance(document, BeautifulSoup) else parse_html(document)
+    return extract_field(soup, schema.page_type, schema.pagination, registry) or None
+
+
+def is_empty_page(
+    document: Union[str, bytes, BeautifulSoup],
+    schema: ExtractionSchema,
+    registry: Optional[SelectorRegistry] = None,
+) -> bool:
+    """Return whether the page shows the schema's empty state, i.e. it has no records at all."""
+    if schema.empty_state is None:
+        return False
+    registry = registry or SelectorRegistry.get_registry()
+    soup = document if isinstance(document, BeautifulSoup) else parse_html(document)
+    return registry.select_one(soup, schema.page_type, schema.empty_state) is not None
+
+
+def key_records(schema: ExtractionSchema, records: List[dict]) -> Dict[str, dict]:
+    """Index the records by the schema key, keeping the first record per key."""
+    keyed = {}
+    for record in records:
+        keyed.setdefault(str(record[schema.key]), record)
+    return keyed
+
+
+def get_json_path(data: Any, path: str) -> Any:
+    """Resolve a dotted path in JSON data, mapping over lists at `*` segments."""
+    if not path:
+        return data
+    head, _, rest = path.partition(".")
+    if head == "*":
+        if not isinstance(data, list):
+            return []
+        return [get_json_path(item, rest) for item in data]
+    if isinstance(data, dict):
+        return get_json_path(data.get(head), rest) if head in data else None
+    if isinstance(data, list) and head.isdigit() and int(head) < len(data):
+        return get_json_path(data[int(head)], rest)
+    return None
+
+
+def coerce_json_value(value: Any, field_type: FieldType, default: Any = None) -> Any:
+    """Convert a JSON value into the field type, falling back to the default."""
+    if isinstance(value, bool) or value is None:
+        return default if value is None else value
+    if isinstance(value, (int, float)):
+        if field_type == FieldType.STR:
+            return str(value)
+        return int(value) if field_type == FieldType.INT else float(value)
+    return coerce_value(str(value).strip(), field_type, default)
+
+
+def extract_json_records(payload: Any, schema: ExtractionSchema, source: JsonSource) -> List[dict]:
+    """Extract all records described by the schema from a captured JSON payload."""
+    items = get_json_path(payload, source.records)
+    if items is None:
+        return []
+    if not isinstance(items, list):
+        items = [items]
+
+    records = []
+    for item in items:
+        record = {}
+        for name, spec in schema.fields.items():
+            value = get_json_path(item, source.fields.get(name, name))
+            if spec.many:
+                values = value if isinstance(value, list) else ([] if value is None else [value])
+                value = [coerce_json_value(v, spec.type, spec.default) for v in values]
+            else:
+                value = coerce_json_value(value, spec.type, spec.default)
+            if spec.required and value in (None, "", []):
+                record = None
+                break
+            record[name] = value
+        if record is not None:
+            records.append(record)
+    return records
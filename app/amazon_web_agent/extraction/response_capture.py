@@ -0,0 +1,157 @@
+import asyncio
+import os
+import re
+import weakref
+from collections import deque
+from typing import Any, Deque, List, Optional, Set, Tuple
+
+from langchain_core.pydantic_v1 import BaseModel
+
+from app.amazon_web_agent.extraction.extraction_engine import (
+    ExtractionSchema,
+    JsonSource,
+    extract_json_records,
+    get_json_path,
+    load_schemas,
+)
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Payloads kept per browser context, older ones are discarded
+MAX_CAPTURED_PAYLOADS = 50
+
+# The capture of every browser context it was enabled on
+_captures: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def is_response_capture_enabled() -> bool:
+    """Capturing JSON responses is opt-in through `AMAZON_CAPTURE_JSON`."""
+    return os.getenv("AMAZON_CAPTURE_JSON", "false").lower() in {"1", "true", "yes"}
+
+
+class CapturedPayload(BaseModel):
+    schema_name: str
+    source_index: int
+    page_url: str
+    # The page load the response belongs to, see `ResponseCapture.on_request`
+    load: Optional[int] = None
+    payload: Any
+
+
+class ResponseCapture:
+    """
+    Keeps the JSON responses of a browser context that match a `json_sources` entry of an
+    extraction schema, so extraction can read the records from them instead of serializing
+    and parsing the rendered HTML.
+
+    Example:
+        capture = enable_response_capture(context)
+        await page.goto(cart_url)
+        captured = await capture.extract(load_schema("cart"), page)
+        if captured is None:
+            ...  # Fall back to the HTML
+    """
+
+    def __init__(self, schemas: Optional[List[ExtractionSchema]] = None, max_payloads: int = MAX_CAPTURED_PAYLOADS):
+        schemas = schemas if schemas is not None else list(load_schemas().values())
+        self._sources: List[Tuple[ExtractionSchema, int, JsonSource, re.Pattern]] = [
+            (schema, index, source, re.compile(source.url_pattern))
+            for schema in schemas
+            for index, source in enumerate(schema.json_sources)
+        ]
+        self._payloads: Deque[CapturedPayload] = deque(maxlen=max_payloads)
+        self._pending: Set[asyncio.Task] = set()
+        # The current load of each page, payloads of earlier loads are stale
+        self._loads: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._load_sequence = 0
+
+    def attach(self, target) -> None:
+        """Listen to the requests and responses of a page or a browser context."""
+        target.on("request", self.on_request)
+        target.on("response", self.on_response)
+
+    def on_request(self, request) -> None:
+        # A navigation of the main frame starts a new load of the page
+        if not request.is_navigation_request() or request.frame.parent_frame is not None:
+            return
+        self._load_sequence += 1
+        self._loads[request.frame.page] = self._load_sequence
+
+    def on_response(self, response) -> None:
+        matches = [
+            (schema, index)
+            for schema, index, _, pattern in self._sources
+            if pattern.search(response.url)
+        ]
+        if not matches:
+            return
+        # Tag the payload with the load now, the page may navigate while its body is read
+        page = response.frame.page
+        load = self._loads.get(page)
+        # Reading the body is asynchronous, track it so extraction can wait for it
+        task = asyncio.ensure_future(self._capture(response, page, load, matches))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def wait_idle(self, timeout: float = 5.0) -> None:
+        """Wait until the bodies of the matched responses have been read."""
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+
+    async def extract(self, schema: ExtractionSchema, page) -> Optional[Tuple[List[dict], Optional[str]]]:
+        """
+        Return the records and the link to the next page from the latest payload captured
+        for the schema on the current load of the page, or None if no payload with the records
+        was captured.
+        Payloads of earlier visits of the same URL are ignored.
+        """
+        await self.wait_idle()
+        load = self._loads.get(page)
+        for captured in reversed(self._payloads):
+            if (
+                captured.schema_name == schema.name
+                and captured.page_url == page.url
+                and captured.load == load
+            ):
+                source = schema.json_sources[captured.source_index]
+                # A matching endpoint without the records, e.g. a cart count, says nothing about them
+                if get_json_path(captured.payload, source.records) is None:
+                    continue
+                records = extract_json_records(captured.payload, schema, source)
+                next_page = get_json_path(captured.payload, source.next_page) if source.next_page else None
+                return records, next_page
+        return None
+
+    async def _capture(
+        self, response, page, load: Optional[int], matches: List[Tuple[ExtractionSchema, int]]
+    ) -> None:
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        try:
+            payload = await response.json()
+            page_url = page.url
+        except Exception as e:
+            logger.debug(f"Failed to capture the response of {response.url}: {e}")
+            return
+        for schema, index in matches:
+            self._payloads.append(
+                CapturedPayload(
+                    schema_name=schema.name, source_index=index, page_url=page_url, load=load, payload=payload
+                )
+            )
+
+
+def enable_response_capture(context) -> ResponseCapture:
+    """Capture the JSON responses of the browser context, returning its capture."""
+    capture = _captures.get(context)
+    if capture is None:
+        capture = ResponseCapture()
+        capture.attach(context)
+        _captures[context] = capture
+    return capture
+
+
+def get_response_capture(page) -> Optional[ResponseCapture]:
+    """Return the capture of the page's browser context, if capturing was enabled on it."""
+    return _captures.get(page.context)
@@ -0,0 +1,166 @@
+import os
+import time
+import weakref
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from app.amazon_web_agent.extraction.extraction_engine import (
+    ExtractionSchema,
+    extract_next_page,
+    extract_records,
+    is_empty_page,
+    parse_html,
+)
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Markers of pages that only a browser can get past
+INTERSTITIAL_MARKERS = [
+    "/errors/validateCaptcha",
+    "Type the characters you see in this image",
+    "Enter the characters you see below",
+]
+
+SIGN_IN_PATH = "/ap/signin"
+
+# The fetcher of every browser context, shared by the extractions of a run
+_fetchers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def is_http_fast_path_enabled() -> bool:
+    """The browser-free fast path is opt-in through `AMAZON_HTTP_FAST_PATH`."""
+    return os.getenv("AMAZON_HTTP_FAST_PATH", "false").lower() in {"1", "true", "yes"}
+
+
+class BrowserRequiredError(Exception):
+    """Raised when a page cannot be extracted without a browser."""
+
+
+class HttpFetcher:
+    """
+    Fetches pages with the session cookies of a signed-in Playwright context, without rendering.
+
+    A single pooled HTTP client is used for all requests, so the pages of a paginated
+    extraction reuse the same connections. Use `get_context_fetcher` to share the client
+    across the extractions of a run.
+
+    Example:
+        async with await HttpFetcher.from_context(context) as fetcher:
+            html, url = await fetcher.fetch(cart_url)
+    """
+
+    def __init__(
+        self,
+        cookies: List[dict],
+        user_agent: Optional[str] = None,
+        timeout: float = 15.0,
+        max_connections: int = 4,
+    ):
+        headers = {"Accept-Language": "en-US,en;q=0.9"}
+        if user_agent:
+            headers["User-Agent"] = user_agent
+        self._client = httpx.AsyncClient(
+            cookies=self._cookie_jar(cookies),
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    @classmethod
+    async def from_context(cls, context, **kwargs) -> "HttpFetcher":
+        """Create a fetcher with the cookies and user agent of the browser context."""
+        cookies = await context.cookies()
+        user_agent = None
+        if context.pages:
+            user_agent = await context.pages[0].evaluate("() => navigator.userAgent")
+        return cls(cookies, user_agent, **kwargs)
+
+    def set_cookies(self, cookies: List[dict]) -> None:
+        """Replace the session cookies, e.g. after signing in."""
+        self._client.cookies = self._cookie_jar(cookies)
+
+    @staticmethod
+    def _cookie_jar(cookies: List[dict]) -> httpx.Cookies:
+        jar = httpx.Cookies()
+        for cookie in cookies:
+            jar.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        return jar
+
+    async def __aenter__(self) -> "HttpFetcher":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def fetch(self, url: str) -> Tuple[str, str]:
+        """
+        Return the HTML and the final URL of the page, raising BrowserRequiredError if the
+        response is an error, a sign-in redirect or an interstitial.
+        """
+        start = time.perf_counter()
+        try:
+            response = await self._client.get(url)
+        except httpx.HTTPError as e:
+            raise BrowserRequiredError(f"Fetching {url} failed: {e}")
+        final_url = str(response.url)
+        logger.info(f"Fetched {url} without a browser in {time.perf_counter() - start:.2f}s")
+
+        if response.status_code != 200:
+            raise BrowserRequiredError(f"{url} returned status code {response.status_code}")
+        if urlparse(final_url).path.startswith(SIGN_IN_PATH):
+            raise BrowserRequiredError(f"{url} redirected to the sign-in page")
+        html = response.text
+        if any(marker in html for marker in INTERSTITIAL_MARKERS):
+            raise BrowserRequiredError(f"{url} returned an interstitial page")
+        return html, final_url
+
+
+async def get_context_fetcher(context) -> HttpFetcher:
+    """
+    Return the fetcher of the browser context with its current cookies, creating it on the
+    first extraction. It stays open until `close_context_fetchers` at the end of the run.
+    """
+    fetcher = _fetchers.get(context)
+    if fetcher is None:
+        fetcher = await HttpFetcher.from_context(context)
+        _fetchers[context] = fetcher
+    else:
+        # The run may have signed in since the last extraction
+        fetcher.set_cookies(await context.cookies())
+    return fetcher
+
+
+async def close_context_fetchers(contexts) -> None:
+    """Close the fetchers of the browser contexts, e.g. when the run ends."""
+    for context in list(contexts):
+        fetcher = _fetchers.pop(context, None)
+        if fetcher is not None:
+            await fetcher.close()
+
+
+class HttpPageSource:
+    """Reads extraction records from pages fetched without a browser."""
+
+    def __init__(self, fetcher: HttpFetcher):
+        self.fetcher = fetcher
+        self.url: Optional[str] = None
+        self._html: Optional[str] = None
+
+    async def load(self, url: str) -> None:
+        self._html, self.url = await self.fetcher.fetch(url)
+
+    async def records(self, schema: ExtractionSchema) -> Tuple[List[dict], Optional[str]]:
+        soup = parse_html(self._html)
+        records = extract_records(soup, schema)
+        # Without records or an empty state the content is probably rendered by scripts,
+        # or the selectors need the browser's fallback learning
+        if not records and not is_empty_page(soup, schema):
+            raise BrowserRequiredError(f"No {schema.name} records in the static HTML of {self.url}")
+        return records, extract_next_page(soup, schema)
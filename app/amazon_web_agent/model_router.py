@@ -0,0 +1,170 @@
+import json
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnablePassthrough
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from utils.chat_model_env_util import ChatModelUtil, ModelTier
+from utils.logger_util import LoggerUtil
+
+if TYPE_CHECKING:
+    from app.amazon_web_agent.token_budget import TokenBudget
+
+logger = LoggerUtil.get_logger()
+
+
+class ModelRouter:
+    """
+    Routes every model call of an agent to a model tier.
+
+    Each step (graph node or step type) uses the tier configured through `LLM_TIER_<STEP>`,
+    the small tier by default. A call on the small tier is escalated to the large tier when:
+    - the previous tool calls failed, or
+    - the small model's response is ambiguous: invalid or unknown tool calls, or neither
+      content nor tool calls.
+
+    A call can bind a subset of the tools, see `ToolSelector`. The tool schemas are serialized
+    once, and the runnable of each tier and subset is built once and reused.
+
+    Latency and token usage are accounted per tier and can be reported with `stats`. Every
+    call is also recorded in the run's `budget` if given, see `TokenBudget`.
+    """
+
+    def __init__(self, prompt, tools: List, budget: Optional["TokenBudget"] = None):
+        self.prompt = prompt
+        self.tools = tools
+        self.budget = budget
+        self.tool_names = {tool.name for tool in tools}
+        self._tool_schemas: Optional[Dict[str, dict]] = None
+        self._runnables: Dict[Tuple[ModelTier, Optional[Tuple[str, ...]]], Runnable] = {}
+        # Size of the serialized tool schemas sent with each call, by tool subset
+        self._schema_chars: Dict[Optional[Tuple[str, ...]], int] = {}
+        self._usage: Dict[ModelTier, dict] = {
+            tier: {
+                "calls": 0,
+                "escalations": 0,
+                "latency": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "tool_schema_chars": 0,
+            }
+            for tier in ModelTier
+        }
+        # Escalating only helps if the large tier is actually a different model
+        self._can_escalate = ChatModelUtil.get_model_kwargs(
+            ModelTier.SMALL
+        ) != ChatModelUtil.get_model_kwargs(ModelTier.LARGE)
+
+    @property
+    def tool_schemas(self) -> Dict[str, dict]:
+        """The serialized tool schemas by tool name."""
+        if self._tool_schemas is None:
+            self._tool_schemas = {tool.name: convert_to_openai_tool(tool) for tool in self.tools}
+        return self._tool_schemas
+
+    def get_runnable(self, tier: ModelTier, tool_names: Optional[Tuple[str, ...]] = None) -> Runnable:
+        """
+        Return the prompt and model runnable of the tier, using the tier's shared model, bound
+        to the named tools or to all tools.
+        """
+        key = (tier, tool_names)
+        if key not in self._runnables:
+            if tool_names is None:
+                schemas = list(self.tool_schemas.values())
+            else:
+                schemas = [self.tool_schemas[name] for name in tool_names]
+            self._schema_chars[tool_names] = sum(len(json.dumps(schema)) for schema in schemas)
+            self._runnables[key] = (
+                {"messages": RunnablePassthrough()}
+                | self.prompt
+                | ChatModelUtil.get_tier_llm(tier).bind_tools(schemas)
+            )
+        return self._runnables[key]
+
+    async def ainvoke(
+        self,
+        step: str,
+        messages: List[AnyMessage],
+        tool_names: Optional[Sequence[str]] = None,
+        downgrade: bool = False,
+    ) -> AIMessage:
+        """
+        Invoke the model of the step's tier, escalating to the large tier if needed.
+        Only the named tools are bound if given; the escalated call binds all tools.
+        With `downgrade`, e.g. when the run is low on budget, the small tier is used without escalations.
+        """
+        tool_names = tuple(tool_names) if tool_names is not None else None
+        tier = ModelTier.SMALL if downgrade else ChatModelUtil.get_step_tier(step)
+        can_escalate = self._can_escalate and not downgrade
+
+        if tier == ModelTier.SMALL and can_escalate and self._has_tool_error(messages):
+            logger.info(f"Escalating {step} to the large model after a tool error")
+            self._usage[ModelTier.LARGE]["escalations"] += 1
+            tier = ModelTier.LARGE
+
+        response = await self._ainvoke_tier(step, tier, messages, tool_names)
+
+        if tier == ModelTier.SMALL and can_escalate and self._is_ambiguous(response):
+            logger.info(f"Escalating {step} to the large model after an ambiguous response")
+            self._usage[ModelTier.LARGE]["escalations"] += 1
+            response = await self._ainvoke_tier(step, ModelTier.LARGE, messages)
+
+        return response
+
+    def stats(self) -> Dict[str, dict]:
+        """Return the number of calls, latency and token usage per tier."""
+        stats = {}
+        for tier, usage in self._usage.items():
+            if usage["calls"]:
+                stats[tier.value] = dict(
+                    usage, average_latency=usage["latency"] / usage["calls"]
+                )
+        return stats
+
+    async def _ainvoke_tier(
+        self,
+        step: str,
+        tier: ModelTier,
+        messages: List[AnyMessage],
+        tool_names: Optional[Tuple[str, ...]] = None,
+    ) -> AIMessage:
+        start = time.perf_counter()
+        response = await self.get_runnable(tier, tool_names).ainvoke(messages)
+        usage = self._usage[tier]
+        usage["calls"] += 1
+        usage["tool_schema_chars"] += self._schema_chars.get(tool_names, 0)
+        usage["latency"] += time.perf_counter() - start
+        input_tokens, output_tokens = get_token_usage(response)
+        usage["input_tokens"] += input_tokens
+        usage["output_tokens"] += output_tokens
+        if self.budget is not None:
+            self.budget.record_model_call(step, messages, response)
+        return response
+
+    @staticmethod
+    def _has_tool_error(messages: List[AnyMessage]) -> bool:
+        """Check whether any tool result since the last model response is an error."""
+        for message in reversed(messages):
+            if not isinstance(message, ToolMessage):
+                break
+            if str(message.content).startswith("Error"):
+                return True
+        return False
+
+    def _is_ambiguous(self, response: AIMessage) -> bool:
+        if getattr(response, "invalid_tool_calls", None):
+            return True
+        if any(call["name"] not in self.tool_names for call in response.tool_calls):
+            return True
+        return not response.content and not response.tool_calls
+
+
+def get_token_usage(response: AIMessage) -> tuple:
+    """Return the (input, output) token usage reported with a model response."""
+    usage_metadata: Optional[dict] = getattr(response, "usage_metadata", None)
+    if usage_metadata:
+        return usage_metadata.get("input_tokens", 0), usage_metadata.get("output_tokens", 0)
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
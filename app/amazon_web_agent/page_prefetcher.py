@@ -0,0 +1,188 @@
+import asyncio
+import os
+import re
+import time
+import weakref
+from typing import Dict, List, Optional, Sequence
+
+from langchain_community.tools.playwright.utils import aget_current_page
+from langchain_core.messages import AIMessage, AnyMessage
+
+from app.amazon_web_agent.extraction.extraction_engine import get_schema_for_info
+from app.amazon_web_agent.tools.search_products_tool import get_amazon_base_url
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Pages the requirement likely leads to, by the words that point to them
+PREDICTION_RULES = [
+    (re.compile(r"\bcart\b|\bbasket\b", re.IGNORECASE), "/gp/cart/view.html"),
+    (re.compile(r"\border|\bpurchase|\bbought\b", re.IGNORECASE), "/your-orders/orders"),
+    (re.compile(r"\baccount\b|\bprofile\b|\baddress", re.IGNORECASE), "/gp/css/homepage.html"),
+]
+
+# Pages swapped in by the prefetcher, with the status of their load, for `take_warm_page_status`
+_warm_pages: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def is_prefetch_enabled() -> bool:
+    """Prefetching is opt-in through `AMAZON_PREFETCH`."""
+    return os.getenv("AMAZON_PREFETCH", "false").lower() in {"1", "true", "yes"}
+
+
+def normalize_url(url: str) -> str:
+    return url.split("#", 1)[0].rstrip("/")
+
+
+def get_call_url(call: dict) -> Optional[str]:
+    """Return the URL a tool call loads, for navigations and extractions of a schema's page."""
+    if call["name"] == "navigate_browser":
+        return call["args"].get("url")
+    if call["name"] == "extract_content":
+        schema = get_schema_for_info(str(call["args"].get("info", "")))
+        if schema is not None and schema.url is not None:
+            return get_amazon_base_url() + schema.url
+    return None
+
+
+def take_warm_page_status(page, url: str) -> Optional[str]:
+    """
+    Return the status of the page's prefetched load if it is already on the URL, so that
+    navigating to it can be skipped. Each swapped-in page is only reported once.
+    """
+    warm = _warm_pages.get(page)
+    if warm is None or normalize_url(warm[0]) != normalize_url(url):
+        return None
+    del _warm_pages[page]
+    return warm[1]
+
+
+class WarmTab:
+    def __init__(self, url: str, page, task: asyncio.Task):
+        self.url = url
+        self.page = page
+        self.task = task
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self.finished_at = time.perf_counter()
+        # Retrieve the error of loads nobody waits for, e.g. tabs closed mid-load
+        if not task.cancelled():
+            task.exception()
+
+
+class PagePrefetcher:
+    """
+    Loads the pages the agent is likely to navigate to next while the model is deciding.
+
+    The Playwright tools act on the newest page of the first context, so background tabs
+    must never outlive the model call:
+    - `start` predicts the next URLs from the requirement, skipping pages the run already
+      visited, and loads them in new tabs of the current page's context, sharing its session.
+    - `resolve` runs once the model answered. If it navigates to or extracts from a prefetched
+      URL, that tab becomes the current page and the navigation returns at once. All other tabs
+      are closed.
+
+    `stats` reports the hit rate and the loads that were wasted.
+    """
+
+    def __init__(self, browser, requirement: str, max_tabs: int = 2):
+        self.browser = browser
+        self.requirement = requirement
+        self.max_tabs = max_tabs
+        self._tabs: List[WarmTab] = []
+        self._prefetched = 0
+        self._hits = 0
+        self._wasted = 0
+        self._saved_seconds = 0.0
+
+    def predict(self, messages: Sequence[AnyMessage], current_url: Optional[str] = None) -> List[str]:
+        """Predict the next URLs from the requirement and the pages the run already visited."""
+        visited = {normalize_url(current_url)} if current_url else set()
+        for message in messages:
+            for call in getattr(message, "tool_calls", None) or []:
+                if call["name"] == "navigate_browser" and call["args"].get("url"):
+                    visited.add(normalize_url(call["args"]["url"]))
+
+        base_url = get_amazon_base_url()
+        urls = []
+        for pattern, path in PREDICTION_RULES:
+            url = base_url + path
+            if pattern.search(self.requirement) and normalize_url(url) not in visited:
+                urls.append(url)
+        return urls[: self.max_tabs]
+
+    async def start(self, messages: Sequence[AnyMessage]) -> None:
+        """Start loading the predicted pages in background tabs."""
+        if not self.browser.contexts:
+            return
+        current_page = await aget_current_page(self.browser)
+        for url in self.predict(messages, current_page.url):
+            page = await current_page.context.new_page()
+            task = asyncio.create_task(page.goto(url))
+            self._tabs.append(WarmTab(url, page, task))
+            self._prefetched += 1
+
+    async def resolve(self, response: AIMessage) -> None:
+        """Swap in the tab the model loads, if it was prefetched, and close the others."""
+        if not self._tabs:
+            return
+        tabs, self._tabs = self._tabs, []
+
+        target = None
+        for call in response.tool_calls:
+            url = get_call_url(call)
+            if url is not None:
+                target = next((tab for tab in tabs if normalize_url(tab.url) == normalize_url(url)), None)
+                break
+
+        resolved_at = time.perf_counter()
+        status = None
+        if target is not None:
+            try:
+                load = await target.task
+                status = load.status if load else "unknown"
+            except Exception as e:
+                logger.info(f"Prefetching {target.url} failed: {e}")
+                target = None
+
+        for tab in tabs:
+            if tab is not target:
+                await self._close(tab)
+                self._wasted += 1
+
+        if target is not None:
+            # Close the page it replaces, so the warm tab is the newest page of the context
+            for page in list(target.page.context.pages):
+                if page is not target.page:
+                    await page.close()
+            _warm_pages[target.page] = (target.url, str(status))
+            self._hits += 1
+            # The part of the load that overlapped with the model call
+            self._saved_seconds += min(target.finished_at, resolved_at) - target.started_at
+            logger.info(f"Swapped in the prefetched page {target.url}")
+
+    async def close(self) -> None:
+        for tab in self._tabs:
+            await self._close(tab)
+            self._wasted += 1
+        self._tabs = []
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "prefetched": self._prefetched,
+            "hits": self._hits,
+            "wasted": self._wasted,
+            "hit_rate": self._hits / self._prefetched if self._prefetched else 0.0,
+            "saved_seconds": round(self._saved_seconds, 2),
+        }
+
+    @staticmethod
+    async def _close(tab: WarmTab) -> None:
+        tab.task.cancel()
+        try:
+            await tab.page.close()
+        except Exception as e:
+            logger.warning(f"Failed to close the prefetched tab {tab.url}: {e}")
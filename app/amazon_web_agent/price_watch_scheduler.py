@@ -0,0 +1,333 @@
+"""
+Refresh prices and availability of a watchlist of products with bounded concurrency.
+
+Usage:
+    python -m app.amazon_web_agent.price_watch_scheduler watchlist.json --rounds 1
+
+The watchlist is a JSON list of items such as `{"asin": "B000000001"}`, optionally with a
+`url` and a per-item `interval` in seconds.
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from langchain_core.pydantic_v1 import BaseModel
+
+from app.amazon_web_agent.extraction.commerce_dataset import append_changes
+from app.amazon_web_agent.extraction.extraction_engine import (
+    extract_records,
+    load_schema,
+)
+from app.amazon_web_agent.sync_engine import SyncChanges, SyncEngine
+from app.amazon_web_agent.tab_pool import TabPool
+from app.amazon_web_agent.tools.extract_content_tool import get_data_dir, save_changes
+from app.amazon_web_agent.tools.search_products_tool import (
+    fetch_page_html,
+    product_url,
+)
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+
+class WatchItem(BaseModel):
+    """A product on the watchlist."""
+
+    asin: str
+    # Defaults to the product detail page on the configured Amazon site
+    url: Optional[str] = None
+    # Refresh interval in seconds, overrides the scheduler default
+    interval: Optional[float] = None
+
+
+class PriceWatchScheduler:
+    """
+    Periodically refreshes the product pages of a watchlist.
+
+    Key steps:
+    - Due items are taken from a heap ordered by due time; items that changed recently are
+      refreshed first and on a shorter interval, and every interval is jittered so that
+      refreshes of a large watchlist spread out instead of arriving in waves.
+    - Due items are coalesced into batches, and each batch is refreshed in one of a fixed set
+      of reused browser contexts through a bounded tab pool.
+    - Every page load also takes a slot of its domain, so no domain sees more than its
+      concurrency cap across all contexts.
+    - The product pages are parsed with the `product` extraction schema and synced through
+      the sync engine, so only changed products are written to `data/`.
+    """
+
+    def __init__(
+        self,
+        browser,
+        items: List[WatchItem],
+        interval: float = 3600.0,
+        jitter: float = 0.1,
+        changed_interval_factor: float = 0.25,
+        recent_change_window: float = 86400.0,
+        batch_size: int = 25,
+        max_contexts: int = 2,
+        tabs_per_context: int = 4,
+        domain_concurrency: Optional[Dict[str, int]] = None,
+        default_domain_concurrency: int = 4,
+        account: str = "price_watch",
+        sync_engine: Optional[SyncEngine] = None,
+        write_changes: bool = True,
+    ):
+        self.browser = browser
+        self.interval = interval
+        self.jitter = jitter
+        self.changed_interval_factor = changed_interval_factor
+        self.recent_change_window = recent_change_window
+        self.batch_size = batch_size
+        self.max_contexts = max_contexts
+        self.tabs_per_context = tabs_per_context
+        self.domain_concurrency = domain_concurrency or {}
+        self.default_domain_concurrency = default_domain_concurrency
+        self.account = account
+        self.sync_engine = sync_engine or SyncEngine()
+        # Save the product changes of every round to data/
+        self.write_changes = write_changes
+
+        now = time.time()
+        self._items: Dict[str, WatchItem] = {item.asin: item for item in items}
+        self._last_changed: Dict[str, float] = {}
+        self._queue = [(now, asin) for asin in self._items]
+        heapq.heapify(self._queue)
+
+        self._contexts: List = []
+        self._domain_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._product_schema = load_schema("product")
+
+        # Metrics
+        self._checked = 0
+        self._errors = 0
+        self._changed = 0
+        self._lags: List[float] = []
+        self._started_at: Optional[float] = None
+        self._cpu_started_at: Optional[float] = None
+
+    def next_due_time(self) -> Optional[float]:
+        return self._queue[0][0] if self._queue else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[tuple]:
+        """Pop all due items as (asin, due) pairs, recently changed items first."""
+        now = now if now is not None else time.time()
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            due_time, asin = heapq.heappop(self._queue)
+            due.append((asin, due_time))
+        due.sort(key=lambda entry: (not self._recently_changed(entry[0], now), entry[1]))
+        return due
+
+    def reschedule(self, asin: str, now: Optional[float] = None) -> float:
+        """Schedule the next refresh of the item with a jittered interval and return its due time."""
+        now = now if now is not None else time.time()
+        interval = self._items[asin].interval or self.interval
+        if self._recently_changed(asin, now):
+            interval *= self.changed_interval_factor
+        interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        due_time = now + interval
+        heapq.heappush(self._queue, (due_time, asin))
+        return due_time
+
+    async def run_round(self) -> int:
+        """Refresh all due items once and return the number of refreshed items."""
+        self._start_clock()
+        due = self.pop_due()
+        if not due:
+            return 0
+
+        batches = [due[i : i + self.batch_size] for i in range(0, len(due), self.batch_size)]
+
+        # Each context refreshes one batch at a time
+        contexts = asyncio.Queue()
+        for context in await self._get_contexts():
+            contexts.put_nowait(context)
+
+        async def run_batch(batch):
+            context = await contexts.get()
+            try:
+                return await self._refresh_batch(context, batch)
+            finally:
+                contexts.put_nowait(context)
+
+        try:
+            results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+            # Write the products through the sync engine once per round
+            records = {asin: record for batch_records in results for asin, record in batch_records.items()}
+            changes = self.sync_engine.sync_incremental(self.account, "products", records)
+            self._apply_changes(changes)
+        finally:
+            # The due items were popped, a failed round must not drop them from the watch
+            now = time.time()
+            for asin, _ in due:
+                self.reschedule(asin, now)
+        return len(due)
+
+    async def run(self, rounds: Optional[int] = None, duration: Optional[float] = None) -> None:
+        """Keep refreshing due items until the number of rounds or the duration is reached."""
+        self._start_clock()
+        deadline = time.time() + duration if duration else None
+        completed = 0
+        while rounds is None or completed < rounds:
+            if await self.run_round():
+                completed += 1
+                logger.info(f"Price watch stats: {self.stats()}")
+            next_due = self.next_due_time()
+            if next_due is None or (deadline and next_due > deadline):
+                break
+            await asyncio.sleep(max(0.0, next_due - time.time()))
+
+    def stats(self) -> dict:
+        """Return throughput and freshness lag metrics."""
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        cpu_elapsed = time.process_time() - self._cpu_started_at if self._cpu_started_at else 0.0
+        lags = sorted(self._lags)
+
+        def percentile(p: float) -> float:
+            return lags[min(len(lags) - 1, int(p * len(lags)))] if lags else 0.0
+
+        return {
+            "checked": self._checked,
+            "changed": self._changed,
+            "errors": self._errors,
+            "items_per_minute": self._checked / elapsed * 60 if elapsed else 0.0,
+            # Items per minute of CPU time used by this process, i.e. per fully used core
+            "items_per_minute_per_core": self._checked / cpu_elapsed * 60 if cpu_elapsed else 0.0,
+            "freshness_lag_p50": percentile(0.5),
+            "freshness_lag_p95": percentile(0.95),
+            "freshness_lag_max": lags[-1] if lags else 0.0,
+        }
+
+    async def close(self) -> None:
+        contexts, self._contexts = self._contexts, []
+        for context in contexts:
+            await context.close()
+        self.sync_engine.close()
+
+    async def _refresh_batch(self, context, batch: List[tuple]) -> Dict[str, dict]:
+        async with TabPool(context, size=self.tabs_per_context) as pool:
+            results = await asyncio.gather(
+                *(self._refresh_item(pool, asin, due_time) for asin, due_time in batch)
+            )
+        return {record["asin"]: record for record in results if record is not None}
+
+    async def _refresh_item(self, pool: TabPool, asin: str, due_time: float) -> Optional[dict]:
+        url = self._items[asin].url or product_url(asin)
+        async with self._domain_semaphore(urlparse(url).netloc):
+            # How late the refresh starts compared to its schedule
+            self._lags.append(max(0.0, time.time() - due_time))
+            try:
+                html = await fetch_page_html(pool, url)
+            except Exception as e:
+                self._errors += 1
+                logger.warning(f"Failed to refresh {asin}: {e}")
+                return None
+
+        records = extract_records(html, self._product_schema)
+        record = records[0] if records else {}
+        # A captcha or a page that is not a product, syncing it would blank the product
+        if record.get("title") in (None, "", "N/A") and not record.get("price"):
+            self._errors += 1
+            logger.warning(f"Failed to refresh {asin}: {url} is not a product page")
+            return None
+
+        self._checked += 1
+        record["asin"] = asin
+        return record
+
+    def _apply_changes(self, changes: SyncChanges) -> None:
+        now = time.time()
+        for change in changes.changed:
+            self._last_changed[change["key"]] = now
+        self._changed += len(changes.changed)
+        if changes.has_changes and self.write_changes:
+            file_path = save_changes(changes, "products_changes")
+            logger.info(f"Product changes ({changes.summary()}) saved to {file_path}")
+            # The typed dataset is secondary to the JSON file, a failure must not stop the watch
+            try:
+                append_changes(changes.dict(), self._product_schema, get_data_dir(), file_path)
+            except Exception as e:
+                logger.error(f"Failed to append the product changes to the dataset: {e}")
+
+    def _recently_changed(self, asin: str, now: float) -> bool:
+        last_changed = self._last_changed.get(asin)
+        return last_changed is not None and now - last_changed <= self.recent_change_window
+
+    def _domain_semaphore(self, domain: str) -> asyncio.Semaphore:
+        if domain not in self._domain_semaphores:
+            self._domain_semaphores[domain] = asyncio.Semaphore(
+                self.domain_concurrency.get(domain, self.default_domain_concurrency)
+            )
+        return self._domain_semaphores[domain]
+
+    async def _get_contexts(self) -> List:
+        while len(self._contexts) < self.max_contexts:
+            self._contexts.append(await self.browser.new_context())
+        return self._contexts
+
+    def _start_clock(self) -> None:
+        if self._started_at is None:
+            self._started_at = time.time()
+            self._cpu_started_at = time.process_time()
+
+
+def load_watchlist(path: str) -> List[WatchItem]:
+    with open(path, encoding="utf-8") as f:
+        return [WatchItem.parse_obj(item) for item in json.load(f)]
+
+
+async def run_price_watch(
+    watchlist_path: str, rounds: Optional[int], duration: Optional[float], **kwargs
+) -> dict:
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        scheduler = PriceWatchScheduler(browser, load_watchlist(watchlist_path), **kwargs)
+        try:
+            await scheduler.run(rounds=rounds, duration=duration)
+        finally:
+            await scheduler.close()
+            await browser.close()
+        return scheduler.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Refresh the prices of a watchlist.")
+    parser.add_argument("watchlist", help="JSON file with the watchlist")
+    parser.add_argument("--rounds", type=int, default=None)
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run")
+    parser.add_argument("--interval", type=float, default=3600.0, help="Seconds between refreshes")
+    parser.add_argument("--contexts", type=int, default=2)
+    parser.add_argument("--tabs", type=int, default=4, help="Tabs per context")
+    parser.add_argument(
+        "--domain-concurrency",
+        type=int,
+        default=int(os.getenv("PRICE_WATCH_DOMAIN_CONCURRENCY", 4)),
+    )
+    args = parser.parse_args()
+
+    stats = asyncio.run(
+        run_price_watch(
+            args.watchlist,
+            args.rounds,
+            args.duration,
+            interval=args.interval,
+            max_contexts=args.contexts,
+            tabs_per_context=args.tabs,
+            default_domain_concurrency=args.domain_concurrency,
+        )
+    )
+    print(json.dumps(stats, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Default location of the persisted selector state
+DEFAULT_REGISTRY_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "selector_registry.json")
+)
+
+# Ordered fallback chains per page type and field. The first entry is the layout we
+# currently see most often, later entries cover the layouts Amazon A/B tests.
+DEFAULT_SELECTORS: Dict[str, Dict[str, List[str]]] = {
+    "captcha": {
+        "image": ['img[src*="captcha"]', "form[action*='validateCaptcha'] img"],
+        "input": ['input[name="field-keywords"]', "input#captchacharacters"],
+        "submit": [
+            'span.a-button-inner > button[type="submit"]',
+            "form[action*='validateCaptcha'] button",
+        ],
+    },
+    "sign_in": {
+        "account_link": [
+            "a#nav-link-accountList",
+            "#nav-link-accountList-nav-line-1",
+            "a[data-nav-role='signin']",
+            "#nav-signin-tooltip a.nav-action-signin-button",
+        ],
+        "email": ["input[name='email']", "input#ap_email", "input[type='email']"],
+        "continue": ["input[id='continue']", "#continue input", "span#continue"],
+        "password": ["input[name='password']", "input#ap_password"],
+        "submit": ["input[id='signInSubmit']", "#signInSubmit input", "#auth-signin-button"],
+    },
+    "cart": {
+        "item": [
+            "#activeCartViewForm .sc-list-item",
+            "#sc-active-cart .sc-list-item",
+            "div[data-name='Active Items'] div[data-asin]",
+        ],
+        "title": [
+            ".sc-grid-item-product-title .a-truncate-full",
+            ".sc-product-title .a-truncate-full",
+            ".sc-product-title",
+            "a.sc-product-link",
+        ],
+        "price": [
+            ".sc-product-price",
+            ".sc-item-price-block .a-offscreen",
+            ".sc-badge-price-to-pay .a-offscreen",
+        ],
+        "quantity": [
+            ".sc-action-quantity input",
+            "select[name='quantity'] option[selected]",
+            ".sc-quantity-textfield",
+        ],
+        "empty_cart": [".sc-your-amazon-cart-is-empty", "#sc-empty-cart"],
+    },
+    "order_history": {
+        "order": [".order-card", ".js-order-card", "#ordersContainer .order"],
+        "order_id": [
+            ".yohtmlc-order-id span[dir='ltr']",
+            ".yohtmlc-order-id bdi",
+            ".order-header .a-span4 .value",
+        ],
+        "order_date": [
+            ".order-header__header-list-item .a-size-base",
+            ".order-header .a-span3 .value",
+        ],
+        "total": [".yohtmlc-order-total .value", ".order-header .a-span2 .value"],
+        "status": [
+            ".delivery-box__primary-text",
+            ".yohtmlc-shipment-status-primaryText",
+            ".shipment .a-color-success",
+        ],
+        "item_title": [
+            ".yohtmlc-product-title",
+            ".yohtmlc-item a.a-link-normal",
+        ],
+        "next_page": [".a-pagination li.a-last a", "ul.a-pagination a[aria-label*='Next']"],
+        "no_orders": [".your-orders-content-empty", "#ordersContainer .a-text-center .a-size-medium"],
+    },
+    "search": {
+        "result": [
+            "div[data-component-type='s-search-result'][data-asin]",
+            "div.s-result-item[data-asin]",
+        ],
+        "title": ["h2 a span", "h2 span", "[data-cy='title-recipe'] h2"],
+        "link": ["h2 a", "a.a-link-normal.s-no-outline", "[data-cy='title-recipe'] a"],
+        "price": [".a-price:not(.a-text-price) .a-offscreen", ".a-price .a-offscreen"],
+        "rating": ["i.a-icon-star-small .a-icon-alt", ".a-icon-star-mini .a-icon-alt", ".a-icon-alt"],
+        "reviews": [
+            "[data-csa-c-content-id*='customer-reviews'] .s-underline-text",
+            "a[href*='customerReviews'] span",
+        ],
+    },
+    "product": {
+        "asin": ["input#ASIN", "input[name='ASIN']", "#ASIN"],
+        "title": ["#productTitle", "#title"],
+        "price": [
+            "#corePrice_feature_div .a-price .a-offscreen",
+            "#corePriceDisplay_desktop_feature_div .a-price .a-offscreen",
+            "#priceblock_ourprice",
+            "#price_inside_buybox",
+        ],
+        "rating": ["#acrPopover", "#averageCustomerReviews .a-icon-alt"],
+        "reviews": ["#acrCustomerReviewText"],
+        "availability": ["#availability span", "#availability", "#outOfStock"],
+    },
+}
+
+
+class SelectorRegistry:
+    """
+    Registry of ordered CSS selector fallback chains per page type and field.
+
+    The registry remembers which variant matched last for every field and tries that
+    winner first on the next lookup, so a layout change only costs extra probing once.
+    Hit counts per selector are kept for monitoring and persisted together with the
+    winners, so the learned order survives restarts.
+
+    Key steps:
+    - `candidates` returns the chain for a field with the last winner moved to the front.
+    - `select_one` / `select` resolve a field on a BeautifulSoup tree.
+    - `aresolve` resolves a field on a live Playwright page and returns the matched selector.
+    - `save` persists winners and statistics to `data/selector_registry.json`.
+    """
+
+    _registry = None
+
+    def __init__(
+        self,
+        selectors: Optional[Dict[str, Dict[str, List[str]]]] = None,
+        path: Optional[str] = None,
+    ):
+        self.selectors = selectors or DEFAULT_SELECTORS
+        self.path = path or DEFAULT_REGISTRY_PATH
+        self._lock = threading.Lock()
+        # {page_type: {field: {"winner": str, "lookups": int, "misses": int, "first_try_hits": int, "hits": {selector: int}}}}
+        self._state: Dict[str, Dict[str, dict]] = {}
+        self._load()
+
+    @classmethod
+    def get_registry(cls) -> "SelectorRegistry":
+        if cls._registry is None:
+            cls._registry = SelectorRegistry()
+        return cls._registry
+
+    def candidates(self, page_type: str, field: str) -> List[str]:
+        """Return the fallback chain for the field, with the last winner first."""
+        try:
+            chain = self.selectors[page_type][field]
+        except KeyError:
+            raise ValueError(f"Unknown selector field: {page_type}.{field}")
+
+        winner = self._field_state(page_type, field).get("winner")
+        if winner in chain and chain[0] != winner:
+            return [winner] + [selector for selector in chain if selector != winner]
+        return list(chain)
+
+    def select_one(self, root, page_type: str, field: str):
+        """Return the first element matching the field on a BeautifulSoup tree, or None."""
+        for index, selector in enumerate(self.candidates(page_type, field)):
+            element = root.select_one(selector)
+            if element is not None:
+                self.record_hit(page_type, field, selector, index)
+                return element
+        self.record_miss(page_type, field)
+        return None
+
+    def select(self, root, page_type: str, field: str) -> list:
+        """Return all elements matching the first matching variant of the field on a BeautifulSoup tree."""
+        for index, selector in enumerate(self.candidates(page_type, field)):
+            elements = root.select(selector)
+            if elements:
+                self.record_hit(page_type, field, selector, index)
+                return elements
+        self.record_miss(page_type, field)
+        return []
+
+    async def aresolve(
+        self, page, page_type: str, field: str, timeout: float = 30000
+    ) -> str:
+        """
+        Wait until any variant of the field is attached to the Playwright page and return the matched selector.
+
+        All variants are awaited with a single selector list, so a missing variant never costs a timeout.
+        """
+        chain = self.candidates(page_type, field)
+        try:
+            await page.wait_for_selector(", ".join(chain), state="attached", timeout=timeout)
+        except Exception:
+            self.record_miss(page_type, field)
+            raise
+        for index, selector in enumerate(chain):
+            if await page.query_selector(selector) is not None:
+                self.record_hit(page_type, field, selector, index)
+                return selector
+        # The element went away between the wait and the lookup, fall back to the first variant
+        return chain[0]
+
+    def record_hit(self, page_type: str, field: str, selector: str, index: int = 0) -> None:
+        with self._lock:
+            field_state = self._field_state(page_type, field)
+            field_state["lookups"] += 1
+            field_state["hits"][selector] = field_state["hits"].get(selector, 0) + 1
+            if index == 0:
+                field_state["first_try_hits"] += 1
+            if field_state.get("winner") != selector:
+                logger.info(f"Selector for {page_type}.{field} switched to {selector}")
+                field_state["winner"] = selector
+
+    def record_miss(self, page_type: str, field: str) -> None:
+        with self._lock:
+            field_state = self._field_state(page_type, field)
+            field_state["lookups"] += 1
+            field_state["misses"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, dict]]:
+        """Return the hit-rate statistics per page type and field."""
+        with self._lock:
+            stats = {}
+            for page_type, fields in self._state.items():
+                for field, field_state in fields.items():
+                    lookups = field_state["lookups"] or 1
+                    stats.setdefault(page_type, {})[field] = {
+                        "winner": field_state.get("winner"),
+                        "lookups": field_state["lookups"],
+                        "hit_rate": 1 - field_state["misses"] / lookups,
+                        "first_try_hit_rate": field_state["first_try_hits"] / lookups,
+                        "hits": dict(field_state["hits"]),
+                    }
+            return stats
+
+    def save(self) -> None:
+        """Persist winners and statistics, replacing the file atomically."""
+        with self._lock:
+            data = json.dumps(self._state, indent=4)
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def _field_state(self, page_type: str, field: str) -> dict:
+        return self._state.setdefault(page_type, {}).setdefault(
+            field, {"winner": None, "lookups": 0, "misses": 0, "first_try_hits": 0, "hits": {}}
+        )
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._state = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load selector registry from {self.path}: {e}")
+            self._state = {}
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from langchain_core.pydantic_v1 import BaseModel, Field
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Default location of the local sync store
+DEFAULT_SYNC_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "sync_state.sqlite3")
+)
+
+
+def canonical_record(value):
+    """
+    The record with its numbers as strings, so a field that became typed (e.g. "2" read as 2)
+    is not reported as a change of the records stored before.
+    """
+    if isinstance(value, dict):
+        return {key: canonical_record(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [canonical_record(item) for item in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+class SyncChanges(BaseModel):
+    """The delta between the stored state and a freshly extracted state."""
+
+    kind: str
+    added: List[dict] = Field(default_factory=list)
+    removed: List[dict] = Field(default_factory=list)
+    changed: List[dict] = Field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, "
+            f"{len(self.changed)} changed"
+        )
+
+
+class SyncEngine:
+    """
+    Keeps the latest known state of cart items and orders in a compact SQLite store and
+    reports only what changed between two extractions.
+
+    Records are keyed by a stable identifier (ASIN for cart items, order ID for orders) and
+    stored together with a hash of their content, so comparing a new extraction against the
+    stored state only needs the keys and hashes, and only changed rows are written back.
+
+    Key steps:
+    - `sync_snapshot` treats the records as the complete state (e.g. the shopping cart) and
+      reports additions, removals and changes.
+    - `sync_incremental` treats the records as a partial view (e.g. the newest pages of the
+      order history) and never reports removals.
+    - `get_high_water_mark` / `set_high_water_mark` remember the newest record seen, so that
+      paginated extractions can stop as soon as they reach already-synced data.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or DEFAULT_SYNC_DB_PATH
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                account TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (account, kind, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS high_water_marks (
+                account TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (account, kind)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def sync_snapshot(
+        self, account: str, kind: str, records: Dict[str, dict]
+    ) -> SyncChanges:
+        """Sync the complete state of `kind`; keys missing from `records` are removed."""
+        return self._sync(account, kind, records, full=True)
+
+    def sync_incremental(
+        self, account: str, kind: str, records: Dict[str, dict]
+    ) -> SyncChanges:
+        """Sync a partial view of `kind`; keys missing from `records` are left untouched."""
+        return self._sync(account, kind, records, full=False)
+
+    def get_records(self, account: str, kind: str) -> Dict[str, dict]:
+        """Return the stored state of `kind` for the account."""
+        rows = self._conn.execute(
+            "SELECT key, data FROM records WHERE account = ? AND kind = ?",
+            (account, kind),
+        )
+        return {key: json.loads(data) for key, data in rows}
+
+    def get_high_water_mark(self, account: str, kind: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT key FROM high_water_marks WHERE account = ? AND kind = ?",
+            (account, kind),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_high_water_mark(self, account: str, kind: str, key: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO high_water_marks VALUES (?, ?, ?, ?)",
+                (account, kind, key, datetime.now().isoformat()),
+            )
+
+    def _sync(
+        self, account: str, kind: str, records: Dict[str, dict], full: bool
+    ) -> SyncChanges:
+        changes = SyncChanges(kind=kind)
+
+        # Only keys and hashes are needed to detect what changed
+        stored_hashes = dict(
+            self._conn.execute(
+                "SELECT key, hash FROM records WHERE account = ? AND kind = ?",
+                (account, kind),
+            )
+        )
+
+        now = datetime.now().isoformat()
+        upserts = []
+        for key, record in records.items():
+            data = json.dumps(record, ensure_ascii=False, sort_keys=True)
+            record_hash = hashlib.sha1(data.encode("utf-8")).hexdigest()
+            stored_hash = stored_hashes.get(key)
+            if stored_hash == record_hash:
+                continue
+            if stored_hash is None:
+                changes.added.append(record)
+            else:
+                before = self._get_record(account, kind, key)
+                # Only the representation changed, store the record without reporting it
+                if canonical_record(before) != canonical_record(record):
+                    changes.changed.append({"key": key, "before": before, "after": record})
+            upserts.append((account, kind, key, record_hash, data, now))
+
+        removed_keys = []
+        if full:
+            removed_keys = [key for key in stored_hashes if key not in records]
+            changes.removed = [
+                self._get_record(account, kind, key) for key in removed_keys
+            ]
+
+        if upserts or removed_keys:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)", upserts
+                )
+                self._conn.executemany(
+                    "DELETE FROM records WHERE account = ? AND kind = ? AND key = ?",
+                    [(account, kind, key) for key in removed_keys],
+                )
+
+        logger.info(f"Synced {kind} for {account}: {changes.summary()}")
+        return changes
+
+    def _get_record(self, account: str, kind: str, key: str) -> dict:
+        row = self._conn.execute(
+            "SELECT data FROM records WHERE account = ? AND kind = ? AND key = ?",
+            (account, kind, key),
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Resource types that are never needed to read the HTML of a page
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+
+class TabPool:
+    """
+    A bounded pool of tabs (pages) in one browser context.
+
+    The tabs share the context's cookies, so they are signed in whenever the context is.
+    At most `size` tabs are open at a time; tabs are reused between fetches and closed
+    when the pool is closed, so the context's current page is the same as before.
+
+    Example:
+        async with TabPool(context, size=4) as pool:
+            async with pool.page() as page:
+                await page.goto(url)
+    """
+
+    def __init__(self, context, size: int = 4, block_resources: bool = True):
+        if size < 1:
+            raise ValueError("The tab pool size must be at least 1.")
+        self.context = context
+        self.size = size
+        self.block_resources = block_resources
+        self._pages: List = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def __aenter__(self) -> "TabPool":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a tab from the pool, opening a new one if none is idle."""
+        async with self._semaphore:
+            page = self._idle.get_nowait() if not self._idle.empty() else await self._new_page()
+            try:
+                yield page
+            finally:
+                self._idle.put_nowait(page)
+
+    async def close(self) -> None:
+        pages, self._pages = self._pages, []
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for page in pages:
+            try:
+                await page.close()
+            except Exception as e:
+                logger.warning(f"Failed to close pooled tab: {e}")
+
+    async def _new_page(self):
+        page = await self.context.new_page()
+        if self.block_resources:
+            await page.route("**/*", self._block_resource)
+        self._pages.append(page)
+        return page
+
+    @staticmethod
+    async def _block_resource(route) -> None:
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
@@ -0,0 +1,197 @@
+import json
+import os
+from enum import Enum
+from typing import Dict, List, Optional, Sequence
+
+from langchain_community.callbacks.openai_info import get_openai_token_cost_for_model
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+from app.amazon_web_agent.model_router import get_token_usage
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Shares of the budget at which the run trims its history and switches to the small model
+TRIM_AT = 0.5
+DOWNGRADE_AT = 0.75
+
+# Content of the tool outputs trimmed from the history
+TRIMMED_CONTENT = "[Output trimmed to stay within the run's token budget]"
+
+_encoding = None
+
+
+def get_token_budget() -> Optional[int]:
+    """The token budget of a run, set through `AGENT_TOKEN_BUDGET`."""
+    budget = os.getenv("AGENT_TOKEN_BUDGET")
+    return int(budget) if budget else None
+
+
+def get_cost_budget() -> Optional[float]:
+    """The cost budget of a run in USD, set through `AGENT_COST_BUDGET`."""
+    budget = os.getenv("AGENT_COST_BUDGET")
+    return float(budget) if budget else None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text with tiktoken, or estimate them if it is not available."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Estimating token counts, tiktoken is not available: {e}")
+            _encoding = False
+    if _encoding is False:
+        return len(text) // 4
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: Sequence[AnyMessage]) -> int:
+    tokens = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        tokens += count_tokens(content)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += count_tokens(json.dumps([call["args"] for call in message.tool_calls]))
+    return tokens
+
+
+def get_cost(response: AIMessage, input_tokens: int, output_tokens: int) -> float:
+    """The cost of a response in USD, 0 for models without a known price."""
+    model_name = (getattr(response, "response_metadata", None) or {}).get("model_name")
+    if not model_name:
+        return 0.0
+    try:
+        return get_openai_token_cost_for_model(model_name, input_tokens) + get_openai_token_cost_for_model(
+            model_name, output_tokens, is_completion=True
+        )
+    except ValueError:
+        return 0.0
+
+
+class BudgetAction(str, Enum):
+    NONE = "none"
+    TRIM = "trim"
+    DOWNGRADE = "downgrade"
+    STOP = "stop"
+
+
+class TokenBudget:
+    """
+    Accounts the tokens and cost of one run and enforces its budgets.
+
+    Prompt and completion tokens are taken from the usage reported with each model response,
+    or counted locally when the model reports none. They are totalled per node. The output of
+    each tool is counted as well, since it is sent with the following prompts.
+
+    As the run uses up its token or cost budget, `action` tells the agent to:
+    - trim the older tool outputs from the history (from `TRIM_AT` of the budget),
+    - also switch to the small model, without escalations (from `DOWNGRADE_AT`),
+    - stop with a final answer once the budget is used up.
+
+    Example:
+        budget = TokenBudget(max_tokens=50000)
+        if budget.action() == BudgetAction.STOP:
+            return {"messages": messages + [budget.stop_message()]}
+        response = await model_router.ainvoke("agent_node", budget.trim(messages))
+        budget.record_model_call("agent_node", messages, response)
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.by_node: Dict[str, Dict[str, int]] = {}
+        self.by_tool: Dict[str, Dict[str, int]] = {}
+        self.actions: Dict[str, int] = {}
+        self._stopped = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def used(self) -> float:
+        """The share of the budget used, the larger of the token and cost shares."""
+        shares = [0.0]
+        if self.max_tokens:
+            shares.append(self.total_tokens / self.max_tokens)
+        if self.max_cost:
+            shares.append(self.cost / self.max_cost)
+        return max(shares)
+
+    def action(self) -> BudgetAction:
+        used = self.used()
+        if used >= 1.0:
+            action = BudgetAction.STOP
+        elif used >= DOWNGRADE_AT:
+            action = BudgetAction.DOWNGRADE
+        elif used >= TRIM_AT:
+            action = BudgetAction.TRIM
+        else:
+            return BudgetAction.NONE
+        self.actions[action.value] = self.actions.get(action.value, 0) + 1
+        return action
+
+    def record_model_call(self, node: str, messages: Sequence[AnyMessage], response: AIMessage) -> None:
+        input_tokens, output_tokens = get_token_usage(response)
+        if not input_tokens and not output_tokens:
+            input_tokens = count_message_tokens(messages)
+            output_tokens = count_message_tokens([response])
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost += get_cost(response, input_tokens, output_tokens)
+
+        usage = self.by_node.setdefault(node, {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+        usage["calls"] += 1
+        usage["input_tokens"] += input_tokens
+        usage["output_tokens"] += output_tokens
+
+    def record_tool_outputs(self, call_message: AIMessage, tool_messages: Sequence[ToolMessage]) -> None:
+        names = {call["id"]: call["name"] for call in call_message.tool_calls}
+        for message in tool_messages:
+            name = names.get(message.tool_call_id) or message.name or "unknown"
+            usage = self.by_tool.setdefault(name, {"calls": 0, "output_tokens": 0})
+            usage["calls"] += 1
+            usage["output_tokens"] += count_message_tokens([message])
+
+    def trim(self, messages: Sequence[AnyMessage]) -> List[AnyMessage]:
+        """Replace the tool outputs before the last model response with a short placeholder."""
+        last_ai_index = max(
+            (index for index, message in enumerate(messages) if isinstance(message, AIMessage)),
+            default=-1,
+        )
+        result = list(messages)
+        for index in range(last_ai_index):
+            message = result[index]
+            if isinstance(message, ToolMessage) and message.content != TRIMMED_CONTENT:
+                result[index] = message.copy(update={"content": TRIMMED_CONTENT})
+        return result
+
+    def stop_message(self) -> AIMessage:
+        """The final answer of a run that used up its budget."""
+        if not self._stopped:
+            self._stopped = True
+            logger.warning(f"Stopping the run after {self.total_tokens} tokens (${self.cost:.4f})")
+        return AIMessage(
+            content=(
+                "I stopped before completing the request because the run used up its budget "
+                f"({self.total_tokens} tokens). Please narrow the request or try again later."
+            )
+        )
+
+    def stats(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost": round(self.cost, 4),
+            "max_tokens": self.max_tokens,
+            "max_cost": self.max_cost,
+            "by_node": self.by_node,
+            "by_tool": self.by_tool,
+            "actions": self.actions,
+        }
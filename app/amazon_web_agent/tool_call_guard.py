@@ -0,0 +1,152 @@
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.prebuilt import ToolNode
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Tools that only read the current page, their results stay valid until the page changes
+READ_ONLY_TOOLS = {
+    "current_webpage",
+    "extract_hyperlinks",
+    "extract_text",
+    "get_elements",
+    "snapshot_page",
+}
+
+# Tools that change the current page
+PAGE_CHANGING_TOOLS = {
+    "act_on_element",
+    "click_element",
+    "extract_content",
+    "navigate_browser",
+    "previous_webpage",
+}
+
+# Navigating again to the page the browser is on is a no-op, so its result can be reused too
+CACHEABLE_TOOLS = READ_ONLY_TOOLS | {"navigate_browser"}
+
+CACHED_NOTE = "(Reused result: the page has not changed since the same call.)"
+
+CORRECTION_TEMPLATE = (
+    "Error: '{name}' was already called with the same arguments {repeats} times in a row "
+    "and the page did not change. Do not repeat it. Use the previous result, try a different "
+    "tool, or give your final answer."
+)
+
+STOP_MESSAGE = (
+    "I stopped because the same actions kept being repeated without progress. "
+    "Please rephrase the request or try again later."
+)
+
+
+class ToolCallGuard:
+    """
+    Runs the tool calls of a run, reusing results and cutting off loops.
+
+    Key steps:
+    - Results of read-only tools, and of navigating to the page the browser is already on,
+      are cached per run under the tool name, its arguments and the page state. The page
+      state is a version that every page-changing tool call bumps, so a result is only
+      reused while the page is unchanged.
+    - If the model makes the same tool calls `max_repeats` times in a row on the same page,
+      they are not run; the model gets a corrective error instead. After `max_corrections`
+      corrections the run is ended with a final message, see `stopped`. The page is told by
+      `get_page_state`, e.g. the current URL, so repeating "Next" through the pages of a
+      listing is not taken for a loop.
+
+    Example:
+        guard = ToolCallGuard(ToolNode(tools), get_page_state=lambda: get_current_url(browser))
+        workflow.add_node("tool_node", guard.ainvoke)
+    """
+
+    def __init__(
+        self,
+        tool_node: ToolNode,
+        max_repeats: int = 3,
+        max_corrections: int = 2,
+        get_page_state: Optional[Callable[[], Optional[str]]] = None,
+    ):
+        self.tool_node = tool_node
+        self.get_page_state = get_page_state
+        self.max_repeats = max_repeats
+        self.max_corrections = max_corrections
+        self.stopped = False
+        self._page_version = 0
+        self._cache: Dict[Tuple[str, str, int], str] = {}
+        self._last_calls: Optional[Tuple[List[Tuple[str, str]], Optional[str]]] = None
+        self._repeats = 0
+        self.stats = {"executed": 0, "cached": 0, "corrections": 0}
+
+    async def ainvoke(self, state: dict) -> dict:
+        message: AIMessage = state["messages"][-1]
+        calls = [(call["name"], self._arguments_key(call["args"])) for call in message.tool_calls]
+
+        # The same calls on another page, e.g. the next page of a listing, are progress
+        page_state = self.get_page_state() if self.get_page_state is not None else None
+        self._repeats = self._repeats + 1 if (calls, page_state) == self._last_calls else 1
+        self._last_calls = (calls, page_state)
+        if self._repeats >= self.max_repeats:
+            return {"messages": self._correct(message)}
+
+        results: Dict[str, ToolMessage] = {}
+        to_run = []
+        for call, (name, arguments) in zip(message.tool_calls, calls):
+            cached = self._cache.get((name, arguments, self._page_version))
+            if cached is not None:
+                self.stats["cached"] += 1
+                results[call["id"]] = ToolMessage(
+                    f"{cached}\n{CACHED_NOTE}", name=name, tool_call_id=call["id"]
+                )
+            else:
+                to_run.append(call)
+
+        if to_run:
+            version_before = self._page_version
+            if any(call["name"] in PAGE_CHANGING_TOOLS for call in to_run):
+                self._page_version += 1
+            outputs = await self.tool_node.ainvoke(
+                {"messages": [AIMessage(content="", tool_calls=to_run)]}
+            )
+            self.stats["executed"] += len(to_run)
+            for call, output in zip(to_run, outputs["messages"]):
+                results[call["id"]] = output
+                self._remember(call, output, version_before)
+
+        return {"messages": [results[call["id"]] for call in message.tool_calls]}
+
+    def _remember(self, call: dict, output: ToolMessage, version_before: int) -> None:
+        name = call["name"]
+        content = str(output.content)
+        if name not in CACHEABLE_TOOLS or content.startswith("Error"):
+            return
+        # Read-only results belong to the page as it was when they ran
+        version = self._page_version if name in PAGE_CHANGING_TOOLS else version_before
+        if version != self._page_version:
+            # Another call of the same batch changed the page meanwhile
+            return
+        self._cache[(name, self._arguments_key(call["args"]), version)] = content
+
+    def _correct(self, message: AIMessage) -> List:
+        self.stats["corrections"] += 1
+        names = ", ".join(sorted({call["name"] for call in message.tool_calls}))
+        logger.warning(f"Loop detected: {names} repeated {self._repeats} times")
+        messages = [
+            ToolMessage(
+                CORRECTION_TEMPLATE.format(name=call["name"], repeats=self._repeats),
+                name=call["name"],
+                tool_call_id=call["id"],
+            )
+            for call in message.tool_calls
+        ]
+        if self.stats["corrections"] > self.max_corrections:
+            self.stopped = True
+            messages.append(AIMessage(content=STOP_MESSAGE))
+        return messages
+
+    @staticmethod
+    def _arguments_key(arguments: dict) -> str:
+        return json.dumps(arguments, sort_keys=True, default=str)
@@ -0,0 +1,121 @@
+import os
+import re
+from typing import Dict, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Page types by the paths of their URLs, named like the page types of the extraction schemas
+PAGE_TYPE_RULES = [
+    (re.compile(r"^/ap/"), "sign_in"),
+    (re.compile(r"^/s/?$"), "search"),
+    (re.compile(r"/dp/|^/gp/product/"), "product"),
+    (re.compile(r"^/gp/cart/|^/cart/"), "cart"),
+    (re.compile(r"^/your-orders/|^/gp/your-account/order-history"), "order_history"),
+]
+
+# Available everywhere, so the model can always leave the page, finish the task, or read
+# an earlier output in full
+CORE_TOOLS = ["navigate_browser", "current_webpage", "extract_content", "search_products", "read_blob"]
+
+# Tools exposed per run phase or page type, in addition to the core tools
+TOOL_SUBSETS = {
+    # Right after signing in, the agent goes to a page or extracts directly
+    "start": [],
+    "sign_in": ["snapshot_page", "act_on_element"],
+    "search": ["snapshot_page", "act_on_element", "extract_text", "previous_webpage"],
+    "product": ["snapshot_page", "act_on_element", "extract_text", "previous_webpage"],
+    "cart": ["snapshot_page", "act_on_element"],
+    "order_history": ["snapshot_page", "act_on_element", "previous_webpage"],
+    "other": [
+        "snapshot_page",
+        "act_on_element",
+        "extract_text",
+        "extract_hyperlinks",
+        "previous_webpage",
+    ],
+}
+
+
+def is_tool_selection_enabled() -> bool:
+    """Tool selection is on by default, set `AMAZON_TOOL_SUBSETS=false` to bind all tools."""
+    return os.getenv("AMAZON_TOOL_SUBSETS", "true").lower() in {"1", "true", "yes"}
+
+
+def get_page_type(url: Optional[str]) -> Optional[str]:
+    """Return the page type of an Amazon URL, "other" for unknown pages, None without a URL."""
+    if not url or url == "about:blank":
+        return None
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?", 1)[0].split("#", 1)[0] or "/"
+    for pattern, page_type in PAGE_TYPE_RULES:
+        if pattern.search(path):
+            return page_type
+    return "other"
+
+
+def get_current_url(browser) -> Optional[str]:
+    """The URL of the page the Playwright tools act on, without creating one."""
+    if not browser.contexts or not browser.contexts[0].pages:
+        return None
+    return browser.contexts[0].pages[-1].url
+
+
+class ToolSelector:
+    """
+    Selects the tools bound to each model call by the run phase and the current page type.
+
+    Binding only the relevant tools sends fewer tool schemas with every call and leaves the
+    model fewer wrong tools to choose from. All tools are bound instead when:
+    - the page type is unknown, e.g. before the first page is opened,
+    - a tool call since the last model response failed, or
+    - the model called a tool outside the subset it was given.
+
+    The tool node still runs all tools, so a call outside the subset is never rejected.
+
+    Example:
+        selector = ToolSelector(tools)
+        tool_names = selector.select(state["messages"], get_current_url(browser))
+        response = await model_router.ainvoke("agent_node", messages, tool_names)
+    """
+
+    def __init__(self, tools: Sequence):
+        self.tool_names = [tool.name for tool in tools]
+        self._last_selection: Optional[Tuple[str, ...]] = None
+        # Model calls per subset, "all" for calls with all tools
+        self.stats: Dict[str, int] = {}
+
+    def select(self, messages: Sequence[AnyMessage], current_url: Optional[str]) -> Optional[Tuple[str, ...]]:
+        """Return the names of the tools to bind, in toolkit order, or None for all tools."""
+        subset = self._subset_name(messages, current_url)
+        self._last_selection = None
+        self.stats[subset or "all"] = self.stats.get(subset or "all", 0) + 1
+        if subset is None:
+            return None
+        selected = set(CORE_TOOLS) | set(TOOL_SUBSETS[subset])
+        self._last_selection = tuple(name for name in self.tool_names if name in selected)
+        return self._last_selection
+
+    def _subset_name(self, messages: Sequence[AnyMessage], current_url: Optional[str]) -> Optional[str]:
+        if not is_tool_selection_enabled():
+            return None
+
+        last_ai_message = None
+        for message in reversed(messages):
+            if isinstance(message, AIMessage):
+                last_ai_message = message
+                break
+            if isinstance(message, ToolMessage) and str(message.content).startswith("Error"):
+                logger.info("Binding all tools after a tool error")
+                return None
+
+        if last_ai_message is None:
+            return "start"
+        # A call outside the previous subset means the model needed another tool
+        bound = self._last_selection if self._last_selection is not None else self.tool_names
+        if any(call["name"] not in bound for call in last_ai_message.tool_calls):
+            logger.info("Binding all tools after a call outside the tool subset")
+            return None
+        return get_page_type(current_url)
@@ -17,10 +17,15 @@ from langchain_community.tools.playwright.extract_hyperlinks import (
 )
 from langchain_community.tools.playwright.extract_text import ExtractTextTool
 from langchain_community.tools.playwright.get_elements import GetElementsTool
-from langchain_community.tools.playwright.navigate import NavigateTool
 from langchain_community.tools.playwright.navigate_back import NavigateBackTool
 
 from app.amazon_web_agent.tools.extract_content_tool import ExtractContentTool
+from app.amazon_web_agent.tools.navigate_tool import WarmNavigateTool
+from app.amazon_web_agent.tools.page_snapshot_tool import (
+    ActOnElementTool,
+    SnapshotPageTool,
+)
+from app.amazon_web_agent.tools.search_products_tool import SearchProductsTool
 
 if TYPE_CHECKING:
     from playwright.async_api import Browser as AsyncBrowser
@@ -83,13 +88,16 @@ class PlayWrightBrowserToolkit(BaseToolkit):
         """Get the tools in the toolkit."""
         tool_classes: List[Type[BaseBrowserTool]] = [
             ClickTool,
-            NavigateTool,
+            WarmNavigateTool,
             NavigateBackTool,
             ExtractTextTool,
             ExtractHyperlinksTool,
             GetElementsTool,
             CurrentWebPageTool,
-            ExtractContentTool
+            ExtractContentTool,
+            SearchProductsTool,
+            SnapshotPageTool,
+            ActOnElementTool,
         ]
 
         tools = [
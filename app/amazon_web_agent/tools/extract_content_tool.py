@@ -4,9 +4,9 @@ import json
 import os
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Type
+from typing import List, Optional, Tuple, Type
+from urllib.parse import urljoin, urlparse
 
-from bs4 import BeautifulSoup
 from langchain_community.tools.playwright.base import BaseBrowserTool
 from langchain_community.tools.playwright.utils import (
     get_current_page,
@@ -17,52 +17,201 @@ from langchain_core.callbacks import (
 )
 from langchain_core.pydantic_v1 import BaseModel, Field
 
+from app.amazon_web_agent.extraction.commerce_dataset import append_changes
+from app.amazon_web_agent.extraction.extraction_engine import (
+    ExtractionSchema,
+    SyncMode,
+    extract_next_page,
+    extract_records,
+    get_schema_for_info,
+    key_records,
+    parse_html,
+)
+from app.amazon_web_agent.extraction.response_capture import get_response_capture
+from app.amazon_web_agent.http_fetcher import (
+    BrowserRequiredError,
+    HttpPageSource,
+    get_context_fetcher,
+    is_http_fast_path_enabled,
+)
+from app.amazon_web_agent.page_prefetcher import take_warm_page_status
+from app.amazon_web_agent.selector_registry import SelectorRegistry
+from app.amazon_web_agent.sync_engine import SyncChanges, SyncEngine
+from app.amazon_web_agent.tools.search_products_tool import get_amazon_base_url
+from utils.cancellation_util import get_run_token
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
 
 class AmazonExtractInfo(str, Enum):
     ORDER_DETAILS_INFO = "ORDER_DETAILS_INFO"
     SHOPPING_CART_INFO = "SHOPPING_CART_INFO"
 
 
-async def extract_shopping_cart_content(page):
-    # Get the HTML content of the cart page
-    html_content = await page.content()
-
-    # Parse HTML using BeautifulSoup
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    # Extract all item information
-    items = soup.select("#activeCartViewForm .sc-list-item")
-    cart_items = []
-
-    for item in items:
-        title_element = item.select_one(".sc-grid-item-product-title .a-truncate-full")
-        title = title_element.get_text(strip=True) if title_element else "N/A"
+# Maximum number of pages to walk in a paginated listing when no high-water mark is known yet
+MAX_PAGES = 10
 
-        price_element = item.select_one(".sc-product-price")
-        price = price_element.get_text(strip=True) if price_element else "N/A"
 
-        quantity_element = item.select_one(".sc-action-quantity input")
-        quantity = quantity_element.get("value") if quantity_element else "N/A"
-
-        cart_items.append({"title": title, "price": price, "quantity": quantity})
-
-    # Get the current timestamp
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-
-    # Construct the file path
+def get_data_dir() -> str:
+    """Return the project's data directory, creating it if needed."""
     project_root = os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "..", "..")
     )
     data_dir = os.path.join(project_root, "data")
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
-    file_path = os.path.join(data_dir, f"cart_items_{timestamp}.json")
+    return data_dir
+
 
-    # Save cart information to a JSON file
+def save_changes(changes: SyncChanges, prefix: str) -> str:
+    """Save the changes to a timestamped JSON file in the data directory and return its path."""
+    # Get the current timestamp
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+
+    # Construct the file path, without overwriting changes saved within the same second
+    file_path = os.path.join(get_data_dir(), f"{prefix}_{timestamp}.json")
+    counter = 1
+    while os.path.exists(file_path):
+        file_path = os.path.join(get_data_dir(), f"{prefix}_{timestamp}_{counter}.json")
+        counter += 1
+
+    # Save the changes to a JSON file
     with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(cart_items, f, ensure_ascii=False, indent=4)
+        json.dump(changes.dict(), f, ensure_ascii=False, indent=4)
+
+    return file_path
+
+
+async def extract_page_records(page, schema: ExtractionSchema) -> Tuple[List[dict], Optional[str]]:
+    """
+    Return the records on the current page and the link to the next page. They are read
+    from the captured JSON responses of the page if any, and from its HTML otherwise.
+    """
+    capture = get_response_capture(page)
+    if capture is not None:
+        captured = await capture.extract(schema, page)
+        if captured is not None:
+            records, next_page = captured
+            # The JSON may not carry the pagination, read it from the HTML then
+            if next_page is None and schema.pagination is not None:
+                next_page = extract_next_page(await page.content(), schema)
+            return records, next_page
+
+    # Get the HTML content of the page
+    soup = parse_html(await page.content())
+    return extract_records(soup, schema), extract_next_page(soup, schema)
+
+
+class BrowserPageSource:
+    """Reads extraction records from the current page of the browser."""
+
+    def __init__(self, page):
+        self.page = page
+
+    @property
+    def url(self) -> str:
+        return self.page.url
+
+    async def load(self, url: str) -> None:
+        # The prefetcher already loaded the URL in the current page
+        if take_warm_page_status(self.page, url) is not None:
+            return
+        await self.page.goto(url)
 
-    return f"Cart information saved to {file_path}"
+    async def records(self, schema: ExtractionSchema) -> Tuple[List[dict], Optional[str]]:
+        return await extract_page_records(self.page, schema)
+
+
+async def extract_snapshot_content(source, schema: ExtractionSchema, account: str) -> str:
+    """Extract the complete state described by the schema from the page source and sync it."""
+    # Extract all records described by the schema
+    records = key_records(schema, (await source.records(schema))[0])
+
+    # Compare with the last synced state and only keep the delta
+    sync_engine = SyncEngine()
+    try:
+        changes = sync_engine.sync_snapshot(account, schema.name, records)
+    finally:
+        sync_engine.close()
+
+    return report_changes(schema, changes, len(records))
+
+
+async def extract_paginated_content(source, schema: ExtractionSchema, account: str) -> str:
+    """Extract a newest-first paginated listing until the high-water mark of the last sync is reached."""
+    sync_engine = SyncEngine()
+    try:
+        high_water_mark = sync_engine.get_high_water_mark(account, schema.name)
+
+        records = {}
+        newest_key = None
+        # Whether every record newer than the high-water mark was seen
+        complete = False
+        token = get_run_token()
+        for _ in range(MAX_PAGES):
+            # Stop following the pagination once the run is cancelled
+            if token is not None:
+                token.check()
+
+            # Parse the current page
+            page_records, next_page = await source.records(schema)
+
+            reached_high_water_mark = False
+            for key, record in key_records(schema, page_records).items():
+                newest_key = newest_key or key
+                records[key] = record
+                if key == high_water_mark:
+                    reached_high_water_mark = True
+
+            # Everything beyond this page has already been synced
+            if reached_high_water_mark or not next_page:
+                complete = True
+                break
+
+            # Follow the pagination to older records
+            await source.load(urljoin(source.url, next_page))
+
+        changes = sync_engine.sync_incremental(account, schema.name, records)
+        # Moving the mark past a gap would skip the records in it on every later sync
+        if newest_key and complete:
+            sync_engine.set_high_water_mark(account, schema.name, newest_key)
+        elif newest_key:
+            logger.warning(f"Stopped after {MAX_PAGES} pages of {schema.name}, the high-water mark is kept")
+    finally:
+        sync_engine.close()
+
+    return report_changes(schema, changes, len(records))
+
+
+def get_schema_url(page_url: str, schema: ExtractionSchema) -> Optional[str]:
+    """Return the URL to extract the schema from: the current page if it is the schema's page."""
+    if schema.url is None or urlparse(page_url).path.startswith(schema.url):
+        return page_url
+    return get_amazon_base_url() + schema.url
+
+
+async def extract_without_browser(page, schema: ExtractionSchema, account: str, extract) -> str:
+    """
+    Extract with the session cookies of the page's context over plain HTTP, raising
+    BrowserRequiredError when a page needs the browser.
+    """
+    source = HttpPageSource(await get_context_fetcher(page.context))
+    await source.load(get_schema_url(page.url, schema))
+    return await extract(source, schema, account)
+
+
+def report_changes(schema: ExtractionSchema, changes: SyncChanges, checked: int) -> str:
+    if not changes.has_changes:
+        return f"{schema.description} is unchanged since the last sync ({checked} records checked)."
+
+    file_path = save_changes(changes, f"{schema.name}_changes")
+    # The typed dataset is secondary to the JSON file, a failure must not fail the extraction
+    try:
+        append_changes(changes.dict(), schema, get_data_dir(), file_path)
+    except Exception as e:
+        logger.error(f"Failed to append the {schema.name} changes to the dataset: {e}")
+    return f"{schema.description} synced ({changes.summary()}), changes saved to {file_path}"
 
 
 class ExtractContentToolInput(BaseModel):
@@ -79,7 +228,8 @@ class ExtractContentTool(BaseBrowserTool):
 
     name: str = "extract_content"
     description: str = (
-        "Extract content from the HTML file and store them in a structured format."
+        "Extract content from the HTML file and store them in a structured format. "
+        "Only the changes since the last extraction are stored."
     )
     args_schema: Type[BaseModel] = ExtractContentToolInput
 
@@ -101,7 +251,30 @@ class ExtractContentTool(BaseBrowserTool):
 
         page = get_current_page(self.async_browser)
 
-        if info == AmazonExtractInfo.SHOPPING_CART_INFO:
-            return await extract_shopping_cart_content(page)
-        else:
+        account = os.getenv("AMAZON_EMAIL", "default")
+
+        schema = get_schema_for_info(info.value)
+        if schema is None:
             return "Sorry, extracting content is not supported yet."
+
+        if schema.sync == SyncMode.INCREMENTAL:
+            extract = extract_paginated_content
+        else:
+            extract = extract_snapshot_content
+
+        try:
+            # Read-only pages are fetched without rendering when possible
+            if is_http_fast_path_enabled():
+                try:
+                    return await extract_without_browser(page, schema, account, extract)
+                except BrowserRequiredError as e:
+                    logger.info(f"Falling back to the browser: {e}")
+
+            source = BrowserPageSource(page)
+            url = get_schema_url(page.url, schema)
+            if url != page.url:
+                await source.load(url)
+            return await extract(source, schema, account)
+        finally:
+            # Persist the learned selector winners for the next run
+            SelectorRegistry.get_registry().save()
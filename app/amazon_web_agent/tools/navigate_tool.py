@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from langchain_community.tools.playwright.navigate import NavigateTool
+from langchain_community.tools.playwright.utils import aget_current_page
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun
+
+from app.amazon_web_agent.page_prefetcher import take_warm_page_status
+
+
+class WarmNavigateTool(NavigateTool):
+    """Tool for navigating a browser to a URL, reusing the page if it was prefetched."""
+
+    async def _arun(
+        self,
+        url: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Use the tool."""
+        if self.async_browser is None:
+            raise ValueError(f"Asynchronous browser not provided to {self.name}")
+        page = await aget_current_page(self.async_browser)
+        # The prefetcher already loaded the URL in the current page
+        status = take_warm_page_status(page, url)
+        if status is not None:
+            return f"Navigating to {url} returned status code {status}"
+        return await super()._arun(url, run_manager)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import weakref
+from enum import Enum
+from typing import Dict, List, Optional, Type
+
+from langchain_community.tools.playwright.base import BaseBrowserTool
+from langchain_community.tools.playwright.utils import aget_current_page
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.pydantic_v1 import BaseModel, Field
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Attribute holding the element ID, kept on the DOM node so the ID stays stable across snapshots
+ELEMENT_ID_ATTRIBUTE = "data-agent-id"
+
+# Elements listed per snapshot, the rest is summarized
+MAX_ELEMENTS = 150
+
+# Long accessible names are cut to keep the snapshot compact
+MAX_NAME_LENGTH = 80
+
+# Collects the visible interactive elements with their ARIA role and accessible name, and
+# numbers them. Elements keep their number for as long as they stay in the DOM.
+COLLECT_ELEMENTS_SCRIPT = """
+({ attribute, maxNameLength }) => {
+    const selector = [
+        "a[href]", "button", "input:not([type=hidden])", "select", "textarea", "summary",
+        "[role=button]", "[role=link]", "[role=checkbox]", "[role=radio]", "[role=tab]",
+        "[role=menuitem]", "[role=option]", "[role=combobox]", "[role=searchbox]",
+        "[role=textbox]", "[role=switch]", "[contenteditable=true]", "[onclick]",
+    ].join(",");
+    const implicitRoles = { A: "link", BUTTON: "button", SELECT: "combobox", TEXTAREA: "textbox", SUMMARY: "button" };
+    const inputRoles = {
+        checkbox: "checkbox", radio: "radio", submit: "button", button: "button", reset: "button",
+        image: "button", search: "searchbox", range: "slider", number: "spinbutton",
+    };
+    const clean = (text) => (text || "").replace(/\\s+/g, " ").trim().slice(0, maxNameLength);
+    const roleOf = (el) => {
+        if (el.getAttribute("role")) return el.getAttribute("role");
+        if (el.tagName === "INPUT") return inputRoles[(el.type || "text").toLowerCase()] || "textbox";
+        return implicitRoles[el.tagName] || "button";
+    };
+    const nameOf = (el) => {
+        const labelledBy = el.getAttribute("aria-labelledby");
+        if (labelledBy) {
+            const text = labelledBy.split(/\\s+/).map((id) => document.getElementById(id)?.innerText).join(" ");
+            if (clean(text)) return clean(text);
+        }
+        if (el.getAttribute("aria-label")) return clean(el.getAttribute("aria-label"));
+        if (el.labels && el.labels.length) return clean(el.labels[0].innerText);
+        const text = ["INPUT", "SELECT", "TEXTAREA"].includes(el.tagName) ? "" : el.innerText;
+        const image = el.querySelector && el.querySelector("img[alt]");
+        return clean(text || el.getAttribute("placeholder") || el.getAttribute("title")
+            || el.getAttribute("alt") || (image && image.getAttribute("alt")) || el.getAttribute("name"));
+    };
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== "hidden" && style.display !== "none";
+    };
+
+    window.__agentNextId = window.__agentNextId || 1;
+    const elements = [];
+    for (const el of document.querySelectorAll(selector)) {
+        if (el.disabled || !isVisible(el)) continue;
+        // Skip elements nested in an already listed element, e.g. a span with onclick in a link
+        if (el.parentElement && el.parentElement.closest(selector) && !el.matches("input,select,textarea")) continue;
+        if (!el.hasAttribute(attribute)) el.setAttribute(attribute, String(window.__agentNextId++));
+        const element = { id: Number(el.getAttribute(attribute)), role: roleOf(el), name: nameOf(el) };
+        if (["INPUT", "SELECT", "TEXTAREA"].includes(el.tagName) && el.type !== "submit") {
+            element.value = clean(el.value);
+        }
+        if (el.type === "checkbox" || el.type === "radio") element.checked = el.checked;
+        elements.push(element);
+    }
+    return elements;
+}
+"""
+
+# The last snapshot of every page, used to answer later snapshots with a diff
+_last_snapshots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def format_element(element: dict) -> str:
+    """Format an element as a compact line, e.g. `[12] button "Add to Cart"`."""
+    line = f"[{element['id']}] {element['role']}"
+    if element.get("name"):
+        line += f' "{element["name"]}"'
+    if element.get("value"):
+        line += f' value="{element["value"]}"'
+    if element.get("checked") is not None:
+        line += " checked" if element["checked"] else " unchecked"
+    return line
+
+
+def render_snapshot(url: str, title: str, elements: List[dict], max_elements: int = MAX_ELEMENTS) -> str:
+    lines = [f"Page: {title} ({url})"]
+    lines.extend(format_element(element) for element in elements[:max_elements])
+    if len(elements) > max_elements:
+        lines.append(f"... {len(elements) - max_elements} more elements")
+    return "\n".join(lines)
+
+
+def diff_snapshots(previous: List[dict], current: List[dict]) -> str:
+    """Describe the elements added (+), removed (-) and changed (~) since the previous snapshot."""
+    previous_by_id: Dict[int, dict] = {element["id"]: element for element in previous}
+    current_by_id: Dict[int, dict] = {element["id"]: element for element in current}
+    lines = []
+    for element in current:
+        before = previous_by_id.get(element["id"])
+        if before is None:
+            lines.append(f"+ {format_element(element)}")
+        elif before != element:
+            lines.append(f"~ {format_element(element)}")
+    lines.extend(
+        f"- [{element['id']}]" for element in previous if element["id"] not in current_by_id
+    )
+    return "\n".join(lines)
+
+
+async def snapshot_elements(page) -> List[dict]:
+    return await page.evaluate(
+        COLLECT_ELEMENTS_SCRIPT,
+        {"attribute": ELEMENT_ID_ATTRIBUTE, "maxNameLength": MAX_NAME_LENGTH},
+    )
+
+
+async def take_snapshot(page, full: bool = False, max_elements: int = MAX_ELEMENTS) -> str:
+    """
+    Return a compact snapshot of the page's interactive elements. If the page was
+    snapshotted before and is still on the same URL, only the changes are returned.
+    """
+    elements = await snapshot_elements(page)
+    previous = _last_snapshots.get(page)
+    _last_snapshots[page] = {"url": page.url, "elements": elements}
+
+    if not full and previous is not None and previous["url"] == page.url:
+        diff = diff_snapshots(previous["elements"], elements)
+        # Fall back to the full snapshot when the page changed too much for the diff to help
+        if len(diff.splitlines()) < min(len(elements), max_elements):
+            return f"Changes since the last snapshot of {page.url}:\n{diff or 'No changes'}"
+
+    return render_snapshot(page.url, await page.title(), elements, max_elements)
+
+
+class SnapshotPageToolInput(BaseModel):
+    """Input for SnapshotPageTool."""
+
+    full: bool = Field(
+        False,
+        description="Return the full list of elements instead of the changes since the last snapshot",
+    )
+
+
+class SnapshotPageTool(BaseBrowserTool):
+    """Tool for listing the interactive elements of the current page with stable IDs."""
+
+    name: str = "snapshot_page"
+    description: str = (
+        "List the interactive elements (links, buttons, inputs) of the current page as numbered "
+        "lines such as '[12] button \"Add to Cart\"'. Use the numbers with 'act_on_element'. "
+        "Later snapshots of the same page only return the elements that were added (+), "
+        "removed (-) or changed (~)."
+    )
+    args_schema: Type[BaseModel] = SnapshotPageToolInput
+
+    def _run(
+        self,
+        full: bool = False,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        raise NotImplementedError("Not implemented")
+
+    async def _arun(
+        self,
+        full: bool = False,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Use the tool."""
+        if self.async_browser is None:
+            raise ValueError(f"Asynchronous browser not provided to {self.name}")
+        page = await aget_current_page(self.async_browser)
+        return await take_snapshot(page, full)
+
+
+class ElementAction(str, Enum):
+    CLICK = "click"
+    FILL = "fill"
+    SELECT = "select"
+    PRESS = "press"
+
+
+class ActOnElementToolInput(BaseModel):
+    """Input for ActOnElementTool."""
+
+    element_id: int = Field(..., description="The number of the element in the page snapshot")
+    action: ElementAction = Field(ElementAction.CLICK, description="The action to perform")
+    value: Optional[str] = Field(
+        None,
+        description="The text to fill, the option to select, or the key to press (e.g. 'Enter')",
+    )
+
+
+class ActOnElementTool(BaseBrowserTool):
+    """Tool for clicking, filling, selecting or pressing a key on an element by its snapshot ID."""
+
+    name: str = "act_on_element"
+    description: str = (
+        "Click, fill, select an option of, or press a key on an element identified by its "
+        "number from 'snapshot_page'. Returns the changes of the page afterwards, so no "
+        "extra snapshot is needed."
+    )
+    args_schema: Type[BaseModel] = ActOnElementToolInput
+    playwright_timeout: float = 3_000
+    """Timeout (in ms) for Playwright to wait for the element and the page to settle."""
+
+    def _run(
+        self,
+        element_id: int,
+        action: ElementAction = ElementAction.CLICK,
+        value: Optional[str] = None,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        raise NotImplementedError("Not implemented")
+
+    async def _arun(
+        self,
+        element_id: int,
+        action: ElementAction = ElementAction.CLICK,
+        value: Optional[str] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Use the tool."""
+        if self.async_browser is None:
+            raise ValueError(f"Asynchronous browser not provided to {self.name}")
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        page = await aget_current_page(self.async_browser)
+        action = ElementAction(action)
+        if action != ElementAction.CLICK and value is None:
+            return f"Error: a value is required to {action.value} element [{element_id}]"
+
+        locator = page.locator(f'[{ELEMENT_ID_ATTRIBUTE}="{element_id}"]')
+        try:
+            if action == ElementAction.CLICK:
+                await locator.click(timeout=self.playwright_timeout)
+            elif action == ElementAction.FILL:
+                await locator.fill(value, timeout=self.playwright_timeout)
+            elif action == ElementAction.SELECT:
+                await locator.select_option(label=value, timeout=self.playwright_timeout)
+            else:
+                await locator.press(value, timeout=self.playwright_timeout)
+        except PlaywrightTimeoutError:
+            return f"Error: element [{element_id}] was not found or not actionable, take a new snapshot"
+
+        try:
+            await page.wait_for_load_state(timeout=self.playwright_timeout)
+        except PlaywrightTimeoutError:
+            logger.info("The page is still loading after the action")
+
+        # The action may have opened a new page, e.g. a link with target=_blank
+        page = await aget_current_page(self.async_browser)
+        return f"Performed {action.value} on [{element_id}]. {await take_snapshot(page)}"
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Optional, Type
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.tools import BaseTool
+
+from app.amazon_web_agent.blob_store import BlobStore
+
+
+class ReadBlobToolInput(BaseModel):
+    """Input for ReadBlobTool."""
+
+    ref: str = Field(..., description="The blob reference of a shortened tool output, e.g. '3f2a9c1b7d40'")
+
+
+class ReadBlobTool(BaseTool):
+    """Tool for reading the full content of a tool output that was moved to the blob store."""
+
+    name: str = "read_blob"
+    description: str = (
+        "Read the full content of an earlier tool output that was shortened to a preview "
+        "ending with '[... characters, stored as blob <ref>]'."
+    )
+    args_schema: Type[BaseModel] = ReadBlobToolInput
+    blob_store: BlobStore
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _run(
+        self,
+        ref: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        """Use the tool."""
+        digest = self.blob_store.resolve(ref)
+        if digest is None:
+            return f"Error: no blob with the reference '{ref}'"
+        return self.blob_store.get(digest)
+
+    async def _arun(
+        self,
+        ref: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Use the tool."""
+        return self._run(ref)
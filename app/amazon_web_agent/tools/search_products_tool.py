@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import List, Optional, Type
+from urllib.parse import quote_plus
+
+from langchain_community.tools.playwright.base import BaseBrowserTool
+from langchain_community.tools.playwright.utils import aget_current_page
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.pydantic_v1 import BaseModel, Field
+
+from app.amazon_web_agent.extraction.extraction_engine import (
+    ExtractionSchema,
+    extract_records,
+    load_schema,
+)
+from app.amazon_web_agent.extraction.response_capture import get_response_capture
+from app.amazon_web_agent.tab_pool import TabPool
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+DEFAULT_AMAZON_BASE_URL = "https://www.amazon.com"
+
+# Fields returned for every product
+PRODUCT_FIELDS = ["asin", "title", "price", "rating", "reviews", "availability"]
+
+# Long product titles are cut to keep the tool output compact
+MAX_TITLE_LENGTH = 120
+
+MAX_RESULTS_LIMIT = 10
+
+
+def get_amazon_base_url() -> str:
+    """Return the Amazon base URL, which can be pointed to a fixture site with `AMAZON_BASE_URL`."""
+    return os.getenv("AMAZON_BASE_URL", DEFAULT_AMAZON_BASE_URL).rstrip("/")
+
+
+def search_url(query: str) -> str:
+    return f"{get_amazon_base_url()}/s?k={quote_plus(query)}"
+
+
+def product_url(asin: str) -> str:
+    return f"{get_amazon_base_url()}/dp/{asin}"
+
+
+async def fetch_page_html(pool: TabPool, url: str) -> str:
+    """Load the URL in a pooled tab and return its HTML."""
+    async with pool.page() as page:
+        await page.goto(url, wait_until="domcontentloaded")
+        return await page.content()
+
+
+async def fetch_page_records(pool: TabPool, url: str, schema: ExtractionSchema) -> List[dict]:
+    """
+    Load the URL in a pooled tab and return its records, from its captured JSON responses
+    if any, and from its HTML otherwise.
+    """
+    async with pool.page() as page:
+        await page.goto(url, wait_until="domcontentloaded")
+        capture = get_response_capture(page)
+        if capture is not None:
+            captured = await capture.extract(schema, page)
+            if captured is not None:
+                return captured[0]
+        return extract_records(await page.content(), schema)
+
+
+async def fetch_products(pool: TabPool, asins: List[str]) -> List[dict]:
+    """Fetch and parse the product detail pages concurrently, bounded by the pool size."""
+    product_schema = load_schema("product")
+
+    async def fetch_product(asin: str) -> dict:
+        try:
+            records = await fetch_page_records(pool, product_url(asin), product_schema)
+        except Exception as e:
+            logger.warning(f"Failed to load product {asin}: {e}")
+            return {"asin": asin, "error": str(e)}
+        product = records[0] if records else {}
+        product["asin"] = product.get("asin") or asin
+        return product
+
+    return await asyncio.gather(*(fetch_product(asin) for asin in asins))
+
+
+async def search_products(
+    context, query: str, max_results: int = 5, max_tabs: int = 4
+) -> List[dict]:
+    """
+    Search for products and read the detail pages of the top results.
+
+    The search listing and the detail pages are loaded in a bounded pool of tabs in the
+    given browser context, so all requests share the signed-in session.
+    """
+    async with TabPool(context, size=max_tabs) as pool:
+        html = await fetch_page_html(pool, search_url(query))
+        results = extract_records(html, load_schema("search_results"))[:max_results]
+        details = await fetch_products(pool, [result["asin"] for result in results])
+
+    products = []
+    for result, detail in zip(results, details):
+        # Prefer the detail page, fall back to what the listing showed
+        product = {
+            field: detail.get(field) if detail.get(field) is not None else result.get(field)
+            for field in PRODUCT_FIELDS
+        }
+        if product["title"] and len(product["title"]) > MAX_TITLE_LENGTH:
+            product["title"] = product["title"][:MAX_TITLE_LENGTH] + "..."
+        if "error" in detail:
+            product["error"] = detail["error"]
+        products.append(product)
+    return products
+
+
+class SearchProductsToolInput(BaseModel):
+    """Input for SearchProductsTool."""
+
+    query: str = Field(..., description="The product search query")
+    max_results: int = Field(
+        5,
+        description=f"Number of top results to return, at most {MAX_RESULTS_LIMIT}",
+    )
+
+
+class SearchProductsTool(BaseBrowserTool):
+    """Tool for searching products and reading the product detail pages of the top results."""
+
+    name: str = "search_products"
+    description: str = (
+        "Search Amazon for products and return the ASIN, title, price, rating, review count "
+        "and availability of the top results in one call. Use it to find or compare products "
+        "instead of navigating through search results and product pages."
+    )
+    args_schema: Type[BaseModel] = SearchProductsToolInput
+    # Maximum number of tabs used to load product pages concurrently
+    max_tabs: int = 4
+
+    def _run(
+        self,
+        query: str,
+        max_results: int = 5,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        raise NotImplementedError("Not implemented")
+
+    async def _arun(
+        self,
+        query: str,
+        max_results: int = 5,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> str:
+        """Use the tool."""
+        if self.async_browser is None:
+            raise ValueError(f"Asynchronous browser not provided to {self.name}")
+
+        # The pooled tabs are opened in the context of the current page to share its session
+        page = await aget_current_page(self.async_browser)
+
+        max_results = max(1, min(max_results, MAX_RESULTS_LIMIT))
+        products = await search_products(page.context, query, max_results, self.max_tabs)
+        return json.dumps(products, ensure_ascii=False)
@@ -0,0 +1,263 @@
+"""
+A local fixture site serving minimal Amazon-like pages, for tests and benchmarks that need a real browser
+but must not hit Amazon.
+
+Usage:
+    with AmazonFixtureServer() as server:
+        os.environ["AMAZON_BASE_URL"] = server.base_url
+"""
+import json
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{title}</title></head>
+<body>
+<a id="nav-link-accountList" href="/ap/signin">Hello, sign in</a>
+<a id="nav-cart" href="/gp/cart/view.html">Cart</a>
+{body}
+</body></html>"""
+
+SEARCH_RESULT_TEMPLATE = """
+<div data-component-type="s-search-result" data-asin="{asin}">
+    <h2><a href="/dp/{asin}"><span>{title}</span></a></h2>
+    <span class="a-price"><span class="a-offscreen">{price}</span></span>
+    <i class="a-icon-star-small"><span class="a-icon-alt">{rating} out of 5 stars</span></i>
+</div>"""
+
+PRODUCT_TEMPLATE = """
+<input type="hidden" id="ASIN" value="{asin}">
+<span id="productTitle">{title}</span>
+<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">{price}</span></span></div>
+<span id="acrPopover" title="{rating} out of 5 stars"></span>
+<span id="acrCustomerReviewText">{reviews} ratings</span>
+<div id="availability"><span>{availability}</span></div>"""
+
+CART_ITEM_TEMPLATE = """
+<div class="sc-list-item" data-asin="{asin}">
+    <div class="sc-grid-item-product-title"><span class="a-truncate-full">{title}</span></div>
+    <div class="sc-product-price">{price}</div>
+    <div class="sc-action-quantity"><input value="{quantity}"></div>
+</div>"""
+
+ORDER_TEMPLATE = """
+<div class="order-card">
+    <div class="yohtmlc-order-id"><span dir="ltr">{order_id}</span></div>
+    <div class="order-header__header-list-item"><span class="a-size-base">{order_date}</span></div>
+    <div class="yohtmlc-order-total"><span class="value">{total}</span></div>
+    <div class="delivery-box__primary-text">{status}</div>
+    <a class="yohtmlc-product-title">{title}</a>
+</div>"""
+
+EMPTY_CART = '<div class="sc-your-amazon-cart-is-empty"><h1>Your Amazon Cart is empty</h1></div>'
+
+NO_ORDERS = '<div class="your-orders-content-empty">You have not placed any orders.</div>'
+
+ORDERS_PER_PAGE = 10
+
+# Loads the page data from its JSON endpoint, like the Amazon pages do
+FETCH_SCRIPT = '<script>fetch("{url}").then((response) => response.json());</script>'
+
+
+def default_products(count: int = 20) -> Dict[str, dict]:
+    return {
+        f"B{index:09d}": {
+            "asin": f"B{index:09d}",
+            "title": f"Fixture Product {index}",
+            "price": f"${10 + index}.99",
+            "rating": 4.0 + (index % 10) / 10,
+            "reviews": 100 * index,
+            "availability": "In Stock",
+        }
+        for index in range(1, count + 1)
+    }
+
+
+class AmazonFixtureServer:
+    """Serves search, product, cart and order history pages on localhost from in-memory data."""
+
+    def __init__(
+        self,
+        products: Optional[Dict[str, dict]] = None,
+        cart: Optional[Dict[str, int]] = None,
+        order_count: int = 25,
+        latency: float = 0.0,
+        port: int = 0,
+    ):
+        self.products = products or default_products()
+        self.cart = cart if cart is not None else {asin: 1 for asin in list(self.products)[:3]}
+        self.orders = [
+            {
+                "order_id": f"111-{index:07d}-0000000",
+                "order_date": f"January {index % 28 + 1}, 2026",
+                "total": f"${index}.00",
+                "status": "Delivered",
+                "title": f"Fixture Product {index}",
+            }
+            for index in range(order_count, 0, -1)
+        ]
+        # Seconds to wait before answering, to simulate network latency
+        self.latency = latency
+        self.requests = 0
+        # Cookie header of the last request
+        self.last_cookie: Optional[str] = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def set_price(self, asin: str, price: str) -> None:
+        with self._lock:
+            self.products[asin]["price"] = price
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "AmazonFixtureServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def render(self, path: str, query: Dict[str, list]) -> Optional[str]:
+        """Return the HTML for the path, or None if it does not exist."""
+        with self._lock:
+            if path == "/":
+                return PAGE_TEMPLATE.format(title="Amazon", body="<div id='nav-main'></div>")
+            if path == "/s":
+                body = "".join(
+                    SEARCH_RESULT_TEMPLATE.format(**self._escaped(product))
+                    for product in self.products.values()
+                )
+                return PAGE_TEMPLATE.format(title="Search", body=body)
+            if path.startswith("/dp/"):
+                product = self.products.get(path[len("/dp/") :])
+                if product is None:
+                    return None
+                return PAGE_TEMPLATE.format(
+                    title=escape(product["title"]),
+                    body=PRODUCT_TEMPLATE.format(**self._escaped(product))
+                    + FETCH_SCRIPT.format(url=f"/api/dp/{product['asin']}"),
+                )
+            if path == "/gp/cart/view.html":
+                body = "".join(
+                    CART_ITEM_TEMPLATE.format(quantity=quantity, **self._escaped(self.products[asin]))
+                    for asin, quantity in self.cart.items()
+                ) or EMPTY_CART
+                return PAGE_TEMPLATE.format(
+                    title="Shopping Cart",
+                    body=f'<form id="activeCartViewForm">{body}</form>'
+                    + FETCH_SCRIPT.format(url="/cart/api/items"),
+                )
+            if path == "/your-orders/orders":
+                start = int(query.get("startIndex", ["0"])[0])
+                orders = self.orders[start : start + ORDERS_PER_PAGE]
+                body = "".join(ORDER_TEMPLATE.format(**self._escaped(order)) for order in orders)
+                if not self.orders:
+                    body = NO_ORDERS
+                if start + ORDERS_PER_PAGE < len(self.orders):
+                    body += (
+                        '<ul class="a-pagination"><li class="a-last">'
+                        f'<a href="/your-orders/orders?startIndex={start + ORDERS_PER_PAGE}">Next</a>'
+                        "</li></ul>"
+                    )
+                body += FETCH_SCRIPT.format(url=f"/your-orders/api/orders?startIndex={start}")
+                return PAGE_TEMPLATE.format(title="Your Orders", body=body)
+        return None
+
+    def render_json(self, path: str, query: Dict[str, list]) -> Optional[dict]:
+        """Return the JSON payload of a data endpoint, or None if it does not exist."""
+        with self._lock:
+            if path.startswith("/api/dp/"):
+                product = self.products.get(path[len("/api/dp/") :])
+                if product is None:
+                    return None
+                return {
+                    "asin": product["asin"],
+                    "title": product["title"],
+                    "price": {"displayString": product["price"]},
+                    "rating": {"value": product["rating"], "count": product["reviews"]},
+                    "availability": {"message": product["availability"]},
+                }
+            if path == "/cart/api/items":
+                return {
+                    "items": [
+                        {
+                            "asin": asin,
+                            "title": self.products[asin]["title"],
+                            "price": {"displayString": self.products[asin]["price"]},
+                            "quantity": quantity,
+                        }
+                        for asin, quantity in self.cart.items()
+                    ]
+                }
+            if path == "/your-orders/api/orders":
+                start = int(query.get("startIndex", ["0"])[0])
+                orders = self.orders[start : start + ORDERS_PER_PAGE]
+                payload = {
+                    "orders": [
+                        {
+                            "orderId": order["order_id"],
+                            "orderDate": order["order_date"],
+                            "grandTotal": {"displayString": order["total"]},
+                            "status": order["status"],
+                            "items": [{"title": order["title"]}],
+                        }
+                        for order in orders
+                    ]
+                }
+                if start + ORDERS_PER_PAGE < len(self.orders):
+                    payload["nextPageUrl"] = f"/your-orders/orders?startIndex={start + ORDERS_PER_PAGE}"
+                return payload
+        return None
+
+    @staticmethod
+    def _escaped(values: dict) -> dict:
+        return {key: escape(str(value)) for key, value in values.items()}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server.last_cookie = self.headers.get("Cookie")
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                payload = server.render_json(url.path, parse_qs(url.query))
+                if payload is not None:
+                    found, body = True, json.dumps(payload)
+                    content_type = "application/json"
+                else:
+                    html = server.render(url.path, parse_qs(url.query))
+                    found, body = html is not None, html or "Not Found"
+                    content_type = "text/html; charset=utf-8"
+                body = body.encode("utf-8")
+                self.send_response(200 if found else 404)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
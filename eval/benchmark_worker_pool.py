@@ -0,0 +1,79 @@
+"""
+Measure how the throughput of the multi-process workers scales with the number of processes,
+refreshing product pages of the local fixture site.
+
+Usage:
+    python -m eval.benchmark_worker_pool --jobs 200 --processes 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from service.job_queue import SQLiteJobQueue
+from service.worker_pool import WorkerPool
+from eval.amazon_fixture_server import AmazonFixtureServer, default_products
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+
+def run_benchmark(jobs: int, processes: int, concurrency: int, asins: list) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue_path = os.path.join(tmp_dir, "job_queue.sqlite3")
+        queue = SQLiteJobQueue(queue_path)
+        queue.enqueue_many("product", [{"asin": asins[i % len(asins)]} for i in range(jobs)])
+
+        start = time.perf_counter()
+        pool = WorkerPool(
+            processes=processes,
+            queue_path=queue_path,
+            concurrency=concurrency,
+            poll_interval=0.1,
+            exit_when_empty=True,
+        )
+        pool.start()
+        pool.join()
+        elapsed = time.perf_counter() - start
+
+        stats = queue.stats()
+        queue.close()
+    return {
+        "processes": processes,
+        "elapsed": round(elapsed, 2),
+        "jobs_per_second": round(stats["succeeded"] / elapsed, 2),
+        **stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the multi-process workers.")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--concurrency", type=int, default=2, help="Jobs per process")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixture site latency in seconds")
+    args = parser.parse_args()
+
+    products = default_products(100)
+    with AmazonFixtureServer(products=products, latency=args.latency) as server:
+        # Inherited by the spawned worker processes
+        os.environ["AMAZON_BASE_URL"] = server.base_url
+
+        results = []
+        for processes in sorted(set(args.processes)):
+            result = run_benchmark(args.jobs, processes, args.concurrency, list(products))
+            baseline = results[0]["jobs_per_second"] if results else result["jobs_per_second"]
+            result["speedup"] = round(result["jobs_per_second"] / baseline, 2) if baseline else 0.0
+            results.append(result)
+            logger.info(f"Benchmark: {result}")
+
+    print(f"{'processes':>9} {'seconds':>8} {'jobs/s':>8} {'speedup':>8} {'failed':>7}")
+    for result in results:
+        print(
+            f"{result['processes']:>9} {result['elapsed']:>8} {result['jobs_per_second']:>8} "
+            f"{result['speedup']:>8} {result['failed']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
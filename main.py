@@ -1,11 +1,16 @@
+import os
+
 import streamlit as st
 from langchain.agents import AgentExecutor
 from langchain.agents import create_tool_calling_agent
 from langchain.tools import StructuredTool
+from langchain_community.callbacks import get_openai_callback
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.pydantic_v1 import BaseModel, Field
 
+from app.agent_router import AgentRouter
 from app.amazon_web_agent.amazon_web_agent import amazon_web_agent_run
+from service.job_client import JobServiceClient
 from utils.chat_model_env_util import ChatModelUtil
 from utils.env_util import EnvLoader
 from utils.logger_util import LoggerUtil
@@ -31,8 +36,8 @@ invoke_amazon_web_agent_tool = StructuredTool.from_function(
 )
 
 
-def start_web_action_agent(user_input: str):
-    web_agent_llm = ChatModelUtil.create_llm()
+def create_web_agent_delegator(web_agent_tools):
+    web_agent_llm = ChatModelUtil.create_llm(ChatModelUtil.get_step_tier("delegator"))
     web_agent_prompt = ChatPromptTemplate.from_messages(
         [
             (
@@ -49,15 +54,46 @@ def start_web_action_agent(user_input: str):
             MessagesPlaceholder(variable_name="agent_scratchpad", optional=True),
         ]
     )
-    web_agent_tools = [invoke_amazon_web_agent_tool]
     web_agent = create_tool_calling_agent(
         web_agent_llm, web_agent_tools, web_agent_prompt
     )
-    web_agent_executor = AgentExecutor(
-        agent=web_agent, tools=web_agent_tools, verbose=True
+    return AgentExecutor(agent=web_agent, tools=web_agent_tools, verbose=True)
+
+
+@st.cache_resource
+def get_web_agent_router() -> AgentRouter:
+    """Build the router once and share it across Streamlit reruns."""
+    web_agent_router = AgentRouter(create_web_agent_delegator)
+    web_agent_router.register(
+        invoke_amazon_web_agent_tool,
+        ["amazon", "cart", "order", "orders", "asin", "prime", "product", "products"],
     )
+    return web_agent_router
+
+
+def start_web_action_agent(user_input: str):
+    # Requests are dispatched directly to the sub-agent when possible,
+    # the LLM delegator is only used as a fallback
+    with get_openai_callback() as usage:
+        result = get_web_agent_router().invoke(user_input)
+    # Totals of all model calls of the request, the delegator's included
+    logger.info(
+        f"Request token usage: {usage.prompt_tokens} prompt, {usage.completion_tokens} completion, "
+        f"${usage.total_cost:.4f}"
+    )
+    return result
+
 
-    web_agent_executor.invoke({"input": user_input})
+def submit_to_job_service(job_service_url: str, user_input: str):
+    """Run the request on the job service and write its progress to the page."""
+    client = JobServiceClient(job_service_url)
+    job = client.submit(user_input)
+    for event in client.stream_events(job["job_id"]):
+        if event["type"] == "progress":
+            st.write(event["data"])
+        elif event["type"] == "error":
+            st.error(event["data"])
+    return client.get_status(job["job_id"]).get("result")
 
 
 if __name__ == "__main__":
@@ -70,5 +106,10 @@ if __name__ == "__main__":
 
     if st.button("Run Workflow"):
         with st.spinner("Running workflow..."):
-            # Start running the web action agent
-            start_web_action_agent(user_input)
+            job_service_url = os.getenv("JOB_SERVICE_URL")
+            if job_service_url:
+                # Run on the job service, the page only streams its progress
+                submit_to_job_service(job_service_url, user_input)
+            else:
+                # Start running the web action agent in this process
+                start_web_action_agent(user_input)
@@ -0,0 +1,37 @@
+import json
+from typing import Iterator, Optional
+
+import requests
+
+
+class JobServiceClient:
+    """Client of the job service, used by the Streamlit front end."""
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def submit(self, requirement: str) -> dict:
+        """Queue a run and return its status, raising for rejected jobs."""
+        response = requests.post(
+            f"{self.base_url}/jobs", json={"requirement": requirement}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_status(self, job_id: str) -> dict:
+        response = requests.get(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stream_events(self, job_id: str, read_timeout: Optional[float] = None) -> Iterator[dict]:
+        """Yield the events of a run as they arrive, until the run has finished."""
+        with requests.get(
+            f"{self.base_url}/jobs/{job_id}/events",
+            stream=True,
+            timeout=(self.timeout, read_timeout),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    yield json.loads(line[len("data: ") :])
@@ -0,0 +1,254 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain_core.pydantic_v1 import BaseModel
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Default location of the shared job queue
+DEFAULT_JOB_QUEUE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "data", "job_queue.sqlite3")
+)
+
+QUEUED = "queued"
+LEASED = "leased"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class LeasedJob(BaseModel):
+    """A job leased by a worker until `lease_expires_at`."""
+
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    lease_owner: str
+    lease_expires_at: float
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class SQLiteJobQueue:
+    """
+    A durable job queue in a single SQLite file, shared by worker processes without a broker.
+
+    Key steps:
+    - `lease` hands the oldest available job to one worker for a visibility timeout. The
+      select and update run in one write transaction, so two processes never lease the same job.
+    - A worker keeps a long job leased with `heartbeat`. If it dies, the lease expires and
+      the job becomes available again, until its attempts are used up.
+    - `complete` and `fail` only apply while the worker still holds the lease, so a job
+      taken over by another worker is not overwritten by the worker that lost it.
+    - Failed attempts are retried with an exponential backoff.
+
+    Example:
+        queue = SQLiteJobQueue()
+        queue.enqueue("product", {"asin": "B000000001"})
+        job = queue.lease(worker_id, visibility_timeout=60)
+        queue.complete(job.id, worker_id, result)
+    """
+
+    def __init__(self, db_path: Optional[str] = None, retry_delay: float = 5.0):
+        self.db_path = db_path or DEFAULT_JOB_QUEUE_PATH
+        self.retry_delay = retry_delay
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        # Transactions are managed explicitly, see `_write`
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_available
+                ON jobs (status, available_at);
+            """
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def enqueue(
+        self, kind: str, payload: Dict[str, Any], max_attempts: int = 3, delay: float = 0.0
+    ) -> str:
+        """Add a job and return its ID."""
+        return self.enqueue_many(kind, [payload], max_attempts=max_attempts, delay=delay)[0]
+
+    def enqueue_many(
+        self, kind: str, payloads: List[Dict[str, Any]], max_attempts: int = 3, delay: float = 0.0
+    ) -> List[str]:
+        """Add jobs of the same kind in one transaction and return their IDs."""
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, kind, json.dumps(payload), QUEUED, max_attempts, now + delay, now, now)
+            for payload in payloads
+        ]
+        with self._write():
+            self._conn.executemany(
+                """
+                INSERT INTO jobs (id, kind, payload, status, max_attempts, available_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        return [row[0] for row in rows]
+
+    def lease(self, worker_id: str, visibility_timeout: float = 300.0) -> Optional[LeasedJob]:
+        """Lease the oldest available job, or return None if no job is available."""
+        now = time.time()
+        with self._write():
+            self._expire_leases(now)
+            row = self._conn.execute(
+                """
+                SELECT id, kind, payload, attempts, max_attempts FROM jobs
+                WHERE status = ? AND available_at <= ?
+                ORDER BY available_at LIMIT 1
+                """,
+                (QUEUED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, kind, payload, attempts, max_attempts = row
+            expires_at = now + visibility_timeout
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, attempts = ?, lease_owner = ?, lease_expires_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (LEASED, attempts + 1, worker_id, expires_at, now, job_id),
+            )
+        return LeasedJob(
+            id=job_id,
+            kind=kind,
+            payload=json.loads(payload),
+            attempts=attempts + 1,
+            max_attempts=max_attempts,
+            lease_owner=worker_id,
+            lease_expires_at=expires_at,
+        )
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = 300.0) -> bool:
+        """Extend the lease of a running job. Returns False if the worker lost the lease."""
+        now = time.time()
+        with self._write():
+            cursor = self._conn.execute(
+                """
+                UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND status = ? AND lease_owner = ? AND lease_expires_at > ?
+                """,
+                (now + visibility_timeout, now, job_id, LEASED, worker_id, now),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any = None) -> bool:
+        """Mark a leased job as succeeded. Returns False if the worker lost the lease."""
+        now = time.time()
+        with self._write():
+            cursor = self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL,
+                    lease_expires_at = NULL, updated_at = ?
+                WHERE id = ? AND status = ? AND lease_owner = ?
+                """,
+                (SUCCEEDED, json.dumps(result), now, job_id, LEASED, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """
+        Record a failed attempt of a leased job: it is retried after a backoff while it has
+        attempts left, and marked as failed otherwise. Returns False if the worker lost the lease.
+        """
+        now = time.time()
+        with self._write():
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                (job_id, LEASED, worker_id),
+            ).fetchone()
+            if row is None:
+                return False
+            self._retry_or_fail(job_id, row[0], row[1], error, now)
+        return True
+
+    def get(self, job_id: str) -> Optional[dict]:
+        cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([column[0] for column in cursor.description], row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs per status."""
+        counts = {QUEUED: 0, LEASED: 0, SUCCEEDED: 0, FAILED: 0}
+        counts.update(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+    def pending(self) -> int:
+        """Return the number of jobs that are queued or leased."""
+        stats = self.stats()
+        return stats[QUEUED] + stats[LEASED]
+
+    def _expire_leases(self, now: float) -> None:
+        """Release the jobs whose lease expired, as failed attempts of their worker."""
+        expired = self._conn.execute(
+            "SELECT id, attempts, max_attempts, lease_owner FROM jobs WHERE status = ? AND lease_expires_at <= ?",
+            (LEASED, now),
+        ).fetchall()
+        for job_id, attempts, max_attempts, lease_owner in expired:
+            logger.warning(f"Lease of job {job_id} held by {lease_owner} expired")
+            self._retry_or_fail(job_id, attempts, max_attempts, "The lease expired", now)
+
+    def _retry_or_fail(self, job_id: str, attempts: int, max_attempts: int, error: str, now: float) -> None:
+        if attempts < max_attempts:
+            status, available_at = QUEUED, now + self.retry_delay * 2 ** (attempts - 1)
+        else:
+            status, available_at = FAILED, now
+        self._conn.execute(
+            """
+            UPDATE jobs SET status = ?, available_at = ?, error = ?, lease_owner = NULL,
+                lease_expires_at = NULL, updated_at = ?
+            WHERE id = ?
+            """,
+            (status, available_at, error, now, job_id),
+        )
+
+    @contextmanager
+    def _write(self):
+        """Run the block in a `BEGIN IMMEDIATE` transaction, which takes the write lock up front."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
@@ -0,0 +1,578 @@
+"""
+Headless HTTP job service for the web action agents.
+
+Usage:
+    python -m service.job_service --port 8080 --workers 2 --max-queue 20
+
+Endpoints:
+- POST /jobs with {"requirement": "...", "timeout": seconds} queues a run and returns its ID
+  (429 if the queue is full). The run is cancelled once `timeout` has passed since submission.
+  A read-only request identical to a queued or running one joins its run, and a repeat of a
+  request that succeeded less than `--result-ttl` seconds ago is answered from its result,
+  unless the body has "cache": false.
+- GET /jobs/{job_id} returns the status of a run.
+- GET /jobs/{job_id}/result returns the result of a finished run (409 while it is still running).
+- GET /jobs/{job_id}/events streams the progress of a run as server-sent events.
+- DELETE /jobs/{job_id} cancels a queued or running job (409 if it already finished).
+- GET /health returns the queue and browser pool state.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+from utils.browser_cache_util import BrowserDiskCache, get_browser_cache_dir
+from utils.browser_pool_util import BrowserPool
+from utils.cancellation_util import (
+    CancellationToken,
+    RunCancelledError,
+    get_run_timeout,
+    use_run_token,
+)
+from utils.env_util import EnvLoader
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+# Finished jobs kept for status and result queries
+MAX_FINISHED_JOBS = 1000
+
+# Seconds a result answers identical requests
+DEFAULT_RESULT_TTL = 30.0
+
+# Cached results kept at most
+MAX_CACHED_RESULTS = 1000
+
+# Only requests that read are shared, since a request that changes the account, e.g. adding
+# to the cart, must run every time. A request is taken as read-only if it starts with one of
+# these intents and mentions none of the actions below, anything else runs on its own.
+READ_INTENT_PATTERN = re.compile(
+    r"^(please )?(show|list|extract|search|find|compare|check (the )?prices?|what|which|how much)\b",
+    re.IGNORECASE,
+)
+ACTION_PATTERN = re.compile(
+    r"\b(add|remove|delete|empty|clear|buy|purchase|reorder|again|checkout|check out|place|"
+    r"cancel|return|move|save|change|update|set|subscribe|unsubscribe)\b",
+    re.IGNORECASE,
+)
+
+RequestKey = Tuple[str, str, Optional[float]]
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINAL_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is rejected by admission control."""
+
+
+def request_key(requirement: str, account: Optional[str] = None, timeout: Optional[float] = None) -> RequestKey:
+    """
+    The key of identical requests: the account, `AMAZON_EMAIL` by default, the requirement
+    normalized for case, whitespace and final punctuation, and the timeout of the run.
+    """
+    account = account if account is not None else os.getenv("AMAZON_EMAIL", "")
+    intent = re.sub(r"\s+", " ", requirement).strip().rstrip(".!?").strip().lower()
+    return account.lower(), intent, timeout
+
+
+def is_read_only(requirement: str) -> bool:
+    """Whether the request only reads, so identical requests may share its run and result."""
+    requirement = requirement.strip()
+    return READ_INTENT_PATTERN.search(requirement) is not None and ACTION_PATTERN.search(requirement) is None
+
+
+class Job:
+    """A queued agent run with its progress events."""
+
+    def __init__(self, requirement: str, timeout: Optional[float] = None):
+        self.id = uuid.uuid4().hex
+        self.requirement = requirement
+        self.timeout = timeout
+        # The deadline counts from submission, so a job that waited too long never starts
+        self.token = CancellationToken(timeout)
+        self.status = JobStatus.QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.events: List[dict] = []
+        # "run" for a job with its own run, "coalesced" or "cache" for shared results
+        self.source = "run"
+        # Whether the run and result of this job may be shared with identical requests
+        self.shared = True
+        # The job whose run this job shares, and the jobs sharing this job's run
+        self.leader: Optional["Job"] = None
+        self.followers: List["Job"] = []
+        # The follower this job handed its run to when it was cancelled, see `hand_over`
+        self.successor: Optional["Job"] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+    def publish(self, event_type: str, data=None) -> None:
+        """Record an event and hand it to all live subscribers."""
+        if self.successor is not None:
+            # The run goes on for the successor, e.g. its progress
+            self.successor.publish(event_type, data)
+            return
+        event = {"type": event_type, "time": time.time(), "data": data}
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+        for follower in self.followers:
+            follower.publish(event_type, data)
+
+    def follow(self, leader: "Job") -> None:
+        """Share the run of the leader: its past and future events, status and result."""
+        self.source = "coalesced"
+        self.leader = leader
+        self.events = list(leader.events)
+        self._set_status_fields(leader.status)
+        leader.followers.append(self)
+
+    def unfollow(self) -> None:
+        if self.leader is not None:
+            self.leader.followers.remove(self)
+            self.leader = None
+
+    def hand_over(self, reason: str) -> "Job":
+        """
+        Cancel this job but not its run, which goes on for the jobs following it: the first
+        follower leads the run from now on and gets its events, status and result.
+        """
+        successor = self.followers.pop(0)
+        successor.leader = None
+        successor.source = "run"
+        successor.token = self.token
+        successor.followers, self.followers = self.followers, []
+        for follower in successor.followers:
+            follower.leader = successor
+        self.error = reason
+        self.publish("error", self.error)
+        self.set_status(JobStatus.CANCELLED)
+        self.successor = successor
+        return successor
+
+    def run_owner(self) -> "Job":
+        """The job the run of this job reports to, after the hand-overs of cancelled leaders."""
+        job = self
+        while job.successor is not None:
+            job = job.successor
+        return job
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def set_status(self, status: JobStatus) -> None:
+        self._set_status_fields(status)
+        for follower in self.followers:
+            follower.result = self.result
+            follower.error = self.error
+            follower._set_status_fields(status)
+        self.publish("status", status.value)
+
+    def _set_status_fields(self, status: JobStatus) -> None:
+        self.status = status
+        if status == JobStatus.RUNNING:
+            self.started_at = time.time()
+        elif status in FINAL_STATUSES:
+            self.finished_at = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "requirement": self.requirement,
+            "timeout": self.timeout,
+            "status": self.status.value,
+            "source": self.source,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+async def run_amazon_web_agent_job(job: Job, browser) -> str:
+    """Run the Amazon web agent for the job, publishing its progress as events."""
+    from app.amazon_web_agent.amazon_web_agent import amazon_web_agent_arun
+
+    return await amazon_web_agent_arun(
+        job.requirement, browser, on_event=lambda text: job.publish("progress", text)
+    )
+
+
+class JobService:
+    """
+    Queues agent runs and executes them on a shared browser pool.
+
+    Key steps:
+    - `submit` admits a job only while the queue has room, so overload is rejected early
+      instead of piling up runs that would time out.
+    - `workers` coroutines take jobs from the queue, each borrowing a browser from the pool
+      for the duration of the run. The LLM clients are shared through `ChatModelUtil`.
+    - A job runs until it finishes, is cancelled with `cancel`, or its timeout (`job_timeout`
+      by default) passes. A cancelled run aborts its model and browser calls and gives its
+      browser back to the pool right away.
+    - Identical requests (see `request_key`) share one run: a request arriving while an
+      identical one is queued or running follows that run instead of starting its own, and
+      the result of a successful run answers repeats for `result_ttl` seconds. Shared
+      requests take no room in the queue. Only requests recognized as read-only (see
+      `is_read_only`) are shared, and never those submitted with `share=False`. Cancelling
+      a following request only detaches it; cancelling the request that started the run
+      hands the run over to its first follower, and only stops it without followers.
+    - Every run publishes its progress as events, which can be streamed while it runs and
+      replayed afterwards.
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[Job, object], Awaitable[str]] = run_amazon_web_agent_job,
+        browser_pool: Optional[BrowserPool] = None,
+        workers: int = 2,
+        max_queue: int = 20,
+        job_timeout: Optional[float] = None,
+        result_ttl: float = DEFAULT_RESULT_TTL,
+        coalesce: bool = True,
+    ):
+        self.run_job = run_job
+        self.browser_pool = browser_pool or BrowserPool(size=workers)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout if job_timeout is not None else get_run_timeout()
+        self.result_ttl = result_ttl
+        self.coalesce = coalesce
+        # The queued or running job of each request key, and the recent results by key
+        self._in_flight: Dict[RequestKey, Job] = {}
+        self._results: "OrderedDict[RequestKey, Tuple[float, str]]" = OrderedDict()
+        self._runs = 0
+        self._coalesced = 0
+        self._cache_hits = 0
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        await self.browser_pool.close()
+
+    def submit(self, requirement: str, timeout: Optional[float] = None, share: bool = True) -> Job:
+        """
+        Queue a run, or share the run or recent result of an identical request. With `share`
+        False, or for a request that changes the account, the job always gets a run of its own.
+        Raises QueueFullError if a run is needed and the queue has no room.
+        """
+        job = Job(requirement, timeout if timeout is not None else self.job_timeout)
+        job.shared = self.coalesce and share and is_read_only(requirement)
+        key = request_key(requirement, timeout=job.timeout)
+        if job.shared and self._answer_from_cache(job, key):
+            self._cache_hits += 1
+        elif job.shared and key in self._in_flight:
+            job.follow(self._in_flight[key])
+            self._coalesced += 1
+            logger.info(f"Job {job.id} shares the run of job {job.leader.id}")
+        else:
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                raise QueueFullError(f"The job queue is full ({self.max_queue} jobs)")
+            if job.shared:
+                self._in_flight[key] = job
+            self._runs += 1
+            job.publish("status", job.status.value)
+        self.jobs[job.id] = job
+        self._evict_finished_jobs()
+        return job
+
+    def _answer_from_cache(self, job: Job, key: RequestKey) -> bool:
+        cached = self._results.get(key)
+        if cached is None:
+            return False
+        expires_at, result = cached
+        if time.monotonic() >= expires_at:
+            del self._results[key]
+            return False
+        job.source = "cache"
+        job.result = result
+        job.publish("result", job.result)
+        job.set_status(JobStatus.SUCCEEDED)
+        return True
+
+    def _finish_run(self, job: Job) -> None:
+        """Stop sharing the job's run, keeping its result for repeats if it succeeded."""
+        key = request_key(job.requirement, timeout=job.timeout)
+        if self._in_flight.get(key) is job:
+            del self._in_flight[key]
+        if job.status == JobStatus.SUCCEEDED and job.shared and self.result_ttl > 0:
+            self._results[key] = (time.monotonic() + self.result_ttl, job.result)
+            self._results.move_to_end(key)
+            while len(self._results) > MAX_CACHED_RESULTS:
+                self._results.popitem(last=False)
+
+    def cancel(self, job: Job, reason: str = "cancelled by the client") -> None:
+        """Cancel the job; a queued job is skipped, a running job stops at once."""
+        if job.leader is not None:
+            # The shared run goes on for the others
+            job.unfollow()
+            job.error = reason
+            job.publish("error", job.error)
+            job.set_status(JobStatus.CANCELLED)
+            return
+        if job.followers:
+            # The followers still wait for the run, it goes on for them
+            successor = job.hand_over(reason)
+            key = request_key(job.requirement, timeout=job.timeout)
+            if self._in_flight.get(key) is job:
+                self._in_flight[key] = successor
+            logger.info(f"Job {job.id} was cancelled and handed its run over to job {successor.id}")
+            return
+        job.token.cancel(reason)
+        if job.status == JobStatus.QUEUED:
+            job.error = reason
+            job.publish("error", job.error)
+            job.set_status(JobStatus.CANCELLED)
+            self._finish_run(job)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            # Runs, not the jobs sharing them
+            "running": sum(
+                job.status == JobStatus.RUNNING and job.source == "run" for job in self.jobs.values()
+            ),
+            "requests": {
+                "runs": self._runs,
+                "coalesced": self._coalesced,
+                "cache_hits": self._cache_hits,
+                "cached_results": len(self._results),
+            },
+            "browsers": self.browser_pool.stats(),
+        }
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        # A leader cancelled while it was queued hands its run over to a follower
+        job = job.run_owner()
+        if job.done:
+            # Cancelled while it was queued
+            return
+        job.set_status(JobStatus.RUNNING)
+        token = job.token
+        try:
+            token.check()
+            # The run finds its token through the context, see `amazon_web_agent_arun`
+            with use_run_token(token):
+                async with self.browser_pool.acquire() as browser:
+                    result = await token.run(self.run_job(job, browser))
+            # The leader may have been cancelled and handed the run over meanwhile
+            job = job.run_owner()
+            job.result = result
+            job.publish("result", job.result)
+            job.set_status(JobStatus.SUCCEEDED)
+        except RunCancelledError as e:
+            job = job.run_owner()
+            logger.info(f"Job {job.id} stopped: {e}")
+            job.error = str(e)
+            job.publish("error", job.error)
+            job.set_status(JobStatus.CANCELLED)
+        except Exception as e:
+            job = job.run_owner()
+            logger.error(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.publish("error", job.error)
+            job.set_status(JobStatus.FAILED)
+        finally:
+            self._finish_run(job.run_owner())
+
+    def _evict_finished_jobs(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def create_app(self) -> web.Application:
+        """Create the aiohttp application serving the job API."""
+        app = web.Application()
+        app.router.add_post("/jobs", self._handle_submit)
+        app.router.add_get("/jobs/{job_id}", self._handle_status)
+        app.router.add_get("/jobs/{job_id}/result", self._handle_result)
+        app.router.add_get("/jobs/{job_id}/events", self._handle_events)
+        app.router.add_delete("/jobs/{job_id}", self._handle_cancel)
+        app.router.add_get("/health", self._handle_health)
+
+        async def on_startup(app):
+            await self.start()
+
+        async def on_cleanup(app):
+            await self.stop()
+
+        app.on_startup.append(on_startup)
+        app.on_cleanup.append(on_cleanup)
+        return app
+
+    async def _handle_submit(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            body = {}
+        if not isinstance(body, dict):
+            return web.json_response({"error": "The body must be a JSON object"}, status=400)
+        requirement = body.get("requirement")
+        if not isinstance(requirement, str) or not requirement.strip():
+            return web.json_response({"error": "'requirement' is required"}, status=400)
+        timeout = body.get("timeout")
+        if timeout is not None and (
+            isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0
+        ):
+            return web.json_response({"error": "'timeout' must be a positive number of seconds"}, status=400)
+        share = body.get("cache", True)
+        if not isinstance(share, bool):
+            return web.json_response({"error": "'cache' must be true or false"}, status=400)
+        try:
+            job = self.submit(requirement, timeout, share)
+        except QueueFullError as e:
+            return web.json_response({"error": str(e)}, status=429, headers={"Retry-After": "10"})
+        return web.json_response(job.to_dict(), status=202)
+
+    def _get_job(self, request: web.Request) -> Job:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(
+                text=json.dumps({"error": "Unknown job"}), content_type="application/json"
+            )
+        return job
+
+    async def _handle_status(self, request: web.Request) -> web.Response:
+        return web.json_response(self._get_job(request).to_dict())
+
+    async def _handle_cancel(self, request: web.Request) -> web.Response:
+        job = self._get_job(request)
+        if job.done:
+            return web.json_response(job.to_dict(), status=409)
+        self.cancel(job)
+        return web.json_response(job.to_dict(), status=202)
+
+    async def _handle_result(self, request: web.Request) -> web.Response:
+        job = self._get_job(request)
+        if not job.done:
+            return web.json_response(job.to_dict(), status=409)
+        return web.json_response(
+            {"job_id": job.id, "status": job.status.value, "result": job.result, "error": job.error}
+        )
+
+    async def _handle_events(self, request: web.Request) -> web.StreamResponse:
+        job = self._get_job(request)
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+
+        # Replay the past events and subscribe without yielding, so no event is missed or duplicated
+        past_events = list(job.events)
+        queue = job.subscribe() if not job.done else None
+        try:
+            for event in past_events:
+                await self._write_event(response, event)
+            while queue is not None:
+                event = await queue.get()
+                await self._write_event(response, event)
+                if event["type"] == "status" and event["data"] in {s.value for s in FINAL_STATUSES}:
+                    break
+        finally:
+            if queue is not None:
+                job.unsubscribe(queue)
+        return response
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    @staticmethod
+    async def _write_event(response: web.StreamResponse, event: dict) -> None:
+        payload = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        await response.write(payload.encode("utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the web action agent job service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent runs, one browser each")
+    parser.add_argument("--max-queue", type=int, default=20, help="Queued runs before rejecting")
+    parser.add_argument("--headed", action="store_true", help="Show the browsers")
+    parser.add_argument("--max-tasks-per-browser", type=int, default=50, help="Runs before a browser is recycled")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="Memory of a browser before it is recycled")
+    parser.add_argument("--browser-cache-dir", default=None, help="Persistent browser disk cache, defaults to BROWSER_CACHE_DIR")
+    parser.add_argument("--browser-cache-mb", type=float, default=512, help="Size limit of the browser cache")
+    parser.add_argument("--result-ttl", type=float, default=DEFAULT_RESULT_TTL, help="Seconds a result answers identical requests, 0 to disable")
+    parser.add_argument("--no-coalesce", action="store_true", help="Run every request, even identical ones")
+    parser.add_argument("--job-timeout", type=float, default=None, help="Seconds before a job is cancelled, defaults to AGENT_RUN_TIMEOUT")
+    args = parser.parse_args()
+
+    # Load environment variables
+    EnvLoader()
+    browser_cache_dir = args.browser_cache_dir or get_browser_cache_dir()
+
+    service = JobService(
+        browser_pool=BrowserPool(
+            size=args.workers,
+            headless=not args.headed,
+            max_tasks_per_browser=args.max_tasks_per_browser,
+            max_rss_mb=args.max_rss_mb,
+            disk_cache=(
+                BrowserDiskCache(browser_cache_dir, args.browser_cache_mb, slots=args.workers)
+                if browser_cache_dir
+                else None
+            ),
+        ),
+        workers=args.workers,
+        max_queue=args.max_queue,
+        job_timeout=args.job_timeout,
+        result_ttl=args.result_ttl,
+        coalesce=not args.no_coalesce,
+    )
+    web.run_app(service.create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Multi-process workers pulling jobs from the shared SQLite job queue.
+
+Usage:
+    python -m service.worker_pool enqueue --requirement "Show me my shopping cart info on Amazon"
+    python -m service.worker_pool enqueue --asins B000000001 B000000002
+    python -m service.worker_pool run --processes 4 --job-timeout 600
+
+Every process runs its own event loop and browsers, so parsing and driving Playwright use
+all cores instead of one.
+"""
+import argparse
+import asyncio
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from service.job_queue import LeasedJob, SQLiteJobQueue, default_worker_id
+from utils.browser_cache_util import BrowserDiskCache, get_browser_cache_dir, monitor_page_loads
+from utils.browser_pool_util import BrowserPool
+from utils.cancellation_util import CancellationToken, get_run_timeout, use_run_token
+from utils.env_util import EnvLoader
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+JobHandler = Callable[[Dict[str, Any], BrowserPool], Awaitable[Any]]
+
+# Handlers by job kind, as import paths so that they can be resolved in spawned processes
+DEFAULT_HANDLERS = {
+    "agent": "service.worker_pool:run_agent_job",
+    "product": "service.worker_pool:refresh_product_job",
+}
+
+
+async def run_agent_job(payload: Dict[str, Any], browser_pool: BrowserPool) -> Optional[str]:
+    """Run the Amazon web agent for `payload["requirement"]`."""
+    from app.amazon_web_agent.amazon_web_agent import amazon_web_agent_arun
+
+    async with browser_pool.acquire() as browser:
+        # The agent logs its progress, there is no page to render it on. It runs under the
+        # job's token, see `Worker.process`
+        return await amazon_web_agent_arun(payload["requirement"], browser, on_event=lambda text: None)
+
+
+async def refresh_product_job(payload: Dict[str, Any], browser_pool: BrowserPool) -> dict:
+    """Load and parse the product detail page of `payload["asin"]`."""
+    from app.amazon_web_agent.tab_pool import TabPool
+    from app.amazon_web_agent.tools.search_products_tool import fetch_products
+
+    async with browser_pool.acquire() as browser:
+        context = await browser.new_context()
+        monitor_page_loads(context)
+        async with TabPool(context, size=1) as pool:
+            product = (await fetch_products(pool, [payload["asin"]]))[0]
+    if "error" in product:
+        raise RuntimeError(product["error"])
+    return product
+
+
+def resolve_handler(handler: Union[str, JobHandler]) -> JobHandler:
+    """Resolve a handler given as a `module:function` import path."""
+    if callable(handler):
+        return handler
+    module_name, function_name = handler.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+class Worker:
+    """
+    Leases jobs from the queue and runs them on the browsers of one process.
+
+    Key steps:
+    - `concurrency` coroutines lease jobs, each borrowing a browser from the process's pool.
+    - While a job runs, its lease is extended every third of the visibility timeout, so a
+      slow job is not handed to another worker, but the job of a dead worker is.
+    - A job is cancelled after `job_timeout` seconds, or `payload["timeout"]` if given, and
+      when its lease is lost. It then fails and releases its browser right away.
+    - A failed job goes back to the queue for a retry until its attempts are used up.
+    - The queue calls block on the SQLite lock while other processes write, so they run on a
+      thread of their own, which also owns the connection, and never stall the event loop.
+    """
+
+    def __init__(
+        self,
+        queue_path: Optional[str] = None,
+        handlers: Optional[Dict[str, Union[str, JobHandler]]] = None,
+        concurrency: int = 1,
+        visibility_timeout: float = 300.0,
+        job_timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+        exit_when_empty: bool = False,
+        headless: bool = True,
+        max_tasks_per_browser: Optional[int] = 50,
+        max_rss_mb: Optional[float] = None,
+        browser_cache_dir: Optional[str] = None,
+        browser_cache_mb: float = 512,
+        browser_cache_slots: Optional[int] = None,
+        worker_id: Optional[str] = None,
+    ):
+        # The queue is created, used and closed on its own thread, see `_call_queue`
+        self._queue_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-queue")
+        self.queue = self._queue_executor.submit(SQLiteJobQueue, queue_path).result()
+        self.handlers = {
+            kind: resolve_handler(handler) for kind, handler in (handlers or DEFAULT_HANDLERS).items()
+        }
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.job_timeout = job_timeout if job_timeout is not None else get_run_timeout()
+        self.poll_interval = poll_interval
+        self.exit_when_empty = exit_when_empty
+        self.worker_id = worker_id or default_worker_id()
+        # Browsers are only launched once a job needs one
+        browser_cache_dir = browser_cache_dir or get_browser_cache_dir()
+        self.browser_pool = BrowserPool(
+            size=concurrency,
+            headless=headless,
+            max_tasks_per_browser=max_tasks_per_browser,
+            max_rss_mb=max_rss_mb,
+            disk_cache=(
+                # The browsers of all workers share the cache directory
+                BrowserDiskCache(browser_cache_dir, browser_cache_mb, slots=browser_cache_slots or concurrency)
+                if browser_cache_dir
+                else None
+            ),
+        )
+        self.processed = 0
+        self.failed = 0
+
+    async def run(self, stop_event=None) -> None:
+        """Process jobs until `stop_event` is set or, with `exit_when_empty`, the queue is drained."""
+        try:
+            await asyncio.gather(*(self._loop(stop_event) for _ in range(self.concurrency)))
+        finally:
+            logger.info(f"Worker {self.worker_id} browsers: {self.browser_pool.stats()}")
+            await self.browser_pool.close()
+            await self._call_queue(self.queue.close)
+            self._queue_executor.shutdown()
+        logger.info(f"Worker {self.worker_id} processed {self.processed} jobs, {self.failed} failed")
+
+    async def _loop(self, stop_event) -> None:
+        while stop_event is None or not stop_event.is_set():
+            job = await self._call_queue(self.queue.lease, self.worker_id, self.visibility_timeout)
+            if job is None:
+                if self.exit_when_empty and not await self._call_queue(self.queue.pending):
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self.process(job)
+
+    async def process(self, job: LeasedJob) -> None:
+        handler = self.handlers.get(job.kind)
+        token = CancellationToken(job.payload.get("timeout") or self.job_timeout)
+        heartbeat = asyncio.create_task(self._heartbeat(job, token))
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind '{job.kind}'")
+            with use_run_token(token):
+                result = await token.run(handler(job.payload, self.browser_pool))
+        except Exception as e:
+            logger.warning(f"Job {job.id} failed on attempt {job.attempts}/{job.max_attempts}: {e}")
+            self.failed += 1
+            await self._call_queue(self.queue.fail, job.id, self.worker_id, str(e))
+        else:
+            self.processed += 1
+            if not await self._call_queue(self.queue.complete, job.id, self.worker_id, result):
+                logger.warning(f"Job {job.id} finished after its lease was lost")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: LeasedJob, token: CancellationToken) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await self._call_queue(self.queue.heartbeat, job.id, self.worker_id, self.visibility_timeout):
+                logger.warning(f"Lost the lease of job {job.id}")
+                # Another worker may run the job by now
+                token.cancel("the lease of the job was lost")
+                return
+
+    async def _call_queue(self, function: Callable[..., Any], *args) -> Any:
+        """Run a call of the job queue on the queue's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._queue_executor, function, *args)
+
+
+def _run_worker_process(worker_kwargs: dict, stop_event) -> None:
+    # Load environment variables
+    EnvLoader()
+    worker = Worker(**worker_kwargs)
+    asyncio.run(worker.run(stop_event))
+
+
+class WorkerPool:
+    """
+    Runs `processes` worker processes, each with its own event loop, browsers and queue connection.
+
+    Processes are spawned rather than forked, since Playwright and asyncio state do not survive a fork.
+
+    Example:
+        pool = WorkerPool(processes=4, exit_when_empty=True)
+        pool.start()
+        pool.join()
+    """
+
+    def __init__(self, processes: Optional[int] = None, **worker_kwargs):
+        self.processes = processes or os.cpu_count() or 1
+        self.worker_kwargs = worker_kwargs
+        # Each browser slot of the shared cache gets its share of the size limit
+        self.worker_kwargs.setdefault(
+            "browser_cache_slots", self.processes * worker_kwargs.get("concurrency", 1)
+        )
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes: List[multiprocessing.Process] = []
+
+    def start(self) -> None:
+        for index in range(self.processes):
+            process = self._context.Process(
+                target=_run_worker_process,
+                args=(self.worker_kwargs, self._stop_event),
+                name=f"worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        logger.info(f"Started {self.processes} worker processes")
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        deadline = time.time() + timeout if timeout is not None else None
+        for process in self._processes:
+            process.join(None if deadline is None else max(0.0, deadline - time.time()))
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Let the workers finish their current jobs, then terminate the ones still running."""
+        self._stop_event.set()
+        self.join(timeout)
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run or feed the multi-process job workers.")
+    parser.add_argument("--queue", default=None, help="Path of the SQLite job queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add jobs to the queue")
+    enqueue_parser.add_argument("--requirement", action="append", default=[], help="An agent request")
+    enqueue_parser.add_argument("--asins", nargs="*", default=[], help="Products to refresh")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=3)
+
+    run_parser = subparsers.add_parser("run", help="Run the worker processes")
+    run_parser.add_argument("--processes", type=int, default=None, help="Defaults to the number of cores")
+    run_parser.add_argument("--concurrency", type=int, default=1, help="Jobs per process, one browser each")
+    run_parser.add_argument("--visibility-timeout", type=float, default=300.0)
+    run_parser.add_argument("--job-timeout", type=float, default=None, help="Seconds before a job is cancelled, defaults to AGENT_RUN_TIMEOUT")
+    run_parser.add_argument("--exit-when-empty", action="store_true")
+    run_parser.add_argument("--headed", action="store_true", help="Show the browsers")
+    run_parser.add_argument("--max-tasks-per-browser", type=int, default=50, help="Jobs before a browser is recycled")
+    run_parser.add_argument("--max-rss-mb", type=float, default=None, help="Memory of a browser before it is recycled")
+    run_parser.add_argument(
+        "--browser-cache-dir",
+        default=None,
+        help="Persistent browser disk cache shared by the workers, defaults to BROWSER_CACHE_DIR",
+    )
+    run_parser.add_argument("--browser-cache-mb", type=float, default=512, help="Size limit of the browser cache")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        queue = SQLiteJobQueue(args.queue)
+        queue.enqueue_many(
+            "agent", [{"requirement": r} for r in args.requirement], max_attempts=args.max_attempts
+        )
+        queue.enqueue_many("product", [{"asin": a} for a in args.asins], max_attempts=args.max_attempts)
+        logger.info(f"Job queue: {queue.stats()}")
+        return
+
+    pool = WorkerPool(
+        processes=args.processes,
+        queue_path=args.queue,
+        concurrency=args.concurrency,
+        visibility_timeout=args.visibility_timeout,
+        job_timeout=args.job_timeout,
+        exit_when_empty=args.exit_when_empty,
+        headless=not args.headed,
+        max_tasks_per_browser=args.max_tasks_per_browser,
+        max_rss_mb=args.max_rss_mb,
+        browser_cache_dir=args.browser_cache_dir,
+        browser_cache_mb=args.browser_cache_mb,
+    )
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
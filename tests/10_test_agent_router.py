@@ -0,0 +1,65 @@
+import unittest
+
+from langchain_core.tools import StructuredTool
+
+from app.agent_router import AgentRouter
+
+
+def create_tool(name: str, calls: list) -> StructuredTool:
+    def run(user_requirement: str) -> str:
+        calls.append((name, user_requirement))
+        return f"{name} done"
+
+    return StructuredTool.from_function(func=run, name=name, description=name)
+
+
+class FakeDelegator:
+    def __init__(self, tools):
+        self.tools = tools
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs)
+        return {"output": "delegated"}
+
+
+class TestAgentRouter(unittest.TestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.calls = []
+        self.delegators = []
+
+        def create_delegator(tools):
+            delegator = FakeDelegator(tools)
+            self.delegators.append(delegator)
+            return delegator
+
+        self.router = AgentRouter(create_delegator)
+
+    def test_single_sub_agent_is_dispatched_directly(self):
+        self.router.register(create_tool("amazon", self.calls), ["amazon"])
+        self.assertEqual("amazon done", self.router.invoke("Anything at all"))
+        self.assertEqual([("amazon", "Anything at all")], self.calls)
+        self.assertEqual([], self.delegators)
+
+    def test_confident_classification_and_fallback(self):
+        self.router.register(create_tool("amazon", self.calls), ["amazon", "cart", "order"])
+        self.router.register(create_tool("ebay", self.calls), ["ebay", "auction", "bid"])
+
+        self.router.invoke("Show me my shopping cart info on Amazon")
+        self.assertEqual("amazon", self.calls[-1][0])
+
+        # Unclear requests go through the delegator, which is built only once
+        self.router.invoke("What can you do?")
+        self.router.invoke("Help me")
+        self.assertEqual(1, len(self.delegators))
+        self.assertEqual(2, len(self.delegators[0].inputs))
+        self.assertEqual({"direct": 0, "classified": 1, "delegated": 2}, self.router.stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from service.job_service import JobService
+
+
+class FakeBrowserPool:
+    def __init__(self):
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquired += 1
+        yield object()
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {"acquired": self.acquired}
+
+
+class TestJobService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.release = asyncio.Event()
+
+    async def run_job(self, job, browser):
+        job.publish("progress", "Sign in into Amazon")
+        await self.release.wait()
+        if job.requirement == "fail":
+            raise RuntimeError("boom")
+        job.publish("progress", "Ai Message: Your cart has 3 items")
+        return "Ai Message: Your cart has 3 items"
+
+    async def asyncSetUp(self):
+        self.service = JobService(
+            run_job=self.run_job, browser_pool=FakeBrowserPool(), workers=1, max_queue=1
+        )
+        self.client = TestClient(TestServer(self.service.create_app()))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        await self.client.close()
+
+    async def test_job_lifecycle_and_events(self):
+        response = await self.client.post("/jobs", json={"requirement": "Show my cart"})
+        self.assertEqual(202, response.status)
+        job_id = (await response.json())["job_id"]
+
+        await asyncio.sleep(0.05)
+        response = await self.client.get(f"/jobs/{job_id}/result")
+        self.assertEqual(409, response.status)
+
+        events_response = await self.client.get(f"/jobs/{job_id}/events")
+        self.release.set()
+        body = await events_response.text()
+        self.assertIn("event: progress", body)
+        self.assertIn("Your cart has 3 items", body)
+        self.assertIn('"data": "succeeded"', body)
+
+        response = await self.client.get(f"/jobs/{job_id}/result")
+        self.assertEqual("Ai Message: Your cart has 3 items", (await response.json())["result"])
+
+    async def test_admission_control(self):
+        # One job runs, one waits in the queue, the third is rejected
+        statuses = []
+        for requirement in ["Show my cart", "Show my orders", "Show my account"]:
+            response = await self.client.post("/jobs", json={"requirement": requirement})
+            statuses.append(response.status)
+            await asyncio.sleep(0.05)
+        self.assertEqual([202, 202, 429], statuses)
+
+        response = await self.client.post("/jobs", json={})
+        self.assertEqual(400, response.status)
+        for body in ([], "Show my cart", 1, None, {"requirement": "Show my cart", "cache": "no"}):
+            response = await self.client.post("/jobs", json=body)
+            self.assertEqual(400, response.status)
+
+    async def test_failed_job(self):
+        response = await self.client.post("/jobs", json={"requirement": "fail"})
+        job_id = (await response.json())["job_id"]
+        self.release.set()
+        await asyncio.sleep(0.05)
+
+        status = await (await self.client.get(f"/jobs/{job_id}")).json()
+        self.assertEqual("failed", status["status"])
+        self.assertEqual("boom", status["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from service.job_queue import FAILED, LEASED, QUEUED, SUCCEEDED, SQLiteJobQueue
+from service.worker_pool import Worker
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue_path = os.path.join(self.tmp_dir.name, "job_queue.sqlite3")
+        self.queue = SQLiteJobQueue(self.queue_path, retry_delay=0)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp_dir.cleanup()
+
+    def test_lease_and_complete(self):
+        job_id = self.queue.enqueue("product", {"asin": "B000000001"})
+
+        job = self.queue.lease("worker-1", visibility_timeout=60)
+        self.assertEqual(job_id, job.id)
+        self.assertEqual({"asin": "B000000001"}, job.payload)
+        self.assertEqual(1, job.attempts)
+
+        # A leased job is not handed to another worker
+        self.assertIsNone(self.queue.lease("worker-2", visibility_timeout=60))
+        self.assertFalse(self.queue.complete(job_id, "worker-2", {}))
+
+        self.assertTrue(self.queue.heartbeat(job_id, "worker-1", visibility_timeout=60))
+        self.assertTrue(self.queue.complete(job_id, "worker-1", {"price": 10.99}))
+        stored = self.queue.get(job_id)
+        self.assertEqual(SUCCEEDED, stored["status"])
+        self.assertEqual({"price": 10.99}, stored["result"])
+
+    def test_visibility_timeout_and_retries(self):
+        job_id = self.queue.enqueue("product", {"asin": "B000000001"}, max_attempts=2)
+
+        # The first worker dies holding the lease, so the job is handed to another worker
+        self.queue.lease("worker-1", visibility_timeout=0.01)
+        time.sleep(0.02)
+        job = self.queue.lease("worker-2", visibility_timeout=60)
+        self.assertEqual(2, job.attempts)
+        self.assertFalse(self.queue.heartbeat(job_id, "worker-1", visibility_timeout=60))
+
+        # The last attempt fails for good
+        self.assertTrue(self.queue.fail(job_id, "worker-2", "timeout"))
+        stored = self.queue.get(job_id)
+        self.assertEqual(FAILED, stored["status"])
+        self.assertEqual("timeout", stored["error"])
+        self.assertIsNone(self.queue.lease("worker-1"))
+        self.assertEqual({QUEUED: 0, LEASED: 0, SUCCEEDED: 0, FAILED: 1}, self.queue.stats())
+
+    async def test_worker_drains_queue(self):
+        calls = []
+
+        async def handler(payload, browser_pool):
+            calls.append(payload["asin"])
+            if payload["asin"] == "flaky" and calls.count("flaky") == 1:
+                raise RuntimeError("timeout")
+            return {"asin": payload["asin"]}
+
+        self.queue.enqueue_many("product", [{"asin": "B000000001"}, {"asin": "flaky"}])
+        self.queue.enqueue("unknown", {}, max_attempts=1)
+
+        worker = Worker(
+            queue_path=self.queue_path,
+            handlers={"product": handler},
+            concurrency=2,
+            poll_interval=0.01,
+            exit_when_empty=True,
+        )
+        await worker.run()
+
+        self.assertEqual(["B000000001", "flaky", "flaky"], sorted(calls))
+        self.assertEqual({QUEUED: 0, LEASED: 0, SUCCEEDED: 2, FAILED: 1}, self.queue.stats())
+
+
+    async def test_locked_queue_does_not_block_the_loop(self):
+        async def handler(payload, browser_pool):
+            return {"asin": payload["asin"]}
+
+        self.queue.enqueue("product", {"asin": "B000000001"})
+        worker = Worker(
+            queue_path=self.queue_path, handlers={"product": handler}, poll_interval=0.01, exit_when_empty=True
+        )
+
+        # Another process holds the write lock
+        lock = sqlite3.connect(self.queue_path, isolation_level=None)
+        lock.execute("BEGIN IMMEDIATE")
+        run = asyncio.create_task(worker.run())
+        start = time.perf_counter()
+        for _ in range(10):
+            await asyncio.sleep(0.02)
+        # The loop kept running while the worker waited for the lock
+        self.assertLess(time.perf_counter() - start, 1.0)
+        lock.execute("ROLLBACK")
+        lock.close()
+        await run
+
+        self.assertEqual(1, worker.processed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import subprocess
+import sys
+import time
+import unittest
+from unittest import mock
+
+import psutil
+
+from utils.browser_pool_util import BrowserPool, find_new_process_root, get_child_pids, track_run
+
+
+class FakeContext:
+    def __init__(self, browser, fail_close=False):
+        self.browser = browser
+        self.pages = []
+        self.fail_close = fail_close
+
+    async def new_page(self):
+        page = object()
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        if self.fail_close:
+            raise RuntimeError("Target closed")
+        self.browser.contexts.remove(self)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.closed = False
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    async def new_context(self, fail_close=False):
+        context = FakeContext(self, fail_close)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserPool(BrowserPool):
+    async def _launch(self):
+        browser = FakeBrowser()
+        self._browsers.append(browser)
+        self._tasks[id(browser)] = 0
+        return browser
+
+
+class TestBrowserPool(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+
+    async def test_contexts_closed_and_browser_recycled(self):
+        pool = FakeBrowserPool(size=1, max_tasks_per_browser=2)
+
+        async with pool.acquire() as first_browser:
+            context = await first_browser.new_context()
+            await context.new_page()
+            await context.new_page()
+            self.assertEqual(2, pool.stats()["pages"])
+        self.assertEqual([], first_browser.contexts)
+        self.assertEqual(2, pool.stats()["closed_pages"])
+
+        # The browser is reused, then recycled after its second run
+        async with pool.acquire() as browser:
+            self.assertIs(first_browser, browser)
+        self.assertTrue(first_browser.closed)
+        async with pool.acquire() as browser:
+            self.assertIsNot(first_browser, browser)
+
+        stats = pool.stats()
+        self.assertEqual(1, stats["recycled"])
+        self.assertEqual(1, stats["launched"])
+        self.assertEqual(0, stats["contexts"])
+        await pool.close()
+
+    async def test_leaked_context_recycles_browser(self):
+        pool = FakeBrowserPool(size=1, max_tasks_per_browser=None)
+        async with pool.acquire() as browser:
+            await browser.new_context(fail_close=True)
+        self.assertTrue(browser.closed)
+        self.assertEqual(1, pool.stats()["leaks"])
+        self.assertEqual(0, pool.stats()["launched"])
+
+    async def test_only_the_browser_over_its_memory_limit_is_recycled(self):
+        pool = FakeBrowserPool(size=2, max_tasks_per_browser=None, max_rss_mb=500)
+        async with pool.acquire() as big, pool.acquire() as small:
+            pool._pids = {id(big): 1, id(small): 2}
+        rss = {1: 600 * 2**20, 2: 100 * 2**20}
+        with mock.patch("utils.browser_pool_util.get_process_tree_rss", rss.get):
+            async with pool.acquire() as browser:
+                pass
+            async with pool.acquire() as browser:
+                pass
+        self.assertTrue(big.closed)
+        self.assertFalse(small.closed)
+        self.assertEqual(1, pool.stats()["recycled"])
+
+    async def test_disconnected_browser_is_replaced(self):
+        pool = FakeBrowserPool(size=1, max_tasks_per_browser=None)
+        async with pool.acquire() as first_browser:
+            pass
+        # Chromium crashed while the browser was idle
+        first_browser.connected = False
+        async with pool.acquire() as browser:
+            self.assertIsNot(first_browser, browser)
+            self.assertTrue(first_browser.closed)
+            # ... or during the run
+            browser.connected = False
+        self.assertEqual(0, pool.stats()["launched"])
+        self.assertEqual(2, pool.stats()["recycled"])
+
+    def test_find_new_process_root(self):
+        before = get_child_pids()
+        # A process with a child of its own, like a browser with its renderers
+        script = "import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(5)']); time.sleep(5)"
+        process = subprocess.Popen([sys.executable, "-c", script])
+        try:
+            for _ in range(50):
+                if len(get_child_pids() - before) >= 2:
+                    break
+                time.sleep(0.1)
+            self.assertEqual(process.pid, find_new_process_root(before))
+        finally:
+            for child in psutil.Process(process.pid).children(recursive=True):
+                child.kill()
+            process.kill()
+            process.wait()
+
+    async def test_track_run(self):
+        browser = FakeBrowser()
+        existing = await browser.new_context()
+        async with track_run(browser):
+            context = await browser.new_context()
+            await context.new_page()
+        self.assertEqual([existing], browser.contexts)
+
+
+if __name__ == "__main__":
+    unittest.main()
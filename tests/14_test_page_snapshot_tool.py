@@ -0,0 +1,82 @@
+import unittest
+
+from app.amazon_web_agent.tools.page_snapshot_tool import (
+    diff_snapshots,
+    render_snapshot,
+    take_snapshot,
+)
+
+SEARCH_BOX = {"id": 1, "role": "searchbox", "name": "Search Amazon", "value": ""}
+CART_LINK = {"id": 2, "role": "link", "name": "Cart"}
+ADD_TO_CART = {"id": 3, "role": "button", "name": "Add to Cart"}
+GIFT_OPTION = {"id": 4, "role": "checkbox", "name": "This is a gift", "checked": False}
+
+
+class FakePage:
+    def __init__(self, url, elements):
+        self.url = url
+        self.elements = elements
+
+    async def evaluate(self, script, arg):
+        return [dict(element) for element in self.elements]
+
+    async def title(self):
+        return "Fixture Product 1"
+
+
+class TestPageSnapshotTool(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+
+    def test_render_snapshot(self):
+        snapshot = render_snapshot(
+            "http://localhost/dp/B000000001",
+            "Fixture Product 1",
+            [SEARCH_BOX, CART_LINK, ADD_TO_CART, GIFT_OPTION],
+            max_elements=3,
+        )
+        self.assertEqual(
+            "Page: Fixture Product 1 (http://localhost/dp/B000000001)\n"
+            '[1] searchbox "Search Amazon"\n'
+            '[2] link "Cart"\n'
+            '[3] button "Add to Cart"\n'
+            "... 1 more elements",
+            snapshot,
+        )
+
+    def test_diff_snapshots(self):
+        filled = dict(SEARCH_BOX, value="usb cable")
+        diff = diff_snapshots([SEARCH_BOX, CART_LINK, ADD_TO_CART], [filled, ADD_TO_CART, GIFT_OPTION])
+        self.assertEqual(
+            '~ [1] searchbox "Search Amazon" value="usb cable"\n'
+            '+ [4] checkbox "This is a gift" unchecked\n'
+            "- [2]",
+            diff,
+        )
+
+    async def test_later_snapshots_are_diffs(self):
+        page = FakePage("http://localhost/dp/B000000001", [SEARCH_BOX, CART_LINK, ADD_TO_CART, GIFT_OPTION])
+        first = await take_snapshot(page)
+        self.assertTrue(first.startswith("Page: "))
+
+        page.elements = [SEARCH_BOX, CART_LINK, ADD_TO_CART, dict(GIFT_OPTION, checked=True)]
+        second = await take_snapshot(page)
+        self.assertEqual(
+            "Changes since the last snapshot of http://localhost/dp/B000000001:\n"
+            '~ [4] checkbox "This is a gift" checked',
+            second,
+        )
+        self.assertIn("No changes", await take_snapshot(page))
+
+        # A new URL or an explicit request gets the full list again
+        self.assertTrue((await take_snapshot(page, full=True)).startswith("Page: "))
+        page.url = "http://localhost/gp/cart/view.html"
+        self.assertTrue((await take_snapshot(page)).startswith("Page: "))
+
+
+if __name__ == "__main__":
+    unittest.main()
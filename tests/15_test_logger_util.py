@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import unittest
+
+from utils.event_channel_util import EventChannel
+from utils.logger_util import DebugRateLimitFilter, JsonFormatter, LoggerUtil, TracebackQueueHandler
+
+
+def make_record(level=logging.DEBUG, lineno=10, **extra):
+    record = logging.LogRecord("root", level, "module.py", lineno, "Loaded %s", ("page",), None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLoggerUtil(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+
+    def test_configured_once(self):
+        logger = LoggerUtil.get_logger()
+        handlers = list(logger.handlers)
+        self.assertIs(logger, LoggerUtil.get_logger())
+        self.assertEqual(handlers, logger.handlers)
+        queue_handlers = [h for h in handlers if isinstance(h, logging.handlers.QueueHandler)]
+        self.assertEqual(1, len(queue_handlers))
+
+    def test_json_formatter(self):
+        entry = json.loads(JsonFormatter().format(make_record(level=logging.INFO, job_id="42")))
+        self.assertEqual("Loaded page", entry["message"])
+        self.assertEqual("INFO", entry["level"])
+        self.assertEqual("42", entry["job_id"])
+        self.assertNotIn("lineno", entry)
+
+    def test_queued_exception(self):
+        try:
+            raise ValueError("bad price")
+        except ValueError:
+            record = logging.LogRecord("root", logging.ERROR, "module.py", 1, "Failed %s", ("job",), sys.exc_info())
+        queued = TracebackQueueHandler(queue.SimpleQueue()).prepare(record)
+
+        entry = json.loads(JsonFormatter().format(queued))
+        self.assertEqual("Failed job", entry["message"])
+        self.assertIn("ValueError: bad price", entry["exception"])
+        text = logging.Formatter("%(message)s").format(queued)
+        self.assertTrue(text.startswith("Failed job\nTraceback"))
+
+    def test_debug_rate_limit(self):
+        log_filter = DebugRateLimitFilter(rate=3)
+        passed = [log_filter.filter(make_record()) for _ in range(10)]
+        self.assertEqual(3, sum(passed))
+        # Other call sites and levels have their own budget
+        self.assertTrue(log_filter.filter(make_record(lineno=11)))
+        self.assertTrue(log_filter.filter(make_record(level=logging.INFO)))
+
+        self.assertFalse(DebugRateLimitFilter(sample_rate=0.0).filter(make_record()))
+
+    async def test_event_channel(self):
+        batches = []
+        channel = EventChannel(maxsize=3)
+        for index in range(5):
+            channel.publish(index)
+        consumer = asyncio.create_task(channel.consume(batches.append))
+        await asyncio.sleep(0)
+        channel.publish(5)
+        await channel.close()
+        await consumer
+
+        # The oldest events were dropped while nobody consumed them
+        self.assertEqual([2, 3, 4, 5], [event for batch in batches for event in batch])
+        self.assertEqual(2, channel.dropped)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import json
+import unittest
+import urllib.request
+
+from app.amazon_web_agent.extraction.extraction_engine import load_schema
+from app.amazon_web_agent.extraction.response_capture import (
+    ResponseCapture,
+    enable_response_capture,
+    get_response_capture,
+)
+from app.amazon_web_agent.tools.extract_content_tool import extract_page_records
+from eval.amazon_fixture_server import AmazonFixtureServer
+
+
+class FakePage:
+    def __init__(self, url, context=None, html=""):
+        self.url = url
+        self.context = context
+        self.html = html
+        self.content_calls = 0
+
+    async def content(self):
+        self.content_calls += 1
+        return self.html
+
+
+class FakeFrame:
+    def __init__(self, page):
+        self.page = page
+        self.parent_frame = None
+
+
+class FakeRequest:
+    def __init__(self, page, navigation=True):
+        self.frame = FakeFrame(page)
+        self._navigation = navigation
+
+    def is_navigation_request(self):
+        return self._navigation
+
+
+class FakeResponse:
+    def __init__(self, url, payload, page, content_type="application/json"):
+        self.url = url
+        self.headers = {"content-type": content_type}
+        self.frame = FakeFrame(page)
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+
+class FakeContext:
+    def __init__(self):
+        self.handlers = []
+
+    def on(self, event, handler):
+        self.handlers.append((event, handler))
+
+    def emit(self, argument, event="response"):
+        for name, handler in self.handlers:
+            if name == event:
+                handler(argument)
+
+
+def fetch_json(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+class TestResponseCapture(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.server = AmazonFixtureServer(order_count=12)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_records_from_captured_json(self):
+        context = FakeContext()
+        capture = enable_response_capture(context)
+        self.assertIs(capture, enable_response_capture(context))
+
+        orders_url = f"{self.server.base_url}/your-orders/orders"
+        page = FakePage(orders_url, context)
+        self.assertIs(capture, get_response_capture(page))
+
+        # Unrelated and non-JSON responses are ignored
+        context.emit(FakeResponse(f"{self.server.base_url}/gp/cart/view.html", {}, page, "text/html"))
+        api_url = f"{self.server.base_url}/your-orders/api/orders?startIndex=0"
+        context.emit(FakeResponse(api_url, fetch_json(api_url), page))
+
+        records, next_page = await extract_page_records(page, load_schema("orders"))
+        self.assertEqual(10, len(records))
+        self.assertEqual(
+            {
+                "order_id": "111-0000012-0000000",
+                "order_date": "January 13, 2026",
+                "total": "$12.00",
+                "status": "Delivered",
+                "items": ["Fixture Product 12"],
+            },
+            records[0],
+        )
+        self.assertEqual("/your-orders/orders?startIndex=10", next_page)
+        # The HTML was never serialized
+        self.assertEqual(0, page.content_calls)
+
+    async def test_product_and_cart_payloads(self):
+        capture = ResponseCapture()
+        page = FakePage(f"{self.server.base_url}/dp/B000000002")
+        api_url = f"{self.server.base_url}/api/dp/B000000002"
+        capture.on_response(FakeResponse(api_url, fetch_json(api_url), page))
+        cart_url = f"{self.server.base_url}/cart/api/items"
+        capture.on_response(FakeResponse(cart_url, fetch_json(cart_url), page))
+
+        records, _ = await capture.extract(load_schema("product"), page)
+        self.assertEqual(
+            {
+                "asin": "B000000002",
+                "title": "Fixture Product 2",
+                "price": "$12.99",
+                "rating": 4.2,
+                "reviews": 200,
+                "availability": "In Stock",
+            },
+            records[0],
+        )
+        records, _ = await capture.extract(load_schema("cart"), page)
+        self.assertEqual(["B000000001", "B000000002", "B000000003"], [r["asin"] for r in records])
+        self.assertEqual(1, records[0]["quantity"])
+
+        # Nothing captured on another page
+        other_page = FakePage(f"{self.server.base_url}/dp/B000000003")
+        self.assertIsNone(await capture.extract(load_schema("product"), other_page))
+
+    async def test_payloads_of_earlier_loads_are_ignored(self):
+        context = FakeContext()
+        capture = enable_response_capture(context)
+        page = FakePage(f"{self.server.base_url}/dp/B000000002", context)
+        api_url = f"{self.server.base_url}/api/dp/B000000002"
+
+        context.emit(FakeRequest(page), "request")
+        context.emit(FakeResponse(api_url, fetch_json(api_url), page))
+        # Requests of the page that are not navigations keep the load
+        context.emit(FakeRequest(page, navigation=False), "request")
+        self.assertIsNotNone(await capture.extract(load_schema("product"), page))
+
+        # Revisiting the URL without a new payload does not return the previous one
+        context.emit(FakeRequest(page), "request")
+        self.assertIsNone(await capture.extract(load_schema("product"), page))
+
+    async def test_payload_without_records_is_ignored(self):
+        capture = ResponseCapture()
+        page = FakePage(f"{self.server.base_url}/gp/cart/view.html")
+        cart_url = f"{self.server.base_url}/cart/api/items"
+        capture.on_response(FakeResponse(cart_url, fetch_json(cart_url), page))
+        # A later count endpoint matching the same pattern does not hide the items
+        capture.on_response(FakeResponse(f"{self.server.base_url}/cart/ajax/count", {"cartCount": 3}, page))
+        records, _ = await capture.extract(load_schema("cart"), page)
+        self.assertEqual(3, len(records))
+
+        # Without the items the HTML is read instead
+        capture = ResponseCapture()
+        capture.on_response(FakeResponse(f"{self.server.base_url}/cart/ajax/count", {"cartCount": 3}, page))
+        self.assertIsNone(await capture.extract(load_schema("cart"), page))
+
+    async def test_html_fallback(self):
+        html = urllib.request.urlopen(f"{self.server.base_url}/gp/cart/view.html").read().decode()
+        page = FakePage(f"{self.server.base_url}/gp/cart/view.html", FakeContext(), html)
+        enable_response_capture(page.context)
+
+        records, next_page = await extract_page_records(page, load_schema("cart"))
+        self.assertEqual(3, len(records))
+        self.assertIsNone(next_page)
+        self.assertEqual(1, page.content_calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+from langgraph.prebuilt import ToolNode
+
+from app.amazon_web_agent.tool_call_guard import CACHED_NOTE, ToolCallGuard
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.url = "about:blank"
+        self.calls = []
+
+    async def navigate_browser(self, url: str) -> str:
+        """Navigate to a URL."""
+        self.calls.append(("navigate_browser", url))
+        self.url = url
+        return f"Navigating to {url} returned status code 200"
+
+    async def extract_text(self) -> str:
+        """Extract the page text."""
+        self.calls.append(("extract_text", self.url))
+        return f"Text of {self.url}"
+
+    async def click_element(self, selector: str) -> str:
+        """Click an element."""
+        self.calls.append(("click_element", selector))
+        if selector == "#next":
+            page = int(self.url.rsplit("=", 1)[-1]) + 1 if "page=" in self.url else 2
+            self.url = f"https://www.amazon.com/your-orders/orders?page={page}"
+        return f"Clicked element '{selector}'"
+
+
+def tool_call(name, index, **args):
+    return {"name": name, "args": args, "id": f"{name}-{index}"}
+
+
+class TestToolCallGuard(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.browser = FakeBrowser()
+        tools = [
+            StructuredTool.from_function(coroutine=self.browser.navigate_browser, name="navigate_browser"),
+            StructuredTool.from_function(coroutine=self.browser.extract_text, name="extract_text"),
+            StructuredTool.from_function(coroutine=self.browser.click_element, name="click_element"),
+        ]
+        self.guard = ToolCallGuard(
+            ToolNode(tools), max_repeats=3, max_corrections=1, get_page_state=lambda: self.browser.url
+        )
+        self.turn = 0
+
+    async def call(self, *calls):
+        self.turn += 1
+        message = AIMessage(content="", tool_calls=[tool_call(name, self.turn, **args) for name, args in calls])
+        return (await self.guard.ainvoke({"messages": [message]}))["messages"]
+
+    async def test_results_reused_until_page_changes(self):
+        await self.call(("navigate_browser", {"url": "https://www.amazon.com/cart"}))
+        await self.call(("extract_text", {}))
+        messages = await self.call(("navigate_browser", {"url": "https://www.amazon.com/cart"}), ("extract_text", {}))
+        self.assertTrue(all(m.content.endswith(CACHED_NOTE) for m in messages))
+        self.assertEqual(2, len(self.browser.calls))
+
+        # A click may change the page, so the text is read again
+        await self.call(("click_element", {"selector": "#gift-option"}))
+        messages = await self.call(("extract_text", {}))
+        self.assertEqual("Text of https://www.amazon.com/cart", messages[0].content)
+        self.assertEqual({"executed": 4, "cached": 2, "corrections": 0}, self.guard.stats)
+
+    async def test_loop_is_corrected_then_stopped(self):
+        for _ in range(2):
+            await self.call(("click_element", {"selector": "#add-to-cart"}))
+        messages = await self.call(("click_element", {"selector": "#add-to-cart"}))
+        self.assertTrue(messages[0].content.startswith("Error: 'click_element' was already called"))
+        self.assertEqual(2, len(self.browser.calls))
+        self.assertFalse(self.guard.stopped)
+
+        messages = await self.call(("click_element", {"selector": "#add-to-cart"}))
+        self.assertTrue(self.guard.stopped)
+        self.assertIsInstance(messages[-1], AIMessage)
+        self.assertEqual(2, len(self.browser.calls))
+
+    async def test_paging_through_a_listing_is_not_a_loop(self):
+        for page in range(2, 7):
+            messages = await self.call(("click_element", {"selector": "#next"}))
+            self.assertEqual("Clicked element '#next'", messages[0].content)
+            self.assertTrue(self.browser.url.endswith(f"page={page}"))
+        self.assertEqual(0, self.guard.stats["corrections"])
+
+
+if __name__ == "__main__":
+    unittest.main()
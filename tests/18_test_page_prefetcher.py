@@ -0,0 +1,124 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.amazon_web_agent.page_prefetcher import PagePrefetcher, take_warm_page_status
+from app.amazon_web_agent.tools.extract_content_tool import BrowserPageSource
+
+BASE_URL = "http://127.0.0.1:9"
+
+
+class FakeResponse:
+    status = 200
+
+
+class FakePage:
+    def __init__(self, context, url="about:blank"):
+        self.context = context
+        self.url = url
+        self.closed = False
+
+    async def goto(self, url):
+        await asyncio.sleep(0.01)
+        self.url = url
+        return FakeResponse()
+
+    async def close(self):
+        self.closed = True
+        self.context.pages.remove(self)
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = [FakeContext()]
+
+
+def navigate(url):
+    return AIMessage(content="", tool_calls=[{"name": "navigate_browser", "args": {"url": url}, "id": "1"}])
+
+
+class TestPagePrefetcher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.env = mock.patch.dict(os.environ, {"AMAZON_BASE_URL": BASE_URL})
+        self.env.start()
+        self.browser = FakeBrowser()
+        self.context = self.browser.contexts[0]
+
+    def tearDown(self):
+        self.env.stop()
+
+    async def asyncSetUp(self):
+        self.home = await self.context.new_page()
+        self.home.url = BASE_URL
+
+    def test_predict(self):
+        prefetcher = PagePrefetcher(self.browser, "Show my cart and my recent orders")
+        self.assertEqual(
+            [f"{BASE_URL}/gp/cart/view.html", f"{BASE_URL}/your-orders/orders"],
+            prefetcher.predict([HumanMessage(content="Show my cart")]),
+        )
+        # Pages the run already visited are not prefetched again
+        visited = [navigate(f"{BASE_URL}/gp/cart/view.html")]
+        self.assertEqual([f"{BASE_URL}/your-orders/orders"], prefetcher.predict(visited))
+
+    async def test_hit_swaps_in_warm_tab(self):
+        prefetcher = PagePrefetcher(self.browser, "Show my cart and my recent orders")
+        await prefetcher.start([])
+        self.assertEqual(3, len(self.context.pages))
+
+        await prefetcher.resolve(navigate(f"{BASE_URL}/gp/cart/view.html"))
+        self.assertEqual(1, len(self.context.pages))
+        current = self.context.pages[-1]
+        self.assertEqual(f"{BASE_URL}/gp/cart/view.html", current.url)
+        self.assertTrue(self.home.closed)
+
+        self.assertEqual("200", take_warm_page_status(current, f"{BASE_URL}/gp/cart/view.html/"))
+        self.assertIsNone(take_warm_page_status(current, f"{BASE_URL}/gp/cart/view.html"))
+
+        stats = prefetcher.stats()
+        self.assertEqual((2, 1, 1, 0.5), (stats["prefetched"], stats["hits"], stats["wasted"], stats["hit_rate"]))
+
+    async def test_extraction_reuses_warm_tab(self):
+        prefetcher = PagePrefetcher(self.browser, "Show my cart and my recent orders")
+        await prefetcher.start([])
+        extract = AIMessage(
+            content="", tool_calls=[{"name": "extract_content", "args": {"info": "ORDER_DETAILS_INFO"}, "id": "1"}]
+        )
+        await prefetcher.resolve(extract)
+        current = self.context.pages[-1]
+        self.assertEqual(f"{BASE_URL}/your-orders/orders", current.url)
+
+        # The extraction loads the page without navigating again
+        with mock.patch.object(current, "goto") as goto:
+            await BrowserPageSource(current).load(f"{BASE_URL}/your-orders/orders")
+            goto.assert_not_called()
+        self.assertEqual(1, prefetcher.stats()["hits"])
+
+    async def test_miss_closes_warm_tabs(self):
+        prefetcher = PagePrefetcher(self.browser, "Show my cart")
+        await prefetcher.start([])
+        await prefetcher.resolve(AIMessage(content="Your cart is empty"))
+        self.assertEqual([self.home], self.context.pages)
+        self.assertEqual(1, prefetcher.stats()["wasted"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app.amazon_web_agent.extraction.extraction_engine import load_schema
+from app.amazon_web_agent.http_fetcher import (
+    BrowserRequiredError,
+    HttpFetcher,
+    HttpPageSource,
+    close_context_fetchers,
+    get_context_fetcher,
+)
+from app.amazon_web_agent.sync_engine import SyncEngine
+from app.amazon_web_agent.tools.extract_content_tool import (
+    extract_paginated_content,
+    extract_snapshot_content,
+    extract_without_browser,
+)
+from eval.amazon_fixture_server import AmazonFixtureServer
+
+
+class FakePage:
+    def __init__(self, context, url):
+        self.context = context
+        self.url = url
+
+    async def evaluate(self, script):
+        return "Mozilla/5.0 (fixture)"
+
+
+class FakeContext:
+    def __init__(self, domain):
+        self.domain = domain
+        self.pages = [FakePage(self, "about:blank")]
+
+    async def cookies(self):
+        return [{"name": "session-id", "value": "123-4567", "domain": self.domain, "path": "/"}]
+
+
+class TestHttpFetcher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.server = AmazonFixtureServer(order_count=25)
+        self.server.start()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            mock.patch.dict(os.environ, {"AMAZON_BASE_URL": self.server.base_url}),
+            mock.patch(
+                "app.amazon_web_agent.sync_engine.DEFAULT_SYNC_DB_PATH",
+                os.path.join(self.tmp_dir.name, "sync_state.sqlite3"),
+            ),
+            mock.patch(
+                "app.amazon_web_agent.tools.extract_content_tool.get_data_dir",
+                return_value=self.tmp_dir.name,
+            ),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.context = FakeContext("127.0.0.1")
+
+    async def asyncTearDown(self):
+        await close_context_fetchers([self.context])
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.server.stop()
+        self.tmp_dir.cleanup()
+
+    async def test_paginated_extraction_without_browser(self):
+        # The browser is elsewhere, the order history is fetched directly
+        page = FakePage(self.context, f"{self.server.base_url}/")
+        result = await extract_without_browser(
+            page, load_schema("orders"), "fixture", extract_paginated_content
+        )
+        self.assertIn("25 added", result)
+        self.assertEqual(3, self.server.requests)
+        self.assertEqual("session-id=123-4567", self.server.last_cookie)
+
+        changes_file = result.rsplit(" ", 1)[-1]
+        with open(changes_file, encoding="utf-8") as f:
+            changes = json.load(f)
+        self.assertEqual("111-0000025-0000000", changes["added"][0]["order_id"])
+
+    async def test_high_water_mark_kept_when_pages_run_out(self):
+        page = FakePage(self.context, f"{self.server.base_url}/")
+        schema = load_schema("orders")
+        sync_engine = SyncEngine()
+        self.addCleanup(sync_engine.close)
+
+        with mock.patch("app.amazon_web_agent.tools.extract_content_tool.MAX_PAGES", 2):
+            result = await extract_without_browser(page, schema, "fixture", extract_paginated_content)
+        self.assertIn("20 added", result)
+        self.assertIsNone(sync_engine.get_high_water_mark("fixture", "orders"))
+
+        # The next sync walks to the end of the history and only then sets the mark
+        result = await extract_without_browser(page, schema, "fixture", extract_paginated_content)
+        self.assertIn("5 added", result)
+        self.assertEqual("111-0000025-0000000", sync_engine.get_high_water_mark("fixture", "orders"))
+
+    async def test_extractions_of_a_run_share_the_client(self):
+        page = FakePage(self.context, f"{self.server.base_url}/")
+        await extract_without_browser(page, load_schema("cart"), "fixture", extract_snapshot_content)
+        fetcher = await get_context_fetcher(self.context)
+        await extract_without_browser(page, load_schema("orders"), "fixture", extract_paginated_content)
+        self.assertIs(fetcher, await get_context_fetcher(self.context))
+
+        await close_context_fetchers([self.context])
+        self.assertTrue(fetcher._client.is_closed)
+        self.assertIsNot(fetcher, await get_context_fetcher(self.context))
+
+    async def test_browser_required(self):
+        async with await HttpFetcher.from_context(self.context) as fetcher:
+            source = HttpPageSource(fetcher)
+            with self.assertRaises(BrowserRequiredError):
+                await source.load(f"{self.server.base_url}/ap/signin")
+
+            # A page without the records is left to the browser
+            await source.load(f"{self.server.base_url}/")
+            with self.assertRaises(BrowserRequiredError):
+                await source.records(load_schema("cart"))
+
+            await source.load(f"{self.server.base_url}/gp/cart/view.html")
+            records, next_page = await source.records(load_schema("cart"))
+            self.assertEqual(3, len(records))
+
+    async def test_empty_page_is_not_left_to_the_browser(self):
+        self.server.cart = {}
+        async with await HttpFetcher.from_context(self.context) as fetcher:
+            source = HttpPageSource(fetcher)
+            await source.load(f"{self.server.base_url}/gp/cart/view.html")
+            records, next_page = await source.records(load_schema("cart"))
+            self.assertEqual([], records)
+            self.assertIsNone(next_page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import unittest
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.amazon_web_agent.blob_store import BLOB_KEY, BlobStore
+from app.amazon_web_agent.tools.read_blob_tool import ReadBlobTool
+
+
+def tool_call_message(call_id):
+    return AIMessage(content="", tool_calls=[{"name": "extract_text", "args": {}, "id": call_id}])
+
+
+class TestBlobStore(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.store = BlobStore(max_inline_length=100)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_put_and_get(self):
+        digest = self.store.put("Kettle " * 1000)
+        self.assertEqual(digest, self.store.put("Kettle " * 1000))
+        self.assertEqual("Kettle " * 1000, self.store.get(digest))
+        self.assertEqual("", self.store.get(self.store.put("")))
+
+    def test_state_stays_small(self):
+        messages = [HumanMessage(content="Show my cart")]
+        page_text = "Fixture Product " * 10000
+        for step in range(5):
+            messages.append(tool_call_message(str(step)))
+            messages.extend(
+                self.store.offload([ToolMessage(content=page_text, tool_call_id=str(step))])
+            )
+            # Only the preview and the reference stay in the state
+            self.assertLess(sum(len(m.content) for m in messages), 1000 * (step + 1))
+
+        # The model gets the full output of its last tool call only
+        model_messages = self.store.rehydrate(messages)
+        self.assertEqual(page_text, model_messages[-1].content)
+        self.assertLess(len(model_messages[-3].content), 1000)
+        self.assertLess(len(messages[-1].content), 1000)
+
+        self.assertEqual(1, self.store.stats["rehydrated"])
+        self.assertEqual(5, self.store.stats["offloaded"])
+
+        # Small outputs are kept inline
+        small = ToolMessage(content="Clicked element '#cart'", tool_call_id="6")
+        self.assertIs(small, self.store.offload([small])[0])
+
+    async def test_read_an_older_output(self):
+        cart_text = "Cart item " * 1000
+        messages = [HumanMessage(content="Compare my cart with my orders"), tool_call_message("1")]
+        messages.extend(self.store.offload([ToolMessage(content=cart_text, tool_call_id="1")]))
+        messages.append(tool_call_message("2"))
+        messages.extend(self.store.offload([ToolMessage(content="Order " * 1000, tool_call_id="2")]))
+
+        # The model reads the cart again by the reference in its preview
+        digest = messages[2].additional_kwargs[BLOB_KEY]
+        ref = digest[:12]
+        self.assertIn(ref, messages[2].content)
+        self.assertEqual(digest, self.store.resolve(ref))
+        output = await ReadBlobTool(blob_store=self.store).ainvoke({"ref": ref})
+        self.assertEqual(cart_text, output)
+
+        messages.append(AIMessage(content="", tool_calls=[{"name": "read_blob", "args": {"ref": ref}, "id": "3"}]))
+        messages.extend(self.store.offload([ToolMessage(content=output, tool_call_id="3")]))
+        self.assertEqual(cart_text, self.store.rehydrate(messages)[-1].content)
+
+        # Unknown and ambiguous references are reported
+        self.assertIsNone(self.store.resolve("0" * 12))
+        self.assertIsNone(self.store.resolve(""))
+        self.assertTrue((await ReadBlobTool(blob_store=self.store).ainvoke({"ref": "nope"})).startswith("Error"))
+
+    def test_close_removes_blobs(self):
+        self.store.put("x" * 1000)
+        self.store.close()
+        self.assertFalse(os.path.exists(self.store.root))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app.amazon_web_agent.extraction.batch_extract import main as batch_extract_main
+from app.amazon_web_agent.extraction.extraction_engine import extract_records, load_schema, parse_html
+from utils.profiler_util import RunProfiler, get_profile_dir
+
+ORDERS_HTML = """
+<div class="order-card">
+    <div class="yohtmlc-order-id"><span dir="ltr">111-0000001-0000001</span></div>
+    <div class="yohtmlc-order-total"><span class="value">$1,299.99</span></div>
+    <a class="yohtmlc-product-title">Laptop</a>
+</div>
+""" * 50
+
+
+def parse_pages(count):
+    schema = load_schema("orders")
+    for _ in range(count):
+        extract_records(parse_html(ORDERS_HTML), schema)
+
+
+async def slow_step():
+    await asyncio.sleep(0.05)
+
+
+async def run():
+    await asyncio.gather(slow_step(), slow_step())
+    parse_pages(20)
+
+
+class TestProfilerUtil(unittest.TestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_profile_async_run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            with RunProfiler("run", output_dir=self.tmp_dir.name, interval=0.001, loop=loop) as profiler:
+                loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+        with open(profiler.paths["speedscope"]) as f:
+            speedscope = json.load(f)
+        profile = speedscope["profiles"][0]
+        self.assertEqual("sampled", profile["type"])
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        frame_names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+        self.assertIn("parse_pages", frame_names)
+
+        with open(profiler.paths["tasks"]) as f:
+            tasks = json.load(f)
+        self.assertEqual(2, tasks["slow_step"]["count"])
+        self.assertGreaterEqual(tasks["slow_step"]["max_seconds"], 0.04)
+
+        # The task factory of the loop is restored
+        self.assertIsNone(loop.get_task_factory())
+
+    def test_deterministic_profile(self):
+        with RunProfiler("parse", output_dir=self.tmp_dir.name, deterministic=True) as profiler:
+            parse_pages(2)
+        self.assertTrue(os.path.exists(profiler.paths["prof"]))
+
+    def test_profile_batch_extract(self):
+        pages_dir = os.path.join(self.tmp_dir.name, "pages")
+        os.makedirs(pages_dir)
+        with open(os.path.join(pages_dir, "orders.html"), "w") as f:
+            f.write(ORDERS_HTML)
+
+        output = os.path.join(self.tmp_dir.name, "orders_pages.jsonl")
+        batch_extract_main([pages_dir, "--schema", "orders", "--output", output, "--profile"])
+
+        files = os.listdir(self.tmp_dir.name)
+        self.assertTrue(any(name.startswith("batch_extract-") and name.endswith(".speedscope.json") for name in files))
+
+    def test_profile_dir_does_not_depend_on_the_working_directory(self):
+        with mock.patch.dict(os.environ, {"AGENT_PROFILE_DIR": ""}):
+            profile_dir = get_profile_dir()
+            cwd = os.getcwd()
+            os.chdir(self.tmp_dir.name)
+            try:
+                self.assertEqual(profile_dir, get_profile_dir())
+            finally:
+                os.chdir(cwd)
+        self.assertTrue(os.path.isabs(profile_dir))
+        self.assertEqual(os.path.join("data", "profiles"), os.path.join(*profile_dir.split(os.sep)[-2:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from app.amazon_web_agent.model_router import ModelRouter
+from app.amazon_web_agent.tool_selector import ToolSelector, get_page_type
+from app.amazon_web_agent.tools import amazon_web_agent_toolkit as toolkit
+from utils.chat_model_env_util import ChatModelUtil
+
+TOOL_CLASSES = [
+    toolkit.ClickTool,
+    toolkit.WarmNavigateTool,
+    toolkit.NavigateBackTool,
+    toolkit.ExtractTextTool,
+    toolkit.ExtractHyperlinksTool,
+    toolkit.GetElementsTool,
+    toolkit.CurrentWebPageTool,
+    toolkit.ExtractContentTool,
+    toolkit.SearchProductsTool,
+    toolkit.SnapshotPageTool,
+    toolkit.ActOnElementTool,
+]
+
+
+def tool_call(name, call_id="1"):
+    return AIMessage(content="", tool_calls=[{"name": name, "args": {}, "id": call_id}])
+
+
+class FakeLLM:
+    """Records the tool schemas it is bound to."""
+
+    def __init__(self):
+        self.bound = []
+
+    def bind_tools(self, schemas):
+        self.bound.append([schema["function"]["name"] for schema in schemas])
+        return RunnableLambda(lambda prompt: AIMessage(content="Done"))
+
+
+class TestToolSelector(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        # Tools without a browser, only their schemas are used
+        self.tools = [tool_cls.construct() for tool_cls in TOOL_CLASSES]
+        self.selector = ToolSelector(self.tools)
+
+    def test_page_type(self):
+        self.assertEqual("cart", get_page_type("https://www.amazon.com/gp/cart/view.html?ref=nav"))
+        self.assertEqual("order_history", get_page_type("https://www.amazon.com/your-orders/orders"))
+        self.assertEqual("product", get_page_type("https://www.amazon.com/Kettle/dp/B000000001"))
+        self.assertEqual("search", get_page_type("https://www.amazon.com/s?k=kettle"))
+        self.assertEqual("other", get_page_type("https://www.amazon.com/"))
+        self.assertIsNone(get_page_type("about:blank"))
+
+    def test_select(self):
+        messages = [HumanMessage(content="Show my cart")]
+        start = self.selector.select(messages, "https://www.amazon.com/")
+        self.assertEqual(
+            ("navigate_browser", "current_webpage", "extract_content", "search_products"), start
+        )
+
+        messages.append(tool_call("navigate_browser"))
+        messages.append(ToolMessage(content="Navigating to ...", tool_call_id="1"))
+        cart = self.selector.select(messages, "https://www.amazon.com/gp/cart/view.html")
+        self.assertIn("act_on_element", cart)
+        self.assertNotIn("click_element", cart)
+        self.assertLess(len(cart), len(self.tools))
+
+        # After a tool error, the model gets all tools
+        messages.append(tool_call("act_on_element", "2"))
+        messages.append(ToolMessage(content="Error: no element 7", tool_call_id="2"))
+        self.assertIsNone(self.selector.select(messages, "https://www.amazon.com/gp/cart/view.html"))
+
+        # A call outside the subset means the subset was not enough
+        self.selector.select(messages[:3], "https://www.amazon.com/gp/cart/view.html")
+        messages.append(tool_call("get_elements", "3"))
+        messages.append(ToolMessage(content="[]", tool_call_id="3"))
+        self.assertIsNone(self.selector.select(messages, "https://www.amazon.com/gp/cart/view.html"))
+
+        with mock.patch.dict(os.environ, {"AMAZON_TOOL_SUBSETS": "false"}):
+            self.assertIsNone(self.selector.select(messages[:1], "https://www.amazon.com/"))
+
+        self.assertEqual({"start": 1, "cart": 2, "all": 3}, self.selector.stats)
+
+    async def test_router_binds_subset_once(self):
+        llm = FakeLLM()
+        prompt = ChatPromptTemplate.from_messages([("placeholder", "{messages}")])
+        with mock.patch.object(ChatModelUtil, "get_tier_llm", return_value=llm):
+            router = ModelRouter(prompt, self.tools)
+            messages = [HumanMessage(content="Show my cart")]
+            subset = self.selector.select(messages, "https://www.amazon.com/")
+            await router.ainvoke("agent_node", messages, subset)
+            await router.ainvoke("agent_node", messages, subset)
+            await router.ainvoke("agent_node", messages)
+
+        # One binding per subset, reused by later calls
+        self.assertEqual([list(subset), [tool.name for tool in self.tools]], llm.bound)
+        usage = list(router.stats().values())[0]
+        self.assertEqual(3, usage["calls"])
+        # The subset calls sent less than half of the full tool schemas
+        self.assertLess(usage["tool_schema_chars"], 2 * router._schema_chars[None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from utils.browser_cache_util import (
+    LOCK_FILE,
+    BrowserDiskCache,
+    PageLoadMonitor,
+    monitor_page_loads,
+)
+from utils.browser_pool_util import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def close(self):
+        self.browser.contexts.remove(self)
+
+
+class FakeBrowser:
+    def __init__(self, args):
+        self.args = args
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        pass
+
+
+class FakeChromium:
+    async def launch(self, headless, args):
+        return FakeBrowser(args)
+
+
+class FakePlaywright:
+    chromium = FakeChromium()
+
+    async def stop(self):
+        pass
+
+
+def write_file(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+class TestBrowserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp_dir.name, "browser_cache")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_slots(self):
+        cache = BrowserDiskCache(self.root)
+        first = cache.acquire_slot()
+        second = cache.acquire_slot()
+        self.assertNotEqual(first, second)
+        self.assertIn(f"--disk-cache-dir={os.path.abspath(first)}", cache.launch_args(first))
+
+        # A released slot, with its cache, is reused by the next browser
+        cache.release_slot(first)
+        self.assertEqual(first, cache.acquire_slot())
+
+        # The slot of a process that died is taken over, the one of a live process is not
+        dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True)
+        other = BrowserDiskCache(self.root)
+        with open(os.path.join(second, LOCK_FILE), "w") as f:
+            f.write(dead.stdout.decode().strip())
+        self.assertEqual(second, other.acquire_slot())
+        with open(os.path.join(first, LOCK_FILE), "w") as f:
+            f.write(str(os.getppid()))
+        self.assertNotIn(other.acquire_slot(), [first, second])
+
+    def test_cleanup(self):
+        cache = BrowserDiskCache(self.root, max_mb=1)
+        self.assertEqual(os.path.join(self.root, "slot-0"), cache.acquire_slot())
+        for index in range(3):
+            write_file(os.path.join(self.root, f"slot-{index}", "Cache", "data"), 400 * 1024)
+            os.utime(os.path.join(self.root, f"slot-{index}"), (index, index))
+
+        # The least recently used idle slot goes first, the leased one is kept
+        removed = cache.cleanup(force=True)
+        self.assertEqual(400 * 1024, removed)
+        self.assertEqual(["slot-0", "slot-2"], sorted(os.listdir(self.root)))
+        # Cleanups are periodic, the size is the one measured by the last cleanup
+        self.assertEqual(0, cache.cleanup())
+        size = cache.size()
+        self.assertGreaterEqual(size, 800 * 1024)
+        write_file(os.path.join(self.root, "slot-0", "Cache", "more"), 100 * 1024)
+        self.assertEqual(size, cache.size())
+        self.assertEqual(size + 100 * 1024, cache.size(refresh=True))
+
+    def test_slots_share_the_size_limit(self):
+        cache = BrowserDiskCache(self.root, max_mb=512, slots=4)
+        self.assertIn(f"--disk-cache-size={128 * 2**20}", cache.launch_args(cache.acquire_slot()))
+
+    def test_page_load_monitor(self):
+        monitor = PageLoadMonitor()
+        monitor.record({"url": "https://www.amazon.com/gp/cart/view.html", "load_ms": 3000, "resources": 10, "cached": 0})
+        monitor.record({"url": "https://www.amazon.com/gp/cart/view.html?ref=nav", "load_ms": 1000, "resources": 10, "cached": 9})
+        self.assertEqual({"pages": 2, "hit_ratio": 0.45, "saved_seconds": 2.0}, monitor.stats())
+
+    async def test_pool_launches_on_cache_slots(self):
+        pool = BrowserPool(size=2, disk_cache=BrowserDiskCache(self.root))
+        pool._playwright = FakePlaywright()
+
+        async with pool.acquire() as first, pool.acquire() as second:
+            self.assertTrue(any(arg.endswith("slot-0") for arg in first.args))
+            self.assertTrue(any(arg.endswith("slot-1") for arg in second.args))
+            context = await first.new_context()
+            monitor_page_loads(context)
+            self.assertIn("page", context.handlers)
+        self.assertIn("disk_cache", pool.stats())
+
+        await pool.close()
+        self.assertFalse(os.path.exists(os.path.join(self.root, "slot-0", LOCK_FILE)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+from app.amazon_web_agent.extraction.commerce_dataset import (
+    append_changes,
+    compact_partitions,
+    find_history_files,
+    import_history,
+    normalize_record,
+    parse_date,
+    parse_money,
+    read_dataset,
+)
+from app.amazon_web_agent.extraction.extraction_engine import load_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet
+except ImportError:
+    pc = None
+
+
+class TestCommerceDataset(unittest.TestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse_money(self):
+        self.assertEqual((129999, "USD"), parse_money("$1,299.99"))
+        self.assertEqual((129999, "EUR"), parse_money("1.299,99 €"))
+        self.assertEqual((1299, "EUR"), parse_money("12,99 €"))
+        self.assertEqual((1299, "JPY"), parse_money("¥1,299"))
+        self.assertEqual((750, "EUR"), parse_money("EUR 7.50"))
+        self.assertEqual((None, None), parse_money("N/A"))
+
+    def test_parse_date(self):
+        self.assertEqual(date(2026, 1, 5), parse_date("January 5, 2026"))
+        self.assertEqual(date(2026, 1, 5), parse_date("Ordered on 5 Jan 2026"))
+        self.assertEqual(date(2025, 9, 3), parse_date("Sept. 3, 2025"))
+        self.assertIsNone(parse_date("N/A"))
+
+    def test_normalize_record(self):
+        order = {
+            "order_id": "111-0000001-0000001",
+            "order_date": "January 5, 2026",
+            "total": "$1,299.99",
+            "status": "Delivered",
+            "items": ["Laptop", "Sleeve"],
+        }
+        self.assertEqual(
+            {
+                "order_id": "111-0000001-0000001",
+                "order_date": date(2026, 1, 5),
+                "total_minor": 129999,
+                "total_currency": "USD",
+                "status": "Delivered",
+                "items": ["Laptop", "Sleeve"],
+            },
+            normalize_record(order, load_schema("orders")),
+        )
+        cart_item = normalize_record({"asin": "B1", "price": "N/A", "quantity": "2"}, load_schema("cart"))
+        self.assertEqual(2, cart_item["quantity"])
+        self.assertIsNone(cart_item["price_minor"])
+
+    @unittest.skipIf(pc is None, "pyarrow is not importable")
+    def test_append_compact_and_query(self):
+        cart = load_schema("cart")
+        append_changes(
+            {"added": [{"asin": "B1", "title": "Kettle", "price": "$19.99", "quantity": 1}]},
+            cart,
+            self.data_dir,
+            "cart_changes_20260105120000.json",
+        )
+
+        # JSON history from before the dataset, including the cart files before the sync engine
+        history = {
+            "cart_changes_20260101090000.json": {
+                "kind": "cart",
+                "added": [{"asin": "B2", "title": "Mug", "price": "$5.00", "quantity": 2}],
+                "removed": [],
+                "changed": [
+                    {"key": "B1", "before": {}, "after": {"asin": "B1", "title": "Kettle", "price": "$17.99", "quantity": 1}}
+                ],
+            },
+            "cart_items_20251231080000.json": [{"title": "Lamp", "price": "$1,299.99", "quantity": "3"}],
+            # Already in the dataset
+            "cart_changes_20260105120000.json": {"kind": "cart", "added": [{"asin": "B1"}], "removed": [], "changed": []},
+        }
+        for name, content in history.items():
+            with open(os.path.join(self.data_dir, name), "w") as f:
+                json.dump(content, f)
+
+        self.assertEqual({"cart": 3}, import_history(self.data_dir))
+        # Importing twice adds nothing
+        self.assertEqual({}, import_history(self.data_dir))
+
+        table = read_dataset("cart", self.data_dir)
+        self.assertEqual(4, table.num_rows)
+        self.assertEqual(
+            129999 + 1999 + 1799 + 500, pc.sum(table.column("price_minor")).as_py()
+        )
+        added = table.filter(pc.equal(table.column("change"), "added"))
+        self.assertEqual(["B1", "B2"], sorted(added.column("asin").to_pylist()))
+
+        # Appends of the same day are merged into one file per partition
+        append_changes({"removed": [{"asin": "B2", "price": "$5.00"}]}, cart, self.data_dir, "cart_changes_x.json")
+        # The two files of today are merged, the imported days have one file each
+        self.assertEqual(2, compact_partitions(self.data_dir))
+        for partition in os.listdir(os.path.join(self.data_dir, "commerce", "cart")):
+            files = os.listdir(os.path.join(self.data_dir, "commerce", "cart", partition))
+            self.assertEqual(1, len(files))
+        self.assertEqual(5, read_dataset("cart", self.data_dir).num_rows)
+        self.assertEqual(datetime(2025, 12, 31, 8), min(read_dataset("cart", self.data_dir).column("extracted_at").to_pylist()))
+
+    def test_product_changes_are_history(self):
+        with open(os.path.join(self.data_dir, "products_changes_20260105120000.json"), "w") as f:
+            json.dump({"kind": "products", "added": [], "removed": [], "changed": []}, f)
+        self.assertEqual(["product"], [kind for _, kind, _ in find_history_files(self.data_dir)])
+
+    @unittest.skipIf(pc is None, "pyarrow is not importable")
+    def test_interrupted_compaction(self):
+        cart = load_schema("cart")
+        for asin in ["B1", "B2"]:
+            append_changes({"added": [{"asin": asin, "price": "$5.00"}]}, cart, self.data_dir, f"{asin}.json")
+
+        # The merged file is written, then the process dies before removing the parts
+        with mock.patch(
+            "app.amazon_web_agent.extraction.commerce_dataset.os.remove", side_effect=OSError("killed")
+        ):
+            with self.assertRaises(OSError):
+                compact_partitions(self.data_dir)
+        self.assertEqual(2, read_dataset("cart", self.data_dir).num_rows)
+
+        # The next compaction removes the parts left behind
+        self.assertEqual(2, compact_partitions(self.data_dir))
+        self.assertEqual(2, read_dataset("cart", self.data_dir).num_rows)
+
+    @unittest.skipIf(pc is None, "pyarrow is not importable")
+    def test_compaction_across_schema_changes(self):
+        cart = load_schema("cart")
+        paths = append_changes({"added": [{"asin": "B1", "quantity": 2}]}, cart, self.data_dir, "new.json")
+        # A part written before the quantity was exported
+        old_part = os.path.join(os.path.dirname(paths[0]), "part-20000101000000-old.parquet")
+        table = pa.Table.from_pylist(
+            [{"asin": "B0", "change": "added", "extracted_at": datetime(2026, 1, 5, 12)}],
+            schema=pa.schema([("asin", pa.string()), ("change", pa.string()), ("extracted_at", pa.timestamp("s"))]),
+        )
+        pyarrow.parquet.write_table(table, old_part)
+
+        self.assertEqual(2, read_dataset("cart", self.data_dir).num_rows)
+        self.assertEqual(2, compact_partitions(self.data_dir))
+        table = read_dataset("cart", self.data_dir).sort_by("asin")
+        self.assertEqual([None, 2], table.column("quantity").to_pylist())
+
+if __name__ == "__main__":
+    unittest.main()
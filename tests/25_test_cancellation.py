@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from service.job_service import JobService, JobStatus
+from utils.cancellation_util import (
+    CancellationToken,
+    RunCancelledError,
+    get_run_token,
+    use_run_token,
+)
+
+
+class FakeBrowserPool:
+    def __init__(self):
+        self.in_use = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.in_use += 1
+        try:
+            yield object()
+        finally:
+            self.in_use -= 1
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {"in_use": self.in_use}
+
+
+class TestCancellationToken(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+
+    async def test_run_returns_the_result(self):
+        token = CancellationToken(timeout=5)
+        self.assertEqual(42, await token.run(asyncio.sleep(0, result=42)))
+        self.assertFalse(token.cancelled)
+
+    async def test_deadline_aborts_the_operation(self):
+        token = CancellationToken(timeout=0.05)
+        aborted = asyncio.Event()
+
+        async def slow_model_call():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                aborted.set()
+                raise
+
+        with self.assertRaises(RunCancelledError) as error:
+            await token.run(slow_model_call())
+        self.assertTrue(aborted.is_set())
+        self.assertIn("deadline", str(error.exception))
+        self.assertEqual(0.0, token.remaining())
+        # Past the deadline, calls time out right away instead of never
+        self.assertEqual(1.0, token.timeout_ms(30000))
+        self.assertEqual(30000, CancellationToken().timeout_ms(30000))
+
+    async def test_cancel_aborts_the_operation(self):
+        token = CancellationToken()
+        asyncio.get_running_loop().call_later(0.05, token.cancel, "the page was closed")
+        with self.assertRaises(RunCancelledError) as error:
+            await token.run(asyncio.sleep(10))
+        self.assertEqual("the page was closed", str(error.exception))
+
+        # Later operations do not start at all
+        coroutine = asyncio.sleep(0)
+        with self.assertRaises(RunCancelledError):
+            await token.run(coroutine)
+        with self.assertRaises(RunCancelledError):
+            token.check()
+
+    async def test_current_token_reaches_started_tasks(self):
+        token = CancellationToken()
+        self.assertIsNone(get_run_token())
+        with use_run_token(token):
+            self.assertIs(token, await asyncio.create_task(asyncio.sleep(0, result=get_run_token())))
+        self.assertIsNone(get_run_token())
+
+
+class TestJobCancellation(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+
+    async def run_job(self, job, browser):
+        # Stands in for the agent, which uses the current token for its model and browser calls
+        return await get_run_token().run(asyncio.sleep(10, result="done"))
+
+    async def asyncSetUp(self):
+        self.browser_pool = FakeBrowserPool()
+        self.service = JobService(
+            run_job=self.run_job, browser_pool=self.browser_pool, workers=1, max_queue=5
+        )
+        self.client = TestClient(TestServer(self.service.create_app()))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_timeout_releases_the_browser(self):
+        response = await self.client.post("/jobs", json={"requirement": "Show my cart", "timeout": 0.1})
+        self.assertEqual(202, response.status)
+        job = self.service.jobs[(await response.json())["job_id"]]
+
+        await asyncio.sleep(0.3)
+        self.assertEqual(JobStatus.CANCELLED, job.status)
+        self.assertIn("deadline", job.error)
+        self.assertEqual(0, self.browser_pool.in_use)
+
+    async def test_cancel_running_and_queued_jobs(self):
+        running = (await (await self.client.post("/jobs", json={"requirement": "a"})).json())["job_id"]
+        queued = (await (await self.client.post("/jobs", json={"requirement": "b"})).json())["job_id"]
+        await asyncio.sleep(0.05)
+
+        response = await self.client.delete(f"/jobs/{queued}")
+        self.assertEqual(202, response.status)
+        self.assertEqual("cancelled", (await response.json())["status"])
+
+        response = await self.client.delete(f"/jobs/{running}")
+        self.assertEqual(202, response.status)
+        await asyncio.sleep(0.05)
+        self.assertEqual(JobStatus.CANCELLED, self.service.jobs[running].status)
+        self.assertEqual(0, self.browser_pool.in_use)
+
+        # A finished job can no longer be cancelled
+        response = await self.client.delete(f"/jobs/{running}")
+        self.assertEqual(409, response.status)
+
+    async def test_invalid_timeout(self):
+        response = await self.client.post("/jobs", json={"requirement": "a", "timeout": "soon"})
+        self.assertEqual(400, response.status)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import time
+import unittest
+
+from app.amazon_web_agent.background_sign_in import BackgroundSignIn
+
+
+class TestBackgroundSignIn(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.signed_in = False
+
+    async def sign_in(self):
+        await asyncio.sleep(0.2)
+        self.signed_in = True
+
+    async def test_model_call_overlaps_the_sign_in(self):
+        background_sign_in = BackgroundSignIn(self.sign_in)
+        start = time.perf_counter()
+        background_sign_in.start()
+
+        # The first model call does not wait for the sign-in
+        await asyncio.sleep(0.15)
+        self.assertFalse(self.signed_in)
+
+        # The tools do
+        await background_sign_in.wait()
+        self.assertTrue(self.signed_in)
+        self.assertLess(time.perf_counter() - start, 0.3)
+
+        stats = background_sign_in.stats()
+        self.assertGreaterEqual(stats["sign_in_seconds"], 0.2)
+        self.assertGreaterEqual(stats["saved_seconds"], 0.1)
+
+        # Later tool calls do not wait again
+        await background_sign_in.wait()
+        await background_sign_in.close()
+
+    async def test_sign_in_error_is_raised_by_wait(self):
+        async def failing_sign_in():
+            raise RuntimeError("captcha not solved")
+
+        background_sign_in = BackgroundSignIn(failing_sign_in)
+        background_sign_in.start()
+        with self.assertRaises(RuntimeError):
+            await background_sign_in.wait()
+        with self.assertRaises(RuntimeError):
+            await background_sign_in.wait()
+
+    async def test_close_cancels_a_pending_sign_in(self):
+        background_sign_in = BackgroundSignIn(self.sign_in)
+        background_sign_in.start()
+        await asyncio.sleep(0.05)
+        await background_sign_in.close()
+        self.assertTrue(background_sign_in.done)
+        self.assertFalse(self.signed_in)
+        # Nothing was saved by a sign-in the run did not need
+        self.assertEqual(0.0, background_sign_in.stats()["saved_seconds"])
+
+    async def test_wait_before_start(self):
+        with self.assertRaises(RuntimeError):
+            await BackgroundSignIn(self.sign_in).wait()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+
+from service.job_service import (
+    JobService,
+    JobStatus,
+    QueueFullError,
+    is_read_only,
+    request_key,
+)
+
+
+class FakeBrowserPool:
+    @asynccontextmanager
+    async def acquire(self):
+        yield object()
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class TestRequestCoalescing(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.release = asyncio.Event()
+        self.runs = []
+
+    async def run_job(self, job, browser):
+        self.runs.append(job.requirement)
+        job.publish("progress", "Sign in into Amazon")
+        await self.release.wait()
+        return "Ai Message: Your cart has 3 items"
+
+    async def asyncSetUp(self):
+        self.service = JobService(
+            run_job=self.run_job, browser_pool=FakeBrowserPool(), workers=2, max_queue=1, result_ttl=0.3
+        )
+        await self.service.start()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        await self.service.stop()
+
+    def test_request_key(self):
+        self.assertEqual(
+            request_key("Show me my  shopping cart.", "a@example.com"),
+            request_key("show me my shopping cart", "A@example.com"),
+        )
+        self.assertNotEqual(
+            request_key("Show me my shopping cart", "a@example.com"),
+            request_key("Show me my shopping cart", "b@example.com"),
+        )
+        self.assertNotEqual(
+            request_key("Show me my shopping cart", "a@example.com", timeout=60),
+            request_key("Show me my shopping cart", "a@example.com", timeout=300),
+        )
+        self.assertTrue(is_read_only("Show me my shopping cart"))
+        self.assertTrue(is_read_only("Compare the prices of kettles"))
+        self.assertTrue(is_read_only("Show my order history"))
+        for requirement in [
+            "Add the kettle to my cart",
+            "Order it again",
+            "Change the quantity to 2",
+            "Update my address",
+            "Empty my cart",
+            "Clear the cart",
+            "Subscribe to the coffee",
+            "Show my cart and remove the kettle",
+        ]:
+            self.assertFalse(is_read_only(requirement), requirement)
+
+    async def test_identical_requests_share_one_run(self):
+        leader = self.service.submit("Show my cart")
+        await asyncio.sleep(0.05)
+        # Followers take no room in the full queue
+        follower = self.service.submit("show my cart.")
+        self.assertEqual("coalesced", follower.source)
+        self.assertEqual(JobStatus.RUNNING, follower.status)
+        self.assertIn("progress", [event["type"] for event in follower.events])
+        self.assertEqual(1, self.service.stats()["running"])
+
+        self.release.set()
+        await asyncio.sleep(0.05)
+        self.assertEqual(["Show my cart"], self.runs)
+        for job in (leader, follower):
+            self.assertEqual(JobStatus.SUCCEEDED, job.status)
+            self.assertEqual("Ai Message: Your cart has 3 items", job.result)
+        self.assertEqual("result", follower.events[-2]["type"])
+
+        # Repeats are answered from the result until it expires
+        cached = self.service.submit("Show my cart")
+        self.assertEqual("cache", cached.source)
+        self.assertEqual(JobStatus.SUCCEEDED, cached.status)
+        self.assertEqual(
+            {"runs": 1, "coalesced": 1, "cache_hits": 1, "cached_results": 1},
+            self.service.stats()["requests"],
+        )
+
+        await asyncio.sleep(0.3)
+        self.service.submit("Show my cart")
+        await asyncio.sleep(0.05)
+        self.assertEqual(2, len(self.runs))
+
+    async def test_cancelling_a_follower_keeps_the_run(self):
+        leader = self.service.submit("Show my cart")
+        await asyncio.sleep(0.05)
+        follower = self.service.submit("Show my cart")
+        self.service.cancel(follower)
+        self.assertEqual(JobStatus.CANCELLED, follower.status)
+        self.assertEqual(JobStatus.RUNNING, leader.status)
+
+        self.release.set()
+        await asyncio.sleep(0.05)
+        self.assertEqual(JobStatus.SUCCEEDED, leader.status)
+        self.assertEqual(JobStatus.CANCELLED, follower.status)
+
+    async def test_cancelling_the_leader_hands_the_run_over(self):
+        leader = self.service.submit("Show my cart")
+        await asyncio.sleep(0.05)
+        follower = self.service.submit("Show my cart")
+        other = self.service.submit("Show my cart")
+        self.service.cancel(leader)
+        self.assertEqual(JobStatus.CANCELLED, leader.status)
+        self.assertEqual("run", follower.source)
+        self.assertIs(follower, other.leader)
+
+        self.release.set()
+        await asyncio.sleep(0.05)
+        self.assertEqual(["Show my cart"], self.runs)
+        for job in (follower, other):
+            self.assertEqual(JobStatus.SUCCEEDED, job.status)
+            self.assertEqual("Ai Message: Your cart has 3 items", job.result)
+        self.assertEqual(JobStatus.CANCELLED, leader.status)
+        self.assertIsNone(leader.result)
+
+    async def test_unshared_requests(self):
+        self.service.submit("Add the kettle to my cart")
+        await asyncio.sleep(0.05)
+        self.service.submit("Show my cart", timeout=60)
+        await asyncio.sleep(0.05)
+
+        # Changes to the account, requests opting out and other timeouts need runs of their own
+        self.assertEqual("run", self.service.submit("Add the kettle to my cart").source)
+        for kwargs in ({"timeout": 60, "share": False}, {"timeout": 300}):
+            with self.assertRaises(QueueFullError):
+                self.service.submit("Show my cart", **kwargs)
+
+        self.release.set()
+        await asyncio.sleep(0.05)
+        self.assertEqual("cache", self.service.submit("Show my cart", timeout=60).source)
+        self.assertEqual("run", self.service.submit("Show my cart", timeout=60, share=False).source)
+        await asyncio.sleep(0.05)
+        self.assertEqual("run", self.service.submit("Add the kettle to my cart").source)
+
+    async def test_failed_runs_are_not_cached(self):
+        async def failing_run_job(job, browser):
+            raise RuntimeError("boom")
+
+        self.service.run_job = failing_run_job
+        self.service.submit("Show my cart")
+        await asyncio.sleep(0.05)
+        job = self.service.submit("Show my cart")
+        self.assertEqual("run", job.source)
+
+
+if __name__ == "__main__":
+    unittest.main()
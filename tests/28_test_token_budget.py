@@ -0,0 +1,132 @@
+import os
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.amazon_web_agent.model_router import ModelRouter
+from app.amazon_web_agent.token_budget import (
+    TRIMMED_CONTENT,
+    BudgetAction,
+    TokenBudget,
+    count_tokens,
+)
+from utils.chat_model_env_util import ModelTier
+
+TIER_ENV = {
+    "LLM_MODEL_TYPE": "ChatOpenAI",
+    "LLM_MODEL": "gpt-4o",
+    "LLM_SMALL_MODEL": "gpt-4o-mini",
+    "LLM_TIER_AGENT_NODE": "large",
+}
+
+
+class FakeTool:
+    def __init__(self, name):
+        self.name = name
+
+
+def response_with_usage(input_tokens, output_tokens, **kwargs):
+    return AIMessage(
+        content="",
+        usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        },
+        **kwargs,
+    )
+
+
+class TestTokenBudget(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.env = mock.patch.dict(os.environ, TIER_ENV)
+        self.env.start()
+        self.call_message = AIMessage(
+            content="",
+            tool_calls=[{"name": "extract_content", "args": {"info": "cart"}, "id": "1"}],
+        )
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_accounting_per_node_and_tool(self):
+        budget = TokenBudget()
+        messages = [HumanMessage(content="Show my cart")]
+        budget.record_model_call(
+            "agent_node", messages, response_with_usage(100, 10, response_metadata={"model_name": "gpt-4o"})
+        )
+        # Without reported usage, the tokens are counted locally
+        budget.record_model_call("agent_node", messages, AIMessage(content="Your cart has 3 items"))
+        budget.record_tool_outputs(
+            self.call_message, [ToolMessage(content="3 items in the cart", tool_call_id="1")]
+        )
+
+        stats = budget.stats()
+        self.assertEqual(100 + count_tokens("Show my cart"), stats["input_tokens"])
+        self.assertEqual(10 + count_tokens("Your cart has 3 items"), stats["output_tokens"])
+        self.assertGreater(stats["cost"], 0)
+        self.assertEqual(2, stats["by_node"]["agent_node"]["calls"])
+        self.assertEqual(
+            {"calls": 1, "output_tokens": count_tokens("3 items in the cart")},
+            stats["by_tool"]["extract_content"],
+        )
+
+    def test_actions_follow_the_budget(self):
+        budget = TokenBudget(max_tokens=1000)
+        self.assertEqual(BudgetAction.NONE, budget.action())
+        expected = [(500, BudgetAction.TRIM), (250, BudgetAction.DOWNGRADE), (250, BudgetAction.STOP)]
+        for tokens, action in expected:
+            budget.record_model_call("agent_node", [], response_with_usage(tokens, 0))
+            self.assertEqual(action, budget.action())
+        self.assertIn("budget", budget.stop_message().content)
+        self.assertFalse(budget.stop_message().tool_calls)
+
+        # Without budgets nothing is enforced
+        unlimited = TokenBudget()
+        unlimited.record_model_call("agent_node", [], response_with_usage(10**6, 0))
+        self.assertEqual(BudgetAction.NONE, unlimited.action())
+
+    def test_trim_keeps_the_latest_tool_outputs(self):
+        messages = [
+            HumanMessage(content="Show my cart"),
+            self.call_message,
+            ToolMessage(content="a long cart page", tool_call_id="1"),
+            AIMessage(content="", tool_calls=[{"name": "extract_content", "args": {}, "id": "2"}]),
+            ToolMessage(content="the order history", tool_call_id="2"),
+        ]
+        trimmed = TokenBudget().trim(messages)
+        self.assertEqual(TRIMMED_CONTENT, trimmed[2].content)
+        self.assertEqual("the order history", trimmed[4].content)
+        self.assertEqual("a long cart page", messages[2].content)
+
+    async def test_router_records_calls_and_downgrades(self):
+        budget = TokenBudget(max_tokens=1000)
+        router = ModelRouter(prompt=None, tools=[FakeTool("navigate_browser")], budget=budget)
+        used_tiers = []
+
+        def get_runnable(tier, tool_names=None):
+            def invoke(messages):
+                used_tiers.append(tier)
+                return response_with_usage(100, 5, tool_calls=[{"name": "navigate_browser", "args": {}, "id": "1"}])
+
+            return RunnableLambda(invoke)
+
+        router.get_runnable = get_runnable
+        messages = [HumanMessage(content="Show my cart")]
+        await router.ainvoke("agent_node", messages)
+        await router.ainvoke("agent_node", messages, downgrade=True)
+
+        self.assertEqual([ModelTier.LARGE, ModelTier.SMALL], used_tiers)
+        self.assertEqual(210, budget.total_tokens)
+        self.assertEqual(2, budget.by_node["agent_node"]["calls"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from app.amazon_web_agent.extraction.extraction_engine import (
+    extract_records,
+    key_records,
+    load_schema,
+)
+from app.amazon_web_agent.sync_engine import SyncEngine
+
+CART_HTML = """
+<form id="activeCartViewForm">
+    <div class="sc-list-item" data-asin="B000000001">
+        <div class="sc-grid-item-product-title"><span class="a-truncate-full">Coffee Beans</span></div>
+        <div class="sc-product-price">$12.99</div>
+        <div class="sc-action-quantity"><input value="2"></div>
+    </div>
+    <div class="sc-list-item" data-asin="B000000002">
+        <div class="sc-grid-item-product-title"><span class="a-truncate-full">Grinder</span></div>
+        <div class="sc-product-price">$49.00</div>
+        <div class="sc-action-quantity"><input value="1"></div>
+    </div>
+</form>
+"""
+
+
+class TestSyncEngine(unittest.TestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.sync_engine = SyncEngine(os.path.join(self.tmp_dir.name, "sync.sqlite3"))
+
+    def tearDown(self):
+        self.sync_engine.close()
+        self.tmp_dir.cleanup()
+
+    def test_parse_cart_items_by_asin(self):
+        cart_items = self._cart_items()
+        self.assertEqual(["B000000001", "B000000002"], list(cart_items))
+        self.assertEqual("$12.99", cart_items["B000000001"]["price"])
+        self.assertEqual(2, cart_items["B000000001"]["quantity"])
+
+    def test_snapshot_sync_reports_only_changes(self):
+        cart_items = self._cart_items()
+
+        changes = self.sync_engine.sync_snapshot("me", "cart", cart_items)
+        self.assertEqual(2, len(changes.added))
+
+        # Nothing changed
+        changes = self.sync_engine.sync_snapshot("me", "cart", cart_items)
+        self.assertFalse(changes.has_changes)
+
+        # One quantity changed, one item removed, one item added
+        cart_items["B000000001"] = dict(cart_items["B000000001"], quantity=3)
+        del cart_items["B000000002"]
+        cart_items["B000000003"] = {"asin": "B000000003", "title": "Mug"}
+        changes = self.sync_engine.sync_snapshot("me", "cart", cart_items)
+        self.assertEqual(["B000000003"], [record["asin"] for record in changes.added])
+        self.assertEqual(["B000000002"], [record["asin"] for record in changes.removed])
+        self.assertEqual(2, changes.changed[0]["before"]["quantity"])
+        self.assertEqual(3, changes.changed[0]["after"]["quantity"])
+        self.assertEqual(cart_items, self.sync_engine.get_records("me", "cart"))
+
+    def test_quantity_without_an_input(self):
+        cart_schema = load_schema("cart")
+        html = CART_HTML.replace('<input value="2">', '<span class="sc-quantity-textfield">Qty: 4</span>')
+        cart_items = key_records(cart_schema, extract_records(html, cart_schema))
+        self.assertEqual(4, cart_items["B000000001"]["quantity"])
+
+    def test_typed_field_is_not_a_change(self):
+        # Stored before the quantity was typed
+        self.sync_engine.sync_snapshot("me", "cart", {"B1": {"asin": "B1", "quantity": "2"}})
+        changes = self.sync_engine.sync_snapshot("me", "cart", {"B1": {"asin": "B1", "quantity": 2}})
+        self.assertFalse(changes.has_changes)
+        self.assertEqual(2, self.sync_engine.get_records("me", "cart")["B1"]["quantity"])
+
+    @staticmethod
+    def _cart_items():
+        cart_schema = load_schema("cart")
+        return key_records(cart_schema, extract_records(CART_HTML, cart_schema))
+
+    def test_incremental_sync_never_removes(self):
+        self.sync_engine.sync_incremental("me", "orders", {"1": {"order_id": "1"}})
+        changes = self.sync_engine.sync_incremental(
+            "me", "orders", {"2": {"order_id": "2"}}
+        )
+        self.assertEqual(1, len(changes.added))
+        self.assertEqual([], changes.removed)
+        self.assertEqual({"1", "2"}, set(self.sync_engine.get_records("me", "orders")))
+
+    def test_high_water_mark(self):
+        self.assertIsNone(self.sync_engine.get_high_water_mark("me", "orders"))
+        self.sync_engine.set_high_water_mark("me", "orders", "111-2")
+        self.sync_engine.set_high_water_mark("me", "orders", "111-3")
+        self.assertEqual("111-3", self.sync_engine.get_high_water_mark("me", "orders"))
+
+
+if __name__ == "__main__":
+    unittest.main()
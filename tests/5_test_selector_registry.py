@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.amazon_web_agent.selector_registry import SelectorRegistry
+
+SELECTORS = {
+    "cart": {
+        "title": [".old-title", ".new-title"],
+    }
+}
+
+
+class TestSelectorRegistry(unittest.TestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "selector_registry.json")
+        self.registry = SelectorRegistry(SELECTORS, self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_fallback_and_winner_first(self):
+        soup = BeautifulSoup("<div><span class='new-title'>Mug</span></div>", "html.parser")
+
+        self.assertEqual([".old-title", ".new-title"], self.registry.candidates("cart", "title"))
+        self.assertEqual("Mug", self.registry.select_one(soup, "cart", "title").text)
+
+        # The last winner is tried first from now on
+        self.assertEqual([".new-title", ".old-title"], self.registry.candidates("cart", "title"))
+        self.registry.select_one(soup, "cart", "title")
+
+        stats = self.registry.stats()["cart"]["title"]
+        self.assertEqual(2, stats["lookups"])
+        self.assertEqual(1.0, stats["hit_rate"])
+        self.assertEqual(0.5, stats["first_try_hit_rate"])
+
+    def test_miss(self):
+        soup = BeautifulSoup("<div></div>", "html.parser")
+        self.assertIsNone(self.registry.select_one(soup, "cart", "title"))
+        self.assertEqual(0.0, self.registry.stats()["cart"]["title"]["hit_rate"])
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.registry.candidates("cart", "unknown")
+
+    def test_persistence(self):
+        soup = BeautifulSoup("<span class='new-title'>Mug</span>", "html.parser")
+        self.registry.select_one(soup, "cart", "title")
+        self.registry.save()
+
+        registry = SelectorRegistry(SELECTORS, self.path)
+        self.assertEqual(".new-title", registry.candidates("cart", "title")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from app.amazon_web_agent.extraction.batch_extract import find_html_files, run_batch
+from app.amazon_web_agent.extraction.extraction_engine import (
+    ExtractionSchema,
+    FieldType,
+    coerce_value,
+    extract_next_page,
+    extract_records,
+    get_schema_for_info,
+    load_schema,
+)
+
+ORDERS_HTML = """
+<div class="order-card">
+    <div class="yohtmlc-order-id"><span dir="ltr">111-0000001-0000001</span></div>
+    <div class="yohtmlc-order-total"><span class="value">$1,299.99</span></div>
+    <a class="yohtmlc-product-title">Laptop</a>
+    <a class="yohtmlc-product-title">Sleeve</a>
+</div>
+<div class="order-card">
+    <div class="yohtmlc-order-total"><span class="value">$5.00</span></div>
+</div>
+<ul class="a-pagination"><li class="a-last"><a href="/your-orders/orders?startIndex=10">Next</a></li></ul>
+"""
+
+PRODUCT_SCHEMA = {
+    "name": "product",
+    "description": "Product",
+    "info": "PRODUCT",
+    "page_type": "product",
+    "key": "asin",
+    "fields": {
+        "asin": {"css": ["#ASIN"], "attribute": "value"},
+        "rating": {"css": ["#acrPopover"], "attribute": "title", "type": "float"},
+        "reviews": {"css": ["#acrCustomerReviewText"], "type": "int"},
+    },
+}
+
+
+class TestExtractionEngine(unittest.TestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+
+    def test_schema_for_every_info(self):
+        self.assertEqual("cart", get_schema_for_info("SHOPPING_CART_INFO").name)
+        self.assertEqual("orders", get_schema_for_info("ORDER_DETAILS_INFO").name)
+
+    def test_list_container_required_and_many(self):
+        schema = load_schema("orders")
+        records = extract_records(ORDERS_HTML, schema)
+
+        # The second card has no order ID and is skipped
+        self.assertEqual(1, len(records))
+        self.assertEqual("111-0000001-0000001", records[0]["order_id"])
+        self.assertEqual("$1,299.99", records[0]["total"])
+        self.assertEqual(["Laptop", "Sleeve"], records[0]["items"])
+        self.assertEqual("N/A", records[0]["status"])
+        self.assertEqual(
+            "/your-orders/orders?startIndex=10", extract_next_page(ORDERS_HTML, schema)
+        )
+
+    def test_document_record_and_coercion(self):
+        schema = ExtractionSchema.parse_obj(PRODUCT_SCHEMA)
+        html = """
+            <input id="ASIN" value="B000000001">
+            <span id="acrPopover" title="4.6 out of 5 stars"></span>
+            <span id="acrCustomerReviewText">12,345 ratings</span>
+        """
+        self.assertEqual(
+            [{"asin": "B000000001", "rating": 4.6, "reviews": 12345}],
+            extract_records(html, schema),
+        )
+        self.assertIsNone(coerce_value("none", FieldType.INT))
+
+    def test_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for index in range(3):
+                with open(os.path.join(tmp_dir, f"orders_{index}.html"), "w") as f:
+                    f.write(ORDERS_HTML)
+
+            files = find_html_files(tmp_dir)
+            results = list(run_batch(files, ["orders"], workers=2, chunksize=1))
+
+        self.assertEqual(files, [result["file"] for result in results])
+        for result in results:
+            self.assertEqual(1, len(result["results"]["orders"]["records"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+
+from app.amazon_web_agent.tools.search_products_tool import search_products
+
+SEARCH_HTML = """
+<div data-component-type="s-search-result" data-asin="B000000001">
+    <h2><a href="/dp/B000000001"><span>Kettle</span></a></h2>
+    <span class="a-price"><span class="a-offscreen">$30.00</span></span>
+</div>
+<div data-component-type="s-search-result" data-asin="B000000002">
+    <h2><a href="/dp/B000000002"><span>Toaster</span></a></h2>
+</div>
+<div data-component-type="s-search-result" data-asin="B000000003">
+    <h2><a href="/dp/B000000003"><span>Blender</span></a></h2>
+</div>
+"""
+
+PRODUCT_HTML = """
+<input id="ASIN" value="{asin}">
+<span id="productTitle">{title}</span>
+<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">{price}</span></span></div>
+<span id="acrPopover" title="4.5 out of 5 stars"></span>
+<span id="acrCustomerReviewText">1,024 ratings</span>
+<div id="availability"><span>In Stock</span></div>
+"""
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = None
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def goto(self, url, wait_until=None):
+        self.context.active += 1
+        self.context.max_active = max(self.context.max_active, self.context.active)
+        await asyncio.sleep(0.01)
+        self.context.active -= 1
+        self.url = url
+
+    async def content(self):
+        if "/s?k=" in self.url:
+            return SEARCH_HTML
+        asin = self.url.rsplit("/", 1)[-1]
+        price = "" if asin == "B000000001" else "$10.00"
+        return PRODUCT_HTML.format(asin=asin, title=f"Product {asin}", price=price)
+
+    async def close(self):
+        self.context.closed += 1
+
+
+class FakeContext:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.opened = 0
+        self.closed = 0
+
+    async def new_page(self):
+        self.opened += 1
+        return FakePage(self)
+
+
+class TestSearchProductsTool(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+
+    async def test_search_products(self):
+        context = FakeContext()
+        products = await search_products(context, "kitchen", max_results=3, max_tabs=2)
+
+        self.assertEqual(
+            ["B000000001", "B000000002", "B000000003"],
+            [product["asin"] for product in products],
+        )
+        # The listing price is used when the detail page has none
+        self.assertEqual("$30.00", products[0]["price"])
+        self.assertEqual("$10.00", products[1]["price"])
+        self.assertEqual(4.5, products[1]["rating"])
+        self.assertEqual(1024, products[1]["reviews"])
+        self.assertEqual("In Stock", products[1]["availability"])
+
+        # The pool is bounded and all tabs are closed afterwards
+        self.assertLessEqual(context.max_active, 2)
+        self.assertEqual(2, context.opened)
+        self.assertEqual(context.opened, context.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+import urllib.request
+from unittest import mock
+
+from app.amazon_web_agent.price_watch_scheduler import PriceWatchScheduler, WatchItem
+from app.amazon_web_agent.sync_engine import SyncEngine
+from eval.amazon_fixture_server import AmazonFixtureServer
+
+
+class HttpPage:
+    """A minimal stand-in for a Playwright page that loads the fixture site over HTTP."""
+
+    def __init__(self, context):
+        self.context = context
+        self.html = ""
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def goto(self, url, wait_until=None):
+        self.context.active += 1
+        self.context.browser.max_active = max(self.context.browser.max_active, self._active())
+        try:
+            self.html = await asyncio.to_thread(
+                lambda: urllib.request.urlopen(url).read().decode("utf-8")
+            )
+        finally:
+            self.context.active -= 1
+
+    async def content(self):
+        return self.html
+
+    async def close(self):
+        pass
+
+    def _active(self):
+        return sum(context.active for context in self.context.browser.contexts)
+
+
+class HttpContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0
+
+    async def new_page(self):
+        return HttpPage(self)
+
+    async def close(self):
+        pass
+
+
+class HttpBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.max_active = 0
+
+    async def new_context(self):
+        context = HttpContext(self)
+        self.contexts.append(context)
+        return context
+
+
+class TestPriceWatchScheduler(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.server = AmazonFixtureServer(latency=0.02)
+        self.server.start()
+        self.env = mock.patch.dict(os.environ, {"AMAZON_BASE_URL": self.server.base_url})
+        self.env.start()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.browser = HttpBrowser()
+        self.scheduler = PriceWatchScheduler(
+            self.browser,
+            [WatchItem(asin=asin) for asin in self.server.products],
+            interval=60,
+            batch_size=5,
+            max_contexts=2,
+            tabs_per_context=4,
+            default_domain_concurrency=3,
+            sync_engine=SyncEngine(os.path.join(self.tmp_dir.name, "sync.sqlite3")),
+            write_changes=False,
+        )
+
+    async def asyncTearDown(self):
+        await self.scheduler.close()
+        self.env.stop()
+        self.server.stop()
+        self.tmp_dir.cleanup()
+
+    async def test_round_refreshes_all_due_items_within_caps(self):
+        self.assertEqual(20, await self.scheduler.run_round())
+
+        stats = self.scheduler.stats()
+        self.assertEqual(20, stats["checked"])
+        self.assertEqual(0, stats["errors"])
+        self.assertGreater(stats["items_per_minute"], 0)
+        self.assertLessEqual(self.browser.max_active, 3)
+        self.assertEqual(2, len(self.browser.contexts))
+
+        records = self.scheduler.sync_engine.get_records("price_watch", "products")
+        self.assertEqual("$11.99", records["B000000001"]["price"])
+        self.assertEqual("In Stock", records["B000000001"]["availability"])
+
+        # Nothing is due right after a round
+        self.assertEqual(0, await self.scheduler.run_round())
+
+    async def test_changed_items_are_refreshed_first_and_more_often(self):
+        await self.scheduler.run_round()
+        self.server.set_price("B000000007", "$1.00")
+
+        # Make every item due again
+        for asin, _ in self.scheduler.pop_due(float("inf")):
+            self.scheduler.reschedule(asin, time.time() - 1000)
+        await self.scheduler.run_round()
+        self.assertEqual(1, self.scheduler.stats()["changed"])
+
+        due = self.scheduler.pop_due(float("inf"))
+        self.assertEqual("B000000007", due[0][0])
+        due_times = dict(due)
+        self.assertLess(
+            due_times["B000000007"], min(t for asin, t in due if asin != "B000000007")
+        )
+
+    async def test_non_product_page_is_an_error(self):
+        self.scheduler._items["B000000001"].url = self.server.base_url + "/"
+        self.assertEqual(20, await self.scheduler.run_round())
+
+        stats = self.scheduler.stats()
+        self.assertEqual((19, 1), (stats["checked"], stats["errors"]))
+        records = self.scheduler.sync_engine.get_records("price_watch", "products")
+        self.assertNotIn("B000000001", records)
+
+    async def test_failed_round_reschedules_its_items(self):
+        with mock.patch.object(self.scheduler, "_refresh_batch", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                await self.scheduler.run_round()
+        self.assertEqual(20, len(self.scheduler.pop_due(float("inf"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
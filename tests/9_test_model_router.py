@@ -0,0 +1,89 @@
+import os
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.amazon_web_agent.model_router import ModelRouter
+from utils.chat_model_env_util import ChatModelUtil, ModelTier
+
+TIER_ENV = {
+    "LLM_MODEL_TYPE": "ChatOpenAI",
+    "LLM_MODEL": "gpt-4o",
+    "LLM_TEMPERATURE": "0",
+    "LLM_SMALL_MODEL": "gpt-4o-mini",
+    "LLM_TIER_DELEGATOR": "large",
+}
+
+
+class FakeTool:
+    def __init__(self, name):
+        self.name = name
+
+
+class TestModelRouter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        """
+        This method is called before each test method.
+        """
+        print("setUp: Preparing the test environment.")
+        self.env = mock.patch.dict(os.environ, TIER_ENV)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+
+    def test_tier_configuration(self):
+        small = ChatModelUtil.get_model_kwargs(ModelTier.SMALL)
+        large = ChatModelUtil.get_model_kwargs(ModelTier.LARGE)
+        self.assertEqual("gpt-4o-mini", small["model"])
+        self.assertEqual("gpt-4o", large["model"])
+        self.assertEqual(0, small["temperature"])
+        self.assertNotIn("small_model", ChatModelUtil.get_model_kwargs())
+        self.assertNotIn("tier_delegator", ChatModelUtil.get_model_kwargs())
+
+        self.assertEqual(ModelTier.LARGE, ChatModelUtil.get_step_tier("delegator"))
+        self.assertEqual(ModelTier.SMALL, ChatModelUtil.get_step_tier("agent_node"))
+
+    async def test_escalation(self):
+        router = ModelRouter(prompt=None, tools=[FakeTool("navigate_browser")])
+        responses = {
+            ModelTier.SMALL: AIMessage(
+                content="",
+                tool_calls=[{"name": "made_up_tool", "args": {}, "id": "1"}],
+                usage_metadata={"input_tokens": 10, "output_tokens": 1, "total_tokens": 11},
+            ),
+            ModelTier.LARGE: AIMessage(
+                content="",
+                tool_calls=[{"name": "navigate_browser", "args": {}, "id": "2"}],
+            ),
+        }
+        router.get_runnable = lambda tier, tool_names=None: RunnableLambda(
+            lambda messages: responses[tier]
+        )
+
+        # An ambiguous small model response is retried on the large model
+        response = await router.ainvoke("agent_node", [HumanMessage(content="Show my cart")])
+        self.assertEqual("navigate_browser", response.tool_calls[0]["name"])
+
+        # A tool error goes to the large model directly
+        await router.ainvoke(
+            "agent_node",
+            [
+                HumanMessage(content="Show my cart"),
+                response,
+                ToolMessage(content="Error: timeout", tool_call_id="2"),
+            ],
+        )
+
+        stats = router.stats()
+        self.assertEqual(1, stats["small"]["calls"])
+        self.assertEqual(10, stats["small"]["input_tokens"])
+        self.assertEqual(2, stats["large"]["calls"])
+        self.assertEqual(2, stats["large"]["escalations"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import asyncio
+import os
+import shutil
+import time
+import weakref
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import psutil
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+DEFAULT_MAX_MB = 512
+
+# Seconds between two cleanups of the cache directory
+DEFAULT_CLEANUP_INTERVAL = 3600.0
+
+LOCK_FILE = "slot.lock"
+
+# The page's load time and how its resources were served. Resources with a body but no
+# transfer were served from the cache; cross-origin resources without Timing-Allow-Origin
+# report neither and are left out.
+LOAD_TIMING_SCRIPT = """() => {
+    const navigation = performance.getEntriesByType("navigation")[0];
+    const resources = performance.getEntriesByType("resource")
+        .filter(entry => entry.decodedBodySize > 0);
+    return {
+        url: location.href,
+        load_ms: navigation && navigation.loadEventStart > 0 ? navigation.loadEventStart : performance.now(),
+        resources: resources.length,
+        cached: resources.filter(entry => entry.transferSize === 0).length,
+    };
+}"""
+
+# The page load monitor of every browser launched with a disk cache
+_monitors: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_browser_cache_dir() -> Optional[str]:
+    """The persistent browser cache is opt-in by setting `BROWSER_CACHE_DIR`."""
+    return os.getenv("BROWSER_CACHE_DIR") or None
+
+
+def get_directory_size(path: str) -> int:
+    size = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                size += os.path.getsize(os.path.join(dir_path, file_name))
+            except OSError:
+                # Removed by the browser in the meantime
+                pass
+    return size
+
+
+class BrowserDiskCache:
+    """
+    A persistent HTTP and code cache for Chromium, shared by the browsers launched over time.
+
+    Contexts stay non-persistent, so cookies and session state still start fresh in every
+    run; only the cache directory passed with `--disk-cache-dir` outlives the browser.
+    Chromium cannot share a cache directory between running processes, so every browser
+    leases a slot of the cache directory. A lock file with the owner's PID marks a slot in
+    use, and slots of dead processes are taken over, so workers reuse the caches of the
+    workers before them.
+
+    Each slot is capped by Chromium (`--disk-cache-size`) at an equal share of `max_mb` for
+    the `slots` browsers expected to run at once, so the running browsers together stay
+    within `max_mb`. The cleanup, run at most every `cleanup_interval` seconds when a slot is
+    leased, removes the least recently used idle slots while the whole directory is larger
+    than `max_mb`. `size` reports the size measured by the last cleanup, so reading it does
+    not walk the directory.
+
+    Example:
+        cache = BrowserDiskCache("data/browser_cache", max_mb=512, slots=2)
+        slot = cache.acquire_slot()
+        browser = await playwright.chromium.launch(args=cache.launch_args(slot))
+        ...
+        cache.release_slot(slot)
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_mb: float = DEFAULT_MAX_MB,
+        cleanup_interval: float = DEFAULT_CLEANUP_INTERVAL,
+        slots: int = 1,
+    ):
+        self.root = root
+        self.max_bytes = int(max_mb * 2**20)
+        self.slot_max_bytes = self.max_bytes // max(1, slots)
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup: Optional[float] = None
+        self._size: Optional[int] = None
+        self._leased: Set[str] = set()
+        os.makedirs(root, exist_ok=True)
+
+    def launch_args(self, slot: str) -> List[str]:
+        return [f"--disk-cache-dir={os.path.abspath(slot)}", f"--disk-cache-size={self.slot_max_bytes}"]
+
+    def acquire_slot(self) -> str:
+        """Lease the first free slot, creating one if all are in use."""
+        self.cleanup()
+        index = 0
+        while True:
+            slot = os.path.join(self.root, f"slot-{index}")
+            if self._try_lock(slot):
+                self._leased.add(slot)
+                return slot
+            index += 1
+
+    def release_slot(self, slot: str) -> None:
+        self._leased.discard(slot)
+        try:
+            os.remove(os.path.join(slot, LOCK_FILE))
+            # The modification time orders the slots for the cleanup
+            os.utime(slot)
+        except OSError as e:
+            logger.warning(f"Failed to release the browser cache slot {slot}: {e}")
+
+    def size(self, refresh: bool = False) -> int:
+        """The size of the cache directory as of the last cleanup, or measured now with `refresh`."""
+        if refresh or self._size is None:
+            self._size = get_directory_size(self.root)
+        return self._size
+
+    def cleanup(self, force: bool = False) -> int:
+        """Remove the least recently used idle slots until the cache fits, return the bytes removed."""
+        now = time.monotonic()
+        if not force and self._last_cleanup is not None and now - self._last_cleanup < self.cleanup_interval:
+            return 0
+        self._last_cleanup = now
+
+        slots = [
+            os.path.join(self.root, name)
+            for name in os.listdir(self.root)
+            if name.startswith("slot-") and os.path.isdir(os.path.join(self.root, name))
+        ]
+        sizes = {slot: get_directory_size(slot) for slot in slots}
+        total = sum(sizes.values())
+        removed = 0
+        for slot in sorted(slots, key=os.path.getmtime):
+            if total <= self.max_bytes:
+                break
+            if slot in self._leased or self._is_locked(slot):
+                continue
+            shutil.rmtree(slot, ignore_errors=True)
+            total -= sizes[slot]
+            removed += sizes[slot]
+        self._size = total
+        if removed:
+            logger.info(f"Removed {removed / 2**20:.1f} MB of browser cache, {total / 2**20:.1f} MB left")
+        return removed
+
+    def _try_lock(self, slot: str) -> bool:
+        os.makedirs(slot, exist_ok=True)
+        lock_path = os.path.join(slot, LOCK_FILE)
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._is_locked(slot):
+                    return False
+                # Left behind by a process that died, take it over
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def _is_locked(self, slot: str) -> bool:
+        """Whether the slot is leased by a live process."""
+        if slot in self._leased:
+            return True
+        try:
+            with open(os.path.join(slot, LOCK_FILE)) as f:
+                pid = int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return False
+        return psutil.pid_exists(pid)
+
+
+class PageLoadMonitor:
+    """
+    Measures page loads of browsers with a disk cache: the share of resources served from
+    the cache, and the load time saved compared with the first load of the same page.
+
+    The first load of a page by the monitor is the baseline, so the savings are a lower
+    bound when the cache was already warm from earlier processes.
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.resources = 0
+        self.cached = 0
+        self.saved_ms = 0.0
+        self._first_load_ms: Dict[str, float] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    def attach(self, context) -> None:
+        for page in context.pages:
+            self._watch(page)
+        context.on("page", self._watch)
+
+    def _watch(self, page) -> None:
+        page.on("load", lambda: self._on_load(page))
+
+    def _on_load(self, page) -> None:
+        task = asyncio.ensure_future(self._measure(page))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _measure(self, page) -> None:
+        try:
+            timing = await page.evaluate(LOAD_TIMING_SCRIPT)
+        except Exception as e:
+            # The page was closed or navigated away before it could be measured
+            logger.debug(f"Failed to measure the page load: {e}")
+            return
+        self.record(timing)
+
+    def record(self, timing: dict) -> None:
+        self.pages += 1
+        self.resources += timing["resources"]
+        self.cached += timing["cached"]
+        parsed = urlparse(timing["url"])
+        page_key = f"{parsed.netloc}{parsed.path}"
+        first_load_ms = self._first_load_ms.setdefault(page_key, timing["load_ms"])
+        self.saved_ms += max(0.0, first_load_ms - timing["load_ms"])
+
+    def stats(self) -> dict:
+        return {
+            "pages": self.pages,
+            "hit_ratio": round(self.cached / self.resources, 3) if self.resources else 0.0,
+            "saved_seconds": round(self.saved_ms / 1000, 2),
+        }
+
+
+def register_page_load_monitor(browser, monitor: PageLoadMonitor) -> None:
+    _monitors[browser] = monitor
+
+
+def monitor_page_loads(context) -> None:
+    """Measure the page loads of the context if its browser was launched with a disk cache."""
+    monitor = _monitors.get(context.browser) if context.browser is not None else None
+    if monitor is not None:
+        monitor.attach(context)
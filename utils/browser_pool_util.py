@@ -0,0 +1,296 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set
+
+import psutil
+
+from utils.browser_cache_util import BrowserDiskCache, PageLoadMonitor, register_page_load_monitor
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+
+def _sum_rss(processes) -> int:
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            # The process exited in the meantime
+            pass
+    return rss
+
+
+def get_browser_processes_rss() -> int:
+    """Return the resident memory in bytes of the browser processes started by this process."""
+    try:
+        return _sum_rss(psutil.Process().children(recursive=True))
+    except psutil.Error:
+        return 0
+
+
+def get_process_tree_rss(pid: int) -> int:
+    """Return the resident memory in bytes of the process and its descendants."""
+    try:
+        process = psutil.Process(pid)
+        return _sum_rss([process] + process.children(recursive=True))
+    except psutil.Error:
+        return 0
+
+
+def get_child_pids() -> Set[int]:
+    try:
+        return {child.pid for child in psutil.Process().children(recursive=True)}
+    except psutil.Error:
+        return set()
+
+
+def find_new_process_root(before: Set[int]) -> Optional[int]:
+    """Return the PID of the one process tree started since `before`, e.g. a launched browser."""
+    new_pids = get_child_pids() - before
+    roots = []
+    for pid in new_pids:
+        try:
+            if psutil.Process(pid).ppid() not in new_pids:
+                roots.append(pid)
+        except psutil.Error:
+            pass
+    return roots[0] if len(roots) == 1 else None
+
+
+def count_open_pages(browser) -> int:
+    return sum(len(context.pages) for context in browser.contexts)
+
+
+async def close_contexts(contexts) -> int:
+    """Close the contexts with their pages and return the number of pages that were still open."""
+    pages = 0
+    for context in list(contexts):
+        pages += len(context.pages)
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser context: {e}")
+    return pages
+
+
+@asynccontextmanager
+async def track_run(browser):
+    """
+    Close the contexts and pages opened on the browser during the block when it ends,
+    whether it succeeds or fails.
+
+    Example:
+        async with track_run(browser):
+            await amazon_web_agent_arun(user_requirement, browser)
+    """
+    existing = set(map(id, browser.contexts))
+    try:
+        yield browser
+    finally:
+        opened = [context for context in browser.contexts if id(context) not in existing]
+        pages = await close_contexts(opened)
+        if opened:
+            logger.info(f"Closed {len(opened)} contexts and {pages} pages at the end of the run")
+
+
+class BrowserPool:
+    """
+    A pool of Playwright browsers shared by concurrent agent runs, managing their lifecycle.
+
+    The LangChain Playwright tools act on the first context of their browser, so a browser
+    serves one run at a time. The pool keeps up to `size` browsers warm between runs and
+    closes the contexts and pages a run left behind before handing the browser to the next run.
+
+    Chromium's memory grows over long-lived processes, so a browser is recycled (closed and
+    relaunched on demand) when:
+    - it disconnected, e.g. Chromium crashed (checked when it is borrowed and returned),
+    - it served `max_tasks_per_browser` runs,
+    - its processes use more than `max_rss_mb` of resident memory, or
+    - its contexts could not be closed, i.e. they would leak into the next run.
+
+    With a `disk_cache`, every browser is launched on a slot of the persistent cache, so
+    static assets are not downloaded and compiled again by the next browser on the slot.
+    Contexts opened with `monitor_page_loads` then report the cache hit ratio and the load
+    time saved.
+
+    `stats` exposes live browser, context and page counts and the memory gauge, for sizing workers.
+
+    Example:
+        pool = BrowserPool(size=2, max_tasks_per_browser=50, max_rss_mb=2048)
+        async with pool.acquire() as browser:
+            await amazon_web_agent_arun(user_requirement, browser)
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        headless: bool = True,
+        args: Optional[List[str]] = None,
+        max_tasks_per_browser: Optional[int] = 50,
+        max_rss_mb: Optional[float] = None,
+        disk_cache: Optional[BrowserDiskCache] = None,
+    ):
+        if size < 1:
+            raise ValueError("The browser pool size must be at least 1.")
+        self.size = size
+        self.headless = headless
+        self.args = args
+        self.max_tasks_per_browser = max_tasks_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.disk_cache = disk_cache
+        self.page_loads = PageLoadMonitor()
+        self._playwright = None
+        self._browsers: List = []
+        self._tasks: Dict[int, int] = {}
+        self._cache_slots: Dict[int, str] = {}
+        # The PID of each browser's main process, to measure its memory
+        self._pids: Dict[int, int] = {}
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(size)
+        self._lock = asyncio.Lock()
+        self._closed_contexts = 0
+        self._closed_pages = 0
+        self._leaks = 0
+        self._recycled = 0
+
+    @property
+    def in_use(self) -> int:
+        return len(self._browsers) - self._idle.qsize()
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a browser for one run, launching a new one if none is idle."""
+        async with self._semaphore:
+            browser = await self._take_idle() or await self._launch()
+            try:
+                yield browser
+            finally:
+                self._tasks[id(browser)] += 1
+                # The contexts of a disconnected browser are gone with it
+                if browser.is_connected():
+                    await self._reset(browser)
+                recycle_reason = self._recycle_reason(browser)
+                if recycle_reason:
+                    logger.info(f"Recycling a browser: {recycle_reason}")
+                    await self._close_browser(browser)
+                    self._recycled += 1
+                else:
+                    self._idle.put_nowait(browser)
+
+    async def close(self) -> None:
+        browsers = list(self._browsers)
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for browser in browsers:
+            await self._close_browser(browser)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self) -> dict:
+        """Return the live counts and memory gauge of the pool."""
+        stats = {
+            "size": self.size,
+            "launched": len(self._browsers),
+            "in_use": self.in_use,
+            "contexts": sum(len(browser.contexts) for browser in self._browsers),
+            "pages": sum(count_open_pages(browser) for browser in self._browsers),
+            "closed_contexts": self._closed_contexts,
+            "closed_pages": self._closed_pages,
+            "leaks": self._leaks,
+            "recycled": self._recycled,
+            "rss_mb": round(get_browser_processes_rss() / 2**20, 1),
+        }
+        if self.disk_cache is not None:
+            stats["disk_cache"] = dict(
+                self.page_loads.stats(), size_mb=round(self.disk_cache.size() / 2**20, 1)
+            )
+        return stats
+
+    async def _take_idle(self):
+        """Return an idle browser that is still connected, replacing those that are not."""
+        while not self._idle.empty():
+            browser = self._idle.get_nowait()
+            if browser.is_connected():
+                return browser
+            logger.info("Recycling a browser: it disconnected while idle")
+            await self._close_browser(browser)
+            self._recycled += 1
+        return None
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+
+        args = list(self.args or [])
+        slot = None
+        if self.disk_cache is not None:
+            slot = self.disk_cache.acquire_slot()
+            args += self.disk_cache.launch_args(slot)
+        # Launches are serialized, so the processes started meanwhile belong to this browser
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            before = get_child_pids()
+            try:
+                browser = await self._playwright.chromium.launch(headless=self.headless, args=args)
+            except Exception:
+                if slot is not None:
+                    self.disk_cache.release_slot(slot)
+                raise
+            pid = find_new_process_root(before)
+        if pid is not None:
+            self._pids[id(browser)] = pid
+        self._browsers.append(browser)
+        self._tasks[id(browser)] = 0
+        if slot is not None:
+            self._cache_slots[id(browser)] = slot
+            register_page_load_monitor(browser, self.page_loads)
+        logger.info(f"Launched browser {len(self._browsers)} of {self.size}")
+        return browser
+
+    async def _close_browser(self, browser) -> None:
+        if browser in self._browsers:
+            self._browsers.remove(browser)
+        self._tasks.pop(id(browser), None)
+        self._pids.pop(id(browser), None)
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser: {e}")
+        # Only released once the browser is closed, Chromium holds the cache until then
+        slot = self._cache_slots.pop(id(browser), None)
+        if slot is not None:
+            self.disk_cache.release_slot(slot)
+
+    async def _reset(self, browser) -> None:
+        """Close the contexts left behind by a run, so the next run starts from a clean browser."""
+        contexts = list(browser.contexts)
+        self._closed_contexts += len(contexts)
+        self._closed_pages += await close_contexts(contexts)
+        leaked = len(browser.contexts)
+        if leaked:
+            logger.warning(f"{leaked} browser contexts could not be closed")
+            self._leaks += leaked
+
+    def _recycle_reason(self, browser) -> Optional[str]:
+        if not browser.is_connected():
+            return "it disconnected"
+        if browser.contexts:
+            return "its contexts could not be closed"
+        tasks = self._tasks.get(id(browser), 0)
+        if self.max_tasks_per_browser and tasks >= self.max_tasks_per_browser:
+            return f"it served {tasks} runs"
+        if self.max_rss_mb:
+            rss_mb = self._browser_rss(browser) / 2**20
+            if rss_mb > self.max_rss_mb:
+                return f"it uses {rss_mb:.0f} MB, more than {self.max_rss_mb:.0f} MB"
+        return None
+
+    def _browser_rss(self, browser) -> int:
+        """The memory of the browser's processes, or its share of all browsers if its PID is unknown."""
+        pid = self._pids.get(id(browser))
+        if pid is not None:
+            return get_process_tree_rss(pid)
+        return get_browser_processes_rss() // max(1, len(self._browsers))
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+T = TypeVar("T")
+
+# The token of the run executing in the current context, see `use_run_token`
+_current_token: ContextVar[Optional["CancellationToken"]] = ContextVar("run_token", default=None)
+
+
+def get_run_timeout() -> Optional[float]:
+    """The default deadline of a run in seconds, set through `AGENT_RUN_TIMEOUT`."""
+    timeout = os.getenv("AGENT_RUN_TIMEOUT")
+    return float(timeout) if timeout else None
+
+
+class RunCancelledError(Exception):
+    """Raised in a run that was cancelled or ran past its deadline."""
+
+
+class CancellationToken:
+    """
+    The deadline and cancellation state of one run, shared by everything the run awaits.
+
+    `run` awaits an operation until it finishes, the token is cancelled or the deadline
+    passes, whichever comes first. In the latter cases the operation is cancelled, which
+    aborts in-flight model requests and Playwright calls, and RunCancelledError is raised.
+    Loops check the token between steps with `check`.
+
+    Example:
+        token = CancellationToken(timeout=300)
+        with use_run_token(token):
+            response = await token.run(model.ainvoke(messages))
+        ...
+        token.cancel("the page was closed")
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.reason: Optional[str] = None
+        self._event: Optional[asyncio.Event] = None
+
+    @property
+    def cancelled(self) -> bool:
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.reason = "the run deadline was exceeded"
+        return self.reason is not None
+
+    def cancel(self, reason: str = "the run was cancelled") -> None:
+        if self.reason is None:
+            self.reason = reason
+            logger.info(f"Cancelling the run: {reason}")
+        if self._event is not None:
+            self._event.set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, None without a deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout_ms(self, default: float) -> float:
+        """
+        A timeout in milliseconds for a call, at most the time left until the deadline. It is
+        at least 1 ms, since a timeout of 0 disables the timeout of Playwright calls.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(1.0, min(default, remaining * 1000))
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise RunCancelledError(self.reason)
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Await the operation, cancelling it when the token is cancelled or the deadline passes."""
+        task = asyncio.ensure_future(awaitable)
+        if self.cancelled:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self.check()
+
+        if self._event is None:
+            self._event = asyncio.Event()
+        waiter = asyncio.ensure_future(self._event.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {task, waiter}, timeout=self.remaining(), return_when=asyncio.FIRST_COMPLETED
+            )
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            waiter.cancel()
+
+        if task in done:
+            return task.result()
+        task.cancel()
+        # Let the operation unwind, so its pages and contexts are closed before the run ends
+        await asyncio.gather(task, return_exceptions=True)
+        self.check()
+        raise RunCancelledError(self.reason or "the run was cancelled")
+
+
+def get_run_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+@contextmanager
+def use_run_token(token: CancellationToken):
+    """Make the token the current run's token for the block and the tasks it starts."""
+    reset_token = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset_token)
@@ -1,6 +1,6 @@
 import os
 from enum import Enum, auto
-from typing import Union
+from typing import Dict, Optional, Union
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI, AzureChatOpenAI
@@ -21,10 +21,25 @@ class ModelType(Enum):
     AzureChatOpenAI = auto()
 
 
+class ModelTier(str, Enum):
+    """Enum to represent the model tier. Each tier is configured through its own `LLM_<TIER>_` prefix."""
+
+    SMALL = "small"
+    LARGE = "large"
+
+
+# Prefixes of environment variables that configure tiers and routing rather than the base model
+TIER_ENV_PREFIXES = tuple(f"LLM_{tier.name}_" for tier in ModelTier) + ("LLM_TIER_",)
+
+# Tier used by a step when `LLM_TIER_<STEP>` is not set
+DEFAULT_MODEL_TIER = ModelTier.SMALL
+
+
 class ChatModelUtil:
     """Configuration class for chat model. Initialize the chat model based on environment variables."""
 
     _llm = None
+    _tier_llms: Dict[ModelTier, BaseChatModel] = {}
 
     @classmethod
     def initialize_llm(cls):
@@ -49,12 +64,7 @@ class ChatModelUtil:
         try:
             logger.info(f"Initializing llm")
 
-            # Extract and process environment variables starting with "LLM_" to configure the model
-            kwargs = {
-                key[4:].lower(): cls._parse_env_value(value)
-                for key, value in os.environ.items()
-                if key.startswith("LLM_")
-            }
+            kwargs = cls.get_model_kwargs()
             model_type = ModelType[kwargs.pop("model_type")]
 
             if model_type == ModelType.AzureChatOpenAI:
@@ -69,6 +79,49 @@ class ChatModelUtil:
             logger.error(f"Failed to initialize chat model due to error: {e}")
             raise
 
+    @classmethod
+    def get_model_kwargs(cls, tier: Optional[ModelTier] = None) -> dict:
+        """
+        Collect the model configuration from environment variables.
+
+        The base configuration comes from variables prefixed with `LLM_`. For a tier, variables
+        prefixed with `LLM_<TIER>_` (e.g. `LLM_SMALL_MODEL`) override the base configuration,
+        so a tier without its own variables uses the base model.
+        """
+        # Extract and process environment variables starting with "LLM_" to configure the model
+        kwargs = {
+            key[4:].lower(): cls._parse_env_value(value)
+            for key, value in os.environ.items()
+            if key.startswith("LLM_") and not key.startswith(TIER_ENV_PREFIXES)
+        }
+        if tier is not None:
+            prefix = f"LLM_{tier.name}_"
+            kwargs.update(
+                {
+                    key[len(prefix) :].lower(): cls._parse_env_value(value)
+                    for key, value in os.environ.items()
+                    if key.startswith(prefix)
+                }
+            )
+        return kwargs
+
+    @staticmethod
+    def get_step_tier(step: str) -> ModelTier:
+        """
+        Return the tier configured for a graph node or step type through `LLM_TIER_<STEP>`.
+
+        Example Environment Variables:
+        - LLM_TIER_AGENT_NODE=small
+        - LLM_TIER_DELEGATOR=large
+        """
+        value = os.getenv(f"LLM_TIER_{step.upper()}")
+        if not value:
+            return DEFAULT_MODEL_TIER
+        try:
+            return ModelTier(value.lower())
+        except ValueError:
+            raise ValueError(f"Unsupported model tier for {step}: {value}")
+
     @staticmethod
     def _parse_env_value(value: str) -> Union[str, int, float]:
         """Attempt to parse environment variable string value into int or float if applicable."""
@@ -90,9 +143,17 @@ class ChatModelUtil:
         return ChatModelUtil._llm
 
     @classmethod
-    def create_llm(cls) -> BaseChatModel:
+    def get_tier_llm(cls, tier: ModelTier) -> BaseChatModel:
+        """Return the shared LLM instance of the tier, so concurrent runs reuse its HTTP connection pool."""
+        if tier not in cls._tier_llms:
+            cls._tier_llms[tier] = cls.create_llm(tier)
+        return cls._tier_llms[tier]
+
+    @classmethod
+    def create_llm(cls, tier: Optional[ModelTier] = None) -> BaseChatModel:
         """
         Initialize a new LLM instance using configuration parameters specified through environment variables.
+        If a tier is given, the `LLM_<TIER>_` variables override the base configuration.
 
         Key steps:
         - Load environment variables to configure the chat model.
@@ -108,16 +169,12 @@ class ChatModelUtil:
         - Recognize the model type as ChatOpenAI.
         - Extract and convert the additional parameters into `kwargs`: `model="gpt-3.5-turbo-1106"` and `temperature=0`.
         - Use these parameters to initialize a ChatOpenAI model instance.
+        With `LLM_SMALL_MODEL=gpt-4o-mini`, `create_llm(ModelTier.SMALL)` uses `model="gpt-4o-mini"` instead.
         """
         try:
-            logger.info(f"Initializing llm")
+            logger.info(f"Initializing llm" + (f" ({tier.value} tier)" if tier else ""))
 
-            # Extract and process environment variables starting with "LLM_" to configure the model
-            kwargs = {
-                key[4:].lower(): cls._parse_env_value(value)
-                for key, value in os.environ.items()
-                if key.startswith("LLM_")
-            }
+            kwargs = cls.get_model_kwargs(tier)
             model_type = ModelType[kwargs.pop("model_type")]
 
             if model_type == ModelType.AzureChatOpenAI:
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Union
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+_CLOSED = object()
+
+
+class EventChannel:
+    """
+    An async channel carrying UI events from a run to the code that renders them.
+
+    `publish` never blocks, so a run can report progress from its hot path. A consumer
+    task drains the channel in batches and renders them, e.g. with `st.write`. When the
+    consumer falls behind and the channel is full, the oldest events are dropped.
+
+    Example:
+        channel = EventChannel()
+        consumer = asyncio.create_task(channel.consume(render))
+        channel.publish("Sign in into Amazon")
+        await channel.close()
+        await consumer
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Created on first use, so that it belongs to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        return self._queue
+
+    def publish(self, event: Any) -> None:
+        """Add an event without waiting, dropping the oldest event if the channel is full."""
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+                self.dropped += 1
+
+    async def close(self) -> None:
+        """Let the consumer finish once it rendered the events published so far."""
+        self.publish(_CLOSED)
+
+    async def consume(
+        self, handler: Callable[[List[Any]], Union[Awaitable[None], None]], max_batch: int = 50
+    ) -> None:
+        """Pass the events to `handler` in batches until the channel is closed."""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            closed = _CLOSED in batch
+            events = [event for event in batch if event is not _CLOSED]
+            if events:
+                try:
+                    result = handler(events)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.warning(f"Failed to render {len(events)} events: {e}")
+            if closed:
+                if self.dropped:
+                    logger.warning(f"Dropped {self.dropped} events the consumer could not keep up with")
+                return
@@ -1,22 +1,144 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import random
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Attributes of every log record, anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including the fields passed through `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Formatted by TracebackQueueHandler before the record was queued
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TracebackQueueHandler(QueueHandler):
+    """
+    Queues records with their arguments merged into the message and their traceback formatted
+    into `exc_text`, apart from the message. The default `prepare` appends the traceback to the
+    message and drops it, so formatters could not tell them apart.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """
+    Samples debug records and limits them to `rate` per second for every logging call site,
+    so a debug statement in a hot loop cannot flood the log. Other levels always pass.
+    """
+
+    def __init__(self, rate: float = 10.0, sample_rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.sample_rate = sample_rate
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if not self.rate:
+            return True
+
+        # Token bucket per call site, holding up to one second of records
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault((record.pathname, record.lineno), [self.rate, now])
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+        return True
 
 
 class LoggerUtil:
+    """
+    Configures logging once per process and returns the root logger.
+
+    Records are put on a queue by the calling thread and written to stdout by a background
+    thread, so logging never blocks the event loop on I/O. The output is configured through
+    environment variables:
+    - LOG_LEVEL: the root level, INFO by default.
+    - LOG_FORMAT: `json` (default) for one JSON object per line, or `text`.
+    - LOG_DEBUG_RATE_LIMIT: debug records per second per call site, 10 by default.
+    - LOG_DEBUG_SAMPLE_RATE: share of debug records kept, 1.0 by default.
+    """
+
+    _listener: Optional[QueueListener] = None
+    _lock = threading.Lock()
+
     @staticmethod
     def get_logger():
         logger = logging.getLogger()
+        if LoggerUtil._listener is None:
+            with LoggerUtil._lock:
+                if LoggerUtil._listener is None:
+                    LoggerUtil._configure(logger)
+        return logger
+
+    @staticmethod
+    def _configure(logger: logging.Logger) -> None:
+        stream_handler = logging.StreamHandler(stream=sys.stdout)
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        else:
+            stream_handler.setFormatter(JsonFormatter())
 
-        # Used for local testing
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[logging.StreamHandler(stream=sys.stdout)],
+        queue_handler = TracebackQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(
+            DebugRateLimitFilter(
+                rate=float(os.getenv("LOG_DEBUG_RATE_LIMIT", "10")),
+                sample_rate=float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0")),
+            )
         )
 
-        # Get the logger for httpx
-        httpx_logger = logging.getLogger("httpx")
-        # Set the logging level to WARNING to suppress INFO logs
-        httpx_logger.setLevel(logging.WARNING)
+        logger.handlers = [queue_handler]
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
-        return logger
+        # Set the logging level of httpx to WARNING to suppress INFO logs
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+        listener.start()
+        # Flush the queued records when the process exits
+        atexit.register(listener.stop)
+        LoggerUtil._listener = listener
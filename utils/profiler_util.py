@@ -0,0 +1,253 @@
+import asyncio
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger()
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+FrameKey = Tuple[str, str, int]
+
+
+def is_profiling_enabled() -> bool:
+    """Profiling is opt-in through `AGENT_PROFILE`."""
+    return os.getenv("AGENT_PROFILE", "false").lower() in {"1", "true", "yes"}
+
+
+def get_profile_dir() -> str:
+    """Return `AGENT_PROFILE_DIR`, or the `profiles` folder of the project's data directory."""
+    profile_dir = os.getenv("AGENT_PROFILE_DIR")
+    if profile_dir:
+        return profile_dir
+    # Not relative to the working directory, runs are started from anywhere
+    from app.amazon_web_agent.tools.extract_content_tool import get_data_dir
+
+    return os.path.join(get_data_dir(), "profiles")
+
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread from a background thread.
+
+    Sampling only reads the frames of the profiled thread, so its overhead does not grow
+    with the number of calls, unlike cProfile. In an event loop thread, the samples show
+    the coroutine that is running when the sample is taken.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.frames: List[FrameKey] = []
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._frame_index: Dict[FrameKey, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(self._index(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def _index(self, frame) -> int:
+        code = frame.f_code
+        key = (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append(key)
+        return index
+
+    def top_functions(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """The functions with the most time spent in their own code, in seconds."""
+        self_time: Counter = Counter()
+        for stack, weight in zip(self.samples, self.weights):
+            if stack:
+                self_time[stack[-1]] += weight
+        return [
+            (f"{self.frames[index][0]} ({os.path.basename(self.frames[index][1])}:{self.frames[index][2]})", seconds)
+            for index, seconds in self_time.most_common(limit)
+        ]
+
+    def to_speedscope(self, name: str) -> dict:
+        """Convert the samples to a speedscope file, see https://www.speedscope.app."""
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "web-action-agent",
+            "shared": {
+                "frames": [
+                    {"name": func, "file": file, "line": line} for func, file, line in self.frames
+                ]
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(self.weights),
+                    "samples": self.samples,
+                    "weights": self.weights,
+                }
+            ],
+        }
+
+
+class TaskTimer:
+    """
+    Records the wall time of every asyncio task created on the loop, by coroutine name.
+
+    Installed as the task factory of the loop, chaining the factory that was set before.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_factory = None
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._previous_factory = loop.get_task_factory()
+        loop.set_task_factory(self._create_task)
+
+    def uninstall(self) -> None:
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._loop = None
+
+    def _create_task(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+        started_at = time.perf_counter()
+        task.add_done_callback(lambda _: self._record(name, time.perf_counter() - started_at))
+        return task
+
+    def _record(self, name: str, seconds: float) -> None:
+        timing = self.timings.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        timing["count"] += 1
+        timing["total_seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """The timings, slowest tasks first."""
+        ordered = sorted(self.timings.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+        return {
+            name: {key: round(value, 4) for key, value in timing.items()} for name, timing in ordered
+        }
+
+
+class RunProfiler:
+    """
+    Profiles a run: samples the Python stack of the current thread, times the asyncio
+    tasks of the event loop and, with `deterministic`, records a cProfile profile as well.
+
+    On exit it writes to `output_dir`:
+    - `<name>-<time>.speedscope.json`, a flame graph to open in https://www.speedscope.app
+    - `<name>-<time>.tasks.json`, the asyncio task timings
+    - `<name>-<time>.prof`, with `deterministic`, to read with `pstats` or snakeviz
+
+    Example:
+        with RunProfiler("amazon_web_agent_run"):
+            loop.run_until_complete(amazon_web_agent_arun(user_requirement, browser))
+    """
+
+    def __init__(
+        self,
+        name: str,
+        output_dir: Optional[str] = None,
+        interval: float = 0.005,
+        deterministic: bool = False,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        """`loop` is the event loop whose tasks are timed, the running loop if not given."""
+        self.name = name
+        self.output_dir = output_dir or get_profile_dir()
+        self.sampler = StackSampler(interval=interval)
+        self.task_timer = TaskTimer()
+        self.loop = loop
+        self.profile = cProfile.Profile() if deterministic else None
+        self.paths: Dict[str, str] = {}
+
+    def __enter__(self) -> "RunProfiler":
+        loop = self.loop
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        if loop is not None:
+            self.task_timer.install(loop)
+        self.sampler.start()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self.profile is not None:
+            self.profile.disable()
+        self.sampler.stop()
+        self.task_timer.uninstall()
+        try:
+            self.write()
+        except OSError as e:
+            logger.error(f"Failed to write the profile of {self.name}: {e}")
+
+    def write(self) -> Dict[str, str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+        self.paths["speedscope"] = f"{prefix}.speedscope.json"
+        with open(self.paths["speedscope"], "w", encoding="utf-8") as f:
+            json.dump(self.sampler.to_speedscope(self.name), f)
+
+        self.paths["tasks"] = f"{prefix}.tasks.json"
+        with open(self.paths["tasks"], "w", encoding="utf-8") as f:
+            json.dump(self.task_timer.summary(), f, indent=2)
+
+        if self.profile is not None:
+            self.paths["prof"] = f"{prefix}.prof"
+            self.profile.dump_stats(self.paths["prof"])
+
+        elapsed = self.sampler.stopped_at - self.sampler.started_at
+        top = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.sampler.top_functions(5))
+        logger.info(
+            f"Profiled {self.name} for {elapsed:.2f}s ({len(self.sampler.samples)} samples), "
+            f"top functions: {top}. Written to {self.paths['speedscope']}"
+        )
+        return self.paths